@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+预编译的函数选择器 / 参数类型表
+由 ABI JSON 生成（python abi_table.py PositionManager.json PositionManager），导入时只构造一个字典，
+不解析 JSON、不导入 web3；按需用 eth_abi 编码调用数据、解码返回值，供需要快速冷启动的脚本与工作进程使用
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+# {合约: {函数签名: (选择器, 参数类型, 返回类型)}}，元组类型已展开为规范形式
+TABLES: Dict[str, Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]]] = {
+    'PositionManager': {
+        'DOMAIN_SEPARATOR()': ('0x3644e515', (), ('bytes32',)),
+        'WETH9()': ('0x4aa4a4fc', (), ('address',)),
+        'approve(address,uint256)': ('0x095ea7b3', ('address', 'uint256'), ()),
+        'balanceOf(address)': ('0x70a08231', ('address',), ('uint256',)),
+        'getApproved(uint256)': ('0x081812fc', ('uint256',), ('address',)),
+        'getPoolAndPositionInfo(uint256)': ('0x7ba03aad', ('uint256',), ('(address,address,uint24,int24,address)', 'uint256')),
+        'getPositionLiquidity(uint256)': ('0x1efeed33', ('uint256',), ('uint128',)),
+        'initializePool((address,address,uint24,int24,address),uint160)': ('0xf7020405', ('(address,address,uint24,int24,address)', 'uint160'), ('int24',)),
+        'isApprovedForAll(address,address)': ('0xe985e9c5', ('address', 'address'), ('bool',)),
+        'modifyLiquidities(bytes,uint256)': ('0xdd46508f', ('bytes', 'uint256'), ()),
+        'modifyLiquiditiesWithoutUnlock(bytes,bytes[])': ('0x4afe393c', ('bytes', 'bytes[]'), ()),
+        'msgSender()': ('0xd737d0c7', (), ('address',)),
+        'multicall(bytes[])': ('0xac9650d8', ('bytes[]',), ('bytes[]',)),
+        'name()': ('0x06fdde03', (), ('string',)),
+        'nextTokenId()': ('0x75794a3c', (), ('uint256',)),
+        'nonces(address,uint256)': ('0x502e1a16', ('address', 'uint256'), ('uint256',)),
+        'ownerOf(uint256)': ('0x6352211e', ('uint256',), ('address',)),
+        'permit(address,uint256,uint256,uint256,bytes)': ('0x0f5730f1', ('address', 'uint256', 'uint256', 'uint256', 'bytes'), ()),
+        'permit(address,((address,uint160,uint48,uint48),address,uint256),bytes)': ('0x2b67b570', ('address', '((address,uint160,uint48,uint48),address,uint256)', 'bytes'), ('bytes',)),
+        'permit2()': ('0x12261ee7', (), ('address',)),
+        'permitBatch(address,((address,uint160,uint48,uint48)[],address,uint256),bytes)': ('0x002a3e3a', ('address', '((address,uint160,uint48,uint48)[],address,uint256)', 'bytes'), ('bytes',)),
+        'permitForAll(address,address,bool,uint256,uint256,bytes)': ('0x3aea60f0', ('address', 'address', 'bool', 'uint256', 'uint256', 'bytes'), ()),
+        'poolKeys(bytes25)': ('0x86b6be7d', ('bytes25',), ('address', 'address', 'uint24', 'int24', 'address')),
+        'poolManager()': ('0xdc4c90d3', (), ('address',)),
+        'positionInfo(uint256)': ('0x89097a6a', ('uint256',), ('uint256',)),
+        'revokeNonce(uint256)': ('0x05c1ee20', ('uint256',), ()),
+        'safeTransferFrom(address,address,uint256)': ('0x42842e0e', ('address', 'address', 'uint256'), ()),
+        'safeTransferFrom(address,address,uint256,bytes)': ('0xb88d4fde', ('address', 'address', 'uint256', 'bytes'), ()),
+        'setApprovalForAll(address,bool)': ('0xa22cb465', ('address', 'bool'), ()),
+        'subscribe(uint256,address,bytes)': ('0x2b9261de', ('uint256', 'address', 'bytes'), ()),
+        'subscriber(uint256)': ('0x16a24131', ('uint256',), ('address',)),
+        'supportsInterface(bytes4)': ('0x01ffc9a7', ('bytes4',), ('bool',)),
+        'symbol()': ('0x95d89b41', (), ('string',)),
+        'tokenDescriptor()': ('0x5a9d7a68', (), ('address',)),
+        'tokenURI(uint256)': ('0xc87b56dd', ('uint256',), ('string',)),
+        'transferFrom(address,address,uint256)': ('0x23b872dd', ('address', 'address', 'uint256'), ()),
+        'unlockCallback(bytes)': ('0x91dd7346', ('bytes',), ('bytes',)),
+        'unsubscribe(uint256)': ('0xad0b27fb', ('uint256',), ()),
+        'unsubscribeGasLimit()': ('0x4767565f', (), ('uint256',)),
+    },
+    'PoolManager': {
+        'unlock(bytes)': ('0x48c89491', ('bytes',), ('bytes',)),
+        'modifyLiquidity((address,address,uint24,int24,address),(int24,int24,int256,bytes32),bytes)': ('0x5a6bcfda', ('(address,address,uint24,int24,address)', '(int24,int24,int256,bytes32)', 'bytes'), ('int256', 'int256')),
+        'extsload(bytes32)': ('0x1e2eaeaf', ('bytes32',), ('bytes32',)),
+        'extsload(bytes32,uint256)': ('0x35fd631a', ('bytes32', 'uint256'), ('bytes32[]',)),
+        'extsload(bytes32[])': ('0xdbd035ff', ('bytes32[]',), ('bytes32[]',)),
+    },
+    'StateView': {
+        'getSlot0(bytes32)': ('0xc815641c', ('bytes32',), ('uint160', 'int24', 'uint24', 'uint24')),
+        'getLiquidity(bytes32)': ('0xfa6793d5', ('bytes32',), ('uint128',)),
+        'getFeeGrowthGlobals(bytes32)': ('0x9ec538c8', ('bytes32',), ('uint256', 'uint256')),
+        'getTickInfo(bytes32,int24)': ('0x7c40f1fe', ('bytes32', 'int24'), ('uint128', 'int128', 'uint256', 'uint256')),
+        'getPositionInfo(bytes32,address,int24,int24,bytes32)': ('0xdacf1d2f', ('bytes32', 'address', 'int24', 'int24', 'bytes32'), ('uint128', 'uint256', 'uint256')),
+    },
+    'ERC20': {
+        'decimals()': ('0x313ce567', (), ('uint8',)),
+        'symbol()': ('0x95d89b41', (), ('string',)),
+        'balanceOf(address)': ('0x70a08231', ('address',), ('uint256',)),
+        'allowance(address,address)': ('0xdd62ed3e', ('address', 'address'), ('uint256',)),
+        'approve(address,uint256)': ('0x095ea7b3', ('address', 'uint256'), ('bool',)),
+    },
+}
+
+
+class FunctionSpec(NamedTuple):
+    signature: str
+    selector: bytes
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+
+
+_specs: Dict[Tuple[str, str, Optional[int]], FunctionSpec] = {}
+
+
+def function(contract: str, name: str, arg_count: Optional[int] = None) -> FunctionSpec:
+    """按函数名或完整签名查找；重载函数（如 permit）需要传入完整签名或参数个数"""
+    key = (contract, name, arg_count)
+    spec = _specs.get(key)
+    if spec is not None:
+        return spec
+    table = TABLES[contract]
+    if '(' in name:
+        matches = [name] if name in table else []
+    else:
+        matches = [sig for sig, (_, inputs, _) in table.items()
+                   if sig.split('(', 1)[0] == name and (arg_count is None or len(inputs) == arg_count)]
+    if len(matches) != 1:
+        raise KeyError(f"{contract} 中找不到唯一匹配的函数: {name}" + (f" ({len(matches)} 个重载)" if matches else ""))
+    selector, inputs, outputs = table[matches[0]]
+    spec = _specs[key] = FunctionSpec(matches[0], bytes.fromhex(selector[2:]), inputs, outputs)
+    return spec
+
+
+def encode_call(contract: str, name: str, args: Sequence[Any] = ()) -> bytes:
+    """编码合约调用数据（选择器 + 参数）"""
+    from eth_abi import encode
+
+    spec = function(contract, name, len(args))
+    return spec.selector + encode(list(spec.inputs), list(args))
+
+
+def decode_output(contract: str, name: str, data: bytes, arg_count: Optional[int] = None):
+    """解码返回值：单个返回值直接返回该值，多个返回值返回元组"""
+    from eth_abi import decode
+
+    spec = function(contract, name, arg_count)
+    values = decode(list(spec.outputs), bytes(data))
+    return values[0] if len(values) == 1 else values
+
+
+def _abi_param(kind: str) -> Dict[str, Any]:
+    """规范类型字符串 -> ABI 参数（展开元组的 components）"""
+    if not kind.startswith('('):
+        return {'name': '', 'type': kind}
+    end = kind.rindex(')')
+    depth, parts, start = 0, [], 1
+    for i, ch in enumerate(kind[1:end], 1):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(kind[start:i])
+            start = i + 1
+    parts.append(kind[start:end])
+    return {'name': '', 'type': 'tuple' + kind[end + 1:], 'components': [_abi_param(p) for p in parts if p]}
+
+
+_abis: Dict[str, list] = {}
+
+
+def to_abi(contract: str) -> list:
+    """由表项还原最小 ABI（参数无名称），供需要 web3 合约对象的场景使用；结果缓存为同一对象"""
+    abi = _abis.get(contract)
+    if abi is None:
+        abi = _abis[contract] = [
+            {'type': 'function', 'name': signature.split('(', 1)[0], 'stateMutability': 'nonpayable',
+             'inputs': [_abi_param(t) for t in inputs], 'outputs': [_abi_param(t) for t in outputs]}
+            for signature, (_, inputs, outputs) in TABLES[contract].items()
+        ]
+    return abi
+
+
+def _canonical_type(param: Dict[str, Any]) -> str:
+    kind = param['type']
+    if kind.startswith('tuple'):
+        return '(' + ','.join(_canonical_type(c) for c in param['components']) + ')' + kind[len('tuple'):]
+    return kind
+
+
+def generate(abi: Sequence[Dict[str, Any]]) -> Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]]:
+    """由 ABI 生成一个合约的表项"""
+    from eth_utils import keccak
+
+    entries = {}
+    for item in abi:
+        if item.get('type') != 'function':
+            continue
+        inputs = tuple(_canonical_type(p) for p in item.get('inputs', []))
+        outputs = tuple(_canonical_type(p) for p in item.get('outputs', []))
+        signature = f"{item['name']}({','.join(inputs)})"
+        entries[signature] = ('0x' + keccak(text=signature)[:4].hex(), inputs, outputs)
+    return entries
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="由 ABI JSON 生成选择器表，输出可直接粘贴到 TABLES 中")
+    parser.add_argument('abi', help="ABI JSON 文件")
+    parser.add_argument('name', help="合约名称，如 PositionManager")
+    args = parser.parse_args()
+
+    with open(args.abi, 'r') as f:
+        entries = generate(json.load(f))
+    print(f"    {args.name!r}: {{")
+    for signature, entry in entries.items():
+        print(f"        {signature!r}: {entry!r},")
+    print("    },")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+基于 asyncio 的并发 Position 查询引擎
+通过 aiohttp 直接发送 JSON-RPC，多个 Multicall 批次同时在途，
+支持在途数量上限、每个 RPC 节点独立限速，并按输入顺序输出结果
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Sequence, AsyncIterator
+
+import aiohttp
+
+from multicall import MULTICALL3_ADDRESS, DEFAULT_BATCH_SIZE, encode_aggregate3, decode_aggregate3
+from batch_query_positions import encode_position_calls, decode_position_result
+
+# BSC 公共节点，批次按轮询方式分配到各节点
+DEFAULT_RPC_URLS = [
+    "https://bsc-dataseed1.binance.org/",
+    "https://bsc-dataseed2.binance.org/",
+    "https://bsc-dataseed3.binance.org/",
+    "https://bsc-dataseed4.binance.org/",
+]
+
+
+class RateLimiter:
+    """令牌桶限速器，rate 为每秒请求数，burst 为允许的瞬时突发数量"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncRpcClient:
+    """单个 RPC 节点的异步 JSON-RPC 客户端"""
+
+    def __init__(self, url: str, session: aiohttp.ClientSession, requests_per_second: float = 10):
+        self.url = url
+        self.session = session
+        self.limiter = RateLimiter(requests_per_second)
+        self._next_id = 0
+
+    async def request(self, method: str, params: list) -> Any:
+        await self.limiter.acquire()
+        self._next_id += 1
+        payload = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        async with self.session.post(self.url, json=payload) as resp:
+            resp.raise_for_status()
+            body = await resp.json(content_type=None)
+        if body.get('error'):
+            raise Exception(f"RPC错误 ({self.url}): {body['error']}")
+        return body['result']
+
+    async def eth_call(self, to: str, data: bytes, block_identifier='latest') -> bytes:
+        result = await self.request('eth_call', [{'to': to, 'data': '0x' + data.hex()}, block_identifier])
+        return bytes.fromhex(result[2:])
+
+
+class AsyncPositionQueryEngine:
+    """并发 Position 查询引擎
+    max_in_flight: 同时在途的 Multicall 批次数量上限
+    requests_per_second: 每个 RPC 节点的限速
+    batch_size: 每个 aggregate3 的子调用数量（每个 token 两个子调用）
+    """
+
+    def __init__(self, position_manager: str, rpc_urls: Sequence[str] = DEFAULT_RPC_URLS,
+                 max_in_flight: int = 8, requests_per_second: float = 10,
+                 batch_size: int = DEFAULT_BATCH_SIZE, timeout: float = 30):
+        self.position_manager = position_manager
+        self.rpc_urls = list(rpc_urls)
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.tokens_per_batch = max(1, batch_size // 2)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def _query_batch(self, client: AsyncRpcClient, semaphore: asyncio.Semaphore,
+                           token_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        calls = []
+        for token_id in token_ids:
+            calls.extend(encode_position_calls(self.position_manager, token_id))
+        async with semaphore:
+            try:
+                raw = await client.eth_call(MULTICALL3_ADDRESS, encode_aggregate3(calls))
+                results = decode_aggregate3(raw)
+            except Exception as e:
+                # 整个批次失败时，批次内每个 token 都标记为失败，不影响其他批次
+                return [{'token_id': token_id, 'error': str(e), 'status': 'failed'} for token_id in token_ids]
+        return [
+            decode_position_result(token_id, results[2 * i], results[2 * i + 1])
+            for i, token_id in enumerate(token_ids)
+        ]
+
+    async def iter_results(self, token_ids: Sequence[int]) -> AsyncIterator[Dict[str, Any]]:
+        """按输入顺序逐条产出结果；后续批次在等待前面批次时继续在途"""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            clients = [AsyncRpcClient(url, session, self.requests_per_second) for url in self.rpc_urls]
+            batches = [token_ids[i:i + self.tokens_per_batch]
+                       for i in range(0, len(token_ids), self.tokens_per_batch)]
+            # 只保持有限的任务窗口，避免为超大列表一次性创建全部协程
+            window = self.max_in_flight * 2
+            pending = deque()
+            next_batch = 0
+            while next_batch < len(batches) or pending:
+                while next_batch < len(batches) and len(pending) < window:
+                    client = clients[next_batch % len(clients)]
+                    pending.append(asyncio.ensure_future(
+                        self._query_batch(client, semaphore, batches[next_batch])))
+                    next_batch += 1
+                for result in await pending.popleft():
+                    yield result
+
+    async def query(self, token_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        return [result async for result in self.iter_results(token_ids)]
+
+
+def async_batch_query_positions(token_ids, position_manager, rpc_urls=DEFAULT_RPC_URLS,
+                                max_in_flight=8, requests_per_second=10, batch_size=DEFAULT_BATCH_SIZE):
+    """同步入口：并发查询位置信息，返回与 batch_query_positions 相同格式的结果列表"""
+    print(f"🚀 开始并发查询 {len(token_ids)} 个位置 (节点: {len(rpc_urls)}, 在途上限: {max_in_flight})...")
+    engine = AsyncPositionQueryEngine(position_manager, rpc_urls, max_in_flight,
+                                      requests_per_second, batch_size)
+    results = asyncio.run(engine.query(list(token_ids)))
+    successful = sum(1 for r in results if r['status'] == 'success')
+    print(f"\n📈 查询完成! 成功: {successful}, 失败: {len(results) - successful}")
+    return results
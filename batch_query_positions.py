@@ -3,49 +3,103 @@
 批量查询BSC链上Uniswap V4 Position信息
 """
 
-import json
-import csv
 from web3 import Web3
+from eth_abi import decode
 from datetime import datetime
 
+from multicall import aggregate3, function_selector, DEFAULT_BATCH_SIZE
+from result_sinks import CsvSink
+from position_valuation import value_results
+from client_registry import get_contract, load_abi as load_registry_abi
+from position_reader import read_position
+from chain_head import get_chain_head
+from rpc_pool import make_web3, CHAIN_ENDPOINTS, BSC_CHAIN_ID
+
 # BSC主网配置
 BSC_RPC_URL = "https://bsc-dataseed1.binance.org/"
 POSITION_MANAGER_ADDRESS = "0x..." # 请替换为实际的PositionManager合约地址
 
+# Multicall 模式下使用的函数选择器与返回值类型
+GET_POSITION_LIQUIDITY_SELECTOR = function_selector("getPositionLiquidity(uint256)")
+GET_POOL_AND_POSITION_INFO_SELECTOR = function_selector("getPoolAndPositionInfo(uint256)")
+POOL_AND_POSITION_INFO_TYPES = ['(address,address,uint24,int24,address)', 'uint256']
+
 def load_abi():
     """加载PositionManager ABI"""
-    with open('PositionManager.json', 'r') as f:
-        return json.load(f)
+    return load_registry_abi('PositionManager.json')
 
 def init_web3():
     """初始化Web3连接"""
-    w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL))
+    w3 = make_web3([BSC_RPC_URL] + CHAIN_ENDPOINTS[BSC_CHAIN_ID])
     if not w3.is_connected():
         raise Exception("无法连接到BSC网络")
     return w3
 
-def query_single_position(contract, token_id):
-    """查询单个位置信息"""
+def query_single_position(contract, token_id, cache=None, block_number=None):
+    """查询单个位置信息
+    传入 cache 时只重新读取已过期的字段，block_number 为本次读取所固定的区块（默认最新区块）
+    """
     try:
-        # 获取流动性
-        liquidity = contract.functions.getPositionLiquidity(token_id).call()
-        
-        # 获取池子和位置信息
-        pool_info = contract.functions.getPoolAndPositionInfo(token_id).call()
-        pool_key = pool_info[0]
-        position_info = pool_info[1]
-        
+        result, _ = read_position(contract.w3, token_id, contract, cache, block_number)
+        del result['block_number']
+        result['status'] = 'success'
+        return result
+    except Exception as e:
         return {
             'token_id': token_id,
-            'liquidity': liquidity,
-            'currency0': pool_key[0],
-            'currency1': pool_key[1],
-            'fee': pool_key[2],
-            'tick_spacing': pool_key[3],
-            'hooks': pool_key[4],
-            'position_info': position_info,
-            'status': 'success'
+            'error': str(e),
+            'status': 'failed'
         }
+
+def encode_position_calls(position_manager, token_id):
+    """生成单个 token ID 的两个子调用: getPositionLiquidity 与 getPoolAndPositionInfo"""
+    arg = int(token_id).to_bytes(32, 'big')
+    return [
+        (position_manager, GET_POSITION_LIQUIDITY_SELECTOR + arg),
+        (position_manager, GET_POOL_AND_POSITION_INFO_SELECTOR + arg),
+    ]
+
+def _check_success(call_result):
+    success, data = call_result
+    if not success:
+        raise Exception(f"调用被回滚: 0x{data.hex()}")
+    return data
+
+def _decode_liquidity(call_result):
+    (liquidity,) = decode(['uint128'], _check_success(call_result))
+    return {'liquidity': liquidity}
+
+def _decode_pool_and_position_info(call_result):
+    pool_key, position_info = decode(POOL_AND_POSITION_INFO_TYPES, _check_success(call_result))
+    return {
+        'currency0': Web3.to_checksum_address(pool_key[0]),
+        'currency1': Web3.to_checksum_address(pool_key[1]),
+        'fee': pool_key[2],
+        'tick_spacing': pool_key[3],
+        'hooks': Web3.to_checksum_address(pool_key[4]),
+        'position_info': position_info,
+    }
+
+def _build_result(token_id, fields):
+    """按 query_single_position 的字段顺序组装结果字典"""
+    return {
+        'token_id': token_id,
+        'liquidity': fields['liquidity'],
+        'currency0': fields['currency0'],
+        'currency1': fields['currency1'],
+        'fee': fields['fee'],
+        'tick_spacing': fields['tick_spacing'],
+        'hooks': fields['hooks'],
+        'position_info': fields['position_info'],
+        'status': 'success'
+    }
+
+def decode_position_result(token_id, liquidity_result, pool_info_result):
+    """将两个子调用的 (success, returnData) 解码为与 query_single_position 相同的结果字典"""
+    try:
+        fields = _decode_liquidity(liquidity_result)
+        fields.update(_decode_pool_and_position_info(pool_info_result))
+        return _build_result(token_id, fields)
     except Exception as e:
         return {
             'token_id': token_id,
@@ -53,8 +107,69 @@ def query_single_position(contract, token_id):
             'status': 'failed'
         }
 
-def batch_query_positions(token_ids):
-    """批量查询位置信息"""
+def iter_positions_multicall(w3, position_manager, token_ids, batch_size=DEFAULT_BATCH_SIZE,
+                             cache=None, block_number=None):
+    """通过 Multicall3.aggregate3 批量查询位置信息，逐个批次产出结果，单个 token 失败不影响其他 token
+    传入 cache 时只为已过期的字段生成子调用，所有子调用固定在 block_number 读取
+    """
+    if cache is not None and block_number is None:
+        # 缓存按区块判断新鲜度，必须先固定读取区块
+        block_number = w3.eth.block_number
+    block_identifier = block_number if block_number is not None else 'latest'
+    # batch_size 按子调用计数，每个 token 最多两个子调用
+    tokens_per_batch = max(1, batch_size // 2)
+    for batch_start in range(0, len(token_ids), tokens_per_batch):
+        batch_ids = token_ids[batch_start:batch_start + tokens_per_batch]
+        plan = []
+        calls = []
+        for token_id in batch_ids:
+            stale, cached = {'pool_key', 'liquidity', 'position_info'}, {}
+            if cache is not None:
+                stale, cached = cache.lookup(token_id, block_number)
+            token_calls = encode_position_calls(position_manager, token_id)
+            wanted = []
+            if 'liquidity' in stale:
+                wanted.append(_decode_liquidity)
+                calls.append(token_calls[0])
+            if stale & {'pool_key', 'position_info'}:
+                wanted.append(_decode_pool_and_position_info)
+                calls.append(token_calls[1])
+            plan.append((token_id, stale, cached, wanted))
+
+        print(f"📦 Multicall 批次: Token {batch_start + 1}-{batch_start + len(batch_ids)}/{len(token_ids)}, "
+              f"子调用 {len(calls)} 个")
+        results = aggregate3(w3, calls, batch_size, block_identifier) if calls else []
+
+        cursor = 0
+        for token_id, stale, cached, wanted in plan:
+            token_results = results[cursor:cursor + len(wanted)]
+            cursor += len(wanted)
+            try:
+                fields = dict(cached)
+                for decoder, call_result in zip(wanted, token_results):
+                    fields.update(decoder(call_result))
+                result = _build_result(token_id, fields)
+                if cache is not None:
+                    cache.put_refreshed(result, stale, block_number)
+            except Exception as e:
+                result = {
+                    'token_id': token_id,
+                    'error': str(e),
+                    'status': 'failed'
+                }
+            yield result
+
+def query_positions_multicall(w3, position_manager, token_ids, batch_size=DEFAULT_BATCH_SIZE,
+                              cache=None, block_number=None):
+    """通过 Multicall3.aggregate3 批量查询位置信息，返回结果列表"""
+    return list(iter_positions_multicall(w3, position_manager, token_ids, batch_size, cache, block_number))
+
+def batch_query_positions(token_ids, use_multicall=False, batch_size=DEFAULT_BATCH_SIZE, cache=None, sink=None):
+    """批量查询位置信息
+    use_multicall=True 时通过 Multicall3 打包请求，batch_size 为每个 aggregate3 的子调用数量
+    cache 为 position_cache.PositionCache 实例时，只重新读取已过期的字段
+    sink 为 result_sinks 中的输出对象时，结果到达即写入，不在内存中保留，返回 None
+    """
     print(f"🚀 开始批量查询 {len(token_ids)} 个位置...")
     
     # 初始化
@@ -64,30 +179,45 @@ def batch_query_positions(token_ids):
     if POSITION_MANAGER_ADDRESS == "0x...":
         raise Exception("请设置正确的 POSITION_MANAGER_ADDRESS")
     
-    contract = w3.eth.contract(
-        address=Web3.to_checksum_address(POSITION_MANAGER_ADDRESS),
-        abi=abi
-    )
+    contract = get_contract(w3, POSITION_MANAGER_ADDRESS, abi)
+    
+    # 使用缓存时固定读取区块，作为缓存字段的区块标记；读取前先丢弃重组分叉点之后的缓存
+    block_number = None
+    if cache is not None:
+        chain_head = get_chain_head(w3)
+        chain_head.subscribe(cache.invalidate_after)
+        chain_head.poll()
+        block_number = w3.eth.block_number
     
     results = []
     successful = 0
     failed = 0
     
-    for i, token_id in enumerate(token_ids, 1):
-        print(f"📊 查询进度: {i}/{len(token_ids)} - Token ID: {token_id}")
+    if use_multicall:
+        stream = iter_positions_multicall(w3, contract.address, token_ids, batch_size, cache, block_number)
+    else:
+        stream = (query_single_position(contract, token_id, cache, block_number) for token_id in token_ids)
+    
+    for i, result in enumerate(stream, 1):
+        if not use_multicall:
+            print(f"📊 查询进度: {i}/{len(token_ids)} - Token ID: {result['token_id']}")
         
-        result = query_single_position(contract, token_id)
-        results.append(result)
+        if sink is not None:
+            sink.write(result)
+        else:
+            results.append(result)
         
         if result['status'] == 'success':
             successful += 1
-            print(f"   ✅ 成功 - 流动性: {result['liquidity']:,}")
+            if not use_multicall:
+                print(f"   ✅ 成功 - 流动性: {result['liquidity']:,}")
         else:
             failed += 1
-            print(f"   ❌ 失败 - {result['error']}")
+            if not use_multicall:
+                print(f"   ❌ 失败 - {result['error']}")
     
     print(f"\n📈 查询完成! 成功: {successful}, 失败: {failed}")
-    return results
+    return results if sink is None else None
 
 def save_to_csv(results, filename=None):
     """保存结果到CSV文件"""
@@ -95,30 +225,27 @@ def save_to_csv(results, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"position_query_results_{timestamp}.csv"
     
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'token_id', 'status', 'liquidity', 'currency0', 'currency1', 
-            'fee', 'tick_spacing', 'hooks', 'position_info', 'error'
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
+    with CsvSink(filename) as sink:
         for result in results:
-            # 填充缺失的字段
-            row = {field: result.get(field, '') for field in fieldnames}
-            writer.writerow(row)
+            sink.write(result)
     
     print(f"💾 结果已保存到: {filename}")
     return filename
 
-def print_summary(results):
-    """打印查询结果摘要"""
+def print_summary(results, pool_states=None):
+    """打印查询结果摘要
+    传入 pool_states ({pool_id: (sqrtPriceX96, tick)}，可由 position_valuation.fetch_pool_states 获取) 时，
+    额外按池子汇总头寸可取回的 token0 / token1 数量（最小单位）
+    """
     successful_results = [r for r in results if r['status'] == 'success']
     
     if not successful_results:
         print("❌ 没有成功查询到任何位置信息")
         return
     
+    if pool_states:
+        value_results(successful_results, pool_states)
+    
     print("\n" + "="*80)
     print("📊 查询结果摘要")
     print("="*80)
@@ -130,10 +257,14 @@ def print_summary(results):
     for result in successful_results:
         pair = f"{result['currency0'][:6]}.../{result['currency1'][:6]}..."
         if pair not in currency_pairs:
-            currency_pairs[pair] = {'count': 0, 'liquidity': 0}
+            currency_pairs[pair] = {'count': 0, 'liquidity': 0, 'amount0': 0, 'amount1': 0, 'valued': 0}
         currency_pairs[pair]['count'] += 1
         currency_pairs[pair]['liquidity'] += result['liquidity']
         total_liquidity += result['liquidity']
+        if 'amount0' in result:
+            currency_pairs[pair]['amount0'] += result['amount0']
+            currency_pairs[pair]['amount1'] += result['amount1']
+            currency_pairs[pair]['valued'] += 1
     
     print(f"📈 总计查询成功: {len(successful_results)} 个位置")
     print(f"💧 总流动性: {total_liquidity:,}")
@@ -142,6 +273,9 @@ def print_summary(results):
     print("\n📋 交易对统计:")
     for pair, stats in currency_pairs.items():
         print(f"   {pair}: {stats['count']} 个位置, 流动性: {stats['liquidity']:,}")
+        if stats['valued']:
+            print(f"      🪙 可取回 token0: {stats['amount0']:,}, token1: {stats['amount1']:,} "
+                  f"(已估值 {stats['valued']} 个位置)")
     
     print("="*80)
 
@@ -154,7 +288,12 @@ def main():
     print("\n使用方法:")
     print("1. 设置 POSITION_MANAGER_ADDRESS 为实际合约地址")
     print("2. 调用 batch_query_positions([token_id1, token_id2, ...]) 进行批量查询")
+    print("   大批量查询时传入 use_multicall=True，通过 Multicall3 合并请求")
+    print("   超大列表可使用 async_query.async_batch_query_positions 并发查询多个节点")
+    print("   传入 cache=PositionCache() 可复用本地缓存，重复查询只读取已过期的字段")
+    print("   传入 sink=result_sinks.open_sink('results.parquet') 可边查询边写入磁盘（支持 csv/jsonl/parquet）")
     print("3. 使用 save_to_csv() 保存结果")
+    print("4. 使用 print_summary(results, fetch_pool_states(w3, pool_ids)) 按池子汇总可取回的代币数量")
     
     # 示例代码（注释掉，用户可以根据需要取消注释）
     """
@@ -162,7 +301,7 @@ def main():
     token_ids = [1, 2, 3, 4, 5]  # 替换为实际的token ID列表
     
     try:
-        results = batch_query_positions(token_ids)
+        results = batch_query_positions(token_ids, use_multicall=True)
         save_to_csv(results)
         print_summary(results)
     except Exception as e:
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+PositionManager 历史交易输入的流式批量解码
+逐条读取 JSONL（每行一个含 input 字段的交易对象）或二进制文件（4 字节大端长度 + 原始 calldata），
+二进制文件通过 mmap + memoryview 切片读取，不复制数据；解码结果以生成器逐条产出，内存占用与文件大小无关
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from v4_codec import decode_calldata
+
+LENGTH_PREFIX = 4
+
+
+def iter_jsonl_inputs(path: str) -> Iterator[Tuple[Dict[str, Any], memoryview]]:
+    """逐行读取 JSONL，返回 (交易元数据, calldata)；input 字段也可以叫 data"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            tx = json.loads(line)
+            raw = tx.pop('input', None) or tx.pop('data', '0x')
+            yield tx, memoryview(bytes.fromhex(raw[2:] if raw.startswith('0x') else raw))
+
+
+def iter_binary_inputs(path: str) -> Iterator[Tuple[Dict[str, Any], memoryview]]:
+    """读取长度前缀的二进制文件，每条 calldata 都是 mmap 上的 memoryview 切片"""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            pos, index = 0, 0
+            while pos < len(view):
+                length = int.from_bytes(view[pos:pos + LENGTH_PREFIX], 'big')
+                start = pos + LENGTH_PREFIX
+                if start + length > len(view):
+                    raise ValueError(f"二进制文件在第 {index} 条记录处被截断")
+                yield {'index': index}, view[start:start + length]
+                pos = start + length
+                index += 1
+        finally:
+            view.release()
+
+
+def write_binary_inputs(inputs: Iterable[bytes], path: str) -> int:
+    """将 calldata 序列写成长度前缀的二进制文件，返回写入条数"""
+    count = 0
+    with open(path, 'wb') as f:
+        for data in inputs:
+            f.write(len(data).to_bytes(LENGTH_PREFIX, 'big'))
+            f.write(data)
+            count += 1
+    return count
+
+
+def iter_inputs(path: str, fmt: Optional[str] = None):
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'bin')
+    if fmt == 'jsonl':
+        return iter_jsonl_inputs(path)
+    if fmt == 'bin':
+        return iter_binary_inputs(path)
+    raise ValueError(f"不支持的输入格式: {fmt}，可选: jsonl, bin")
+
+
+def iter_decoded(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """逐条解码，单条失败不会中断整个流，记录中带 status / error 字段"""
+    for meta, calldata in iter_inputs(path, fmt):
+        record = dict(meta)
+        try:
+            record.update(decode_calldata(calldata))
+            record['status'] = 'success'
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+        finally:
+            calldata.release()
+        yield record
+
+
+def _count_actions(record: Dict[str, Any], counter: Counter):
+    for call in record.get('calls', ()):
+        _count_actions(call, counter)
+    for params in record.get('params', ()):
+        counter[params['action']] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式批量解码 PositionManager 交易输入")
+    parser.add_argument('input', help="JSONL（含 input 字段）或长度前缀的二进制文件")
+    parser.add_argument('--format', choices=['jsonl', 'bin'], default=None, help="默认按扩展名判断")
+    parser.add_argument('--output', default=None, help="解码结果输出为 JSONL，默认只打印统计")
+    args = parser.parse_args()
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    counter, total, failed = Counter(), 0, 0
+    try:
+        for record in iter_decoded(args.input, args.format):
+            total += 1
+            if record['status'] != 'success':
+                failed += 1
+            _count_actions(record, counter)
+            if out:
+                out.write(json.dumps(record) + '\n')
+    finally:
+        if out:
+            out.close()
+
+    print(f"📈 共解码 {total} 笔交易，失败 {failed} 笔", file=sys.stderr)
+    for action, count in counter.most_common():
+        print(f"   {action}: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
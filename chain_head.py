@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+链头跟踪与重组检测
+记录最近 depth 个区块的哈希，每次轮询时用新链头的 parentHash（或按区块号重新读取的哈希）
+与记录比对，找到分叉点后只通知各个按区块标记的缓存丢弃分叉点之后的内容：
+池子状态缓存、快照缓存、头寸缓存、持有人索引、全量扫描检查点等，分叉点及之前的结果继续有效
+
+    head = get_chain_head(w3)              # 自动订阅该 w3 的池子状态服务与快照缓存
+    head.subscribe(position_cache.invalidate_after)
+    head.poll()                            # 或 head.start() 在后台线程中按出块间隔轮询
+"""
+
+import argparse
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from web3 import Web3
+
+DEFAULT_REORG_DEPTH = 64     # BSC 的重组通常只有 1~2 个区块，保留足够余量
+DEFAULT_POLL_INTERVAL = 3.0  # BSC 出块间隔
+
+
+class ChainHeadTracker:
+    def __init__(self, w3: Web3, depth: int = DEFAULT_REORG_DEPTH):
+        self.w3 = w3
+        self.depth = depth
+        self._lock = threading.Lock()
+        # {区块号: 区块哈希}，按区块号递增
+        self._hashes: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._listeners: List[Callable[[int], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reorgs = 0
+
+    @property
+    def head(self) -> Optional[int]:
+        with self._lock:
+            return next(reversed(self._hashes)) if self._hashes else None
+
+    def subscribe(self, callback: Callable[[int], None]):
+        """callback(fork_block) 在检测到重组时调用，需丢弃 fork_block 之后的内容"""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[int], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    # ---------- 检测 ----------
+    def _canonical_hash(self, block_number: int, latest) -> bytes:
+        if block_number == latest['number']:
+            return bytes(latest['hash'])
+        if block_number == latest['number'] - 1:
+            return bytes(latest['parentHash'])
+        return bytes(self.w3.eth.get_block(block_number)['hash'])
+
+    def _find_fork(self, latest) -> Tuple[Optional[int], Optional[int]]:
+        """返回 (分叉点, 已记录的不高于新链头的最高区块)。
+        分叉点为最后一个仍在主链上的已记录区块；没有不高于新链头的记录时均为 None，
+        记录全部失效时分叉点为最早记录之前的区块
+        """
+        with self._lock:
+            recorded = [(n, h) for n, h in reversed(self._hashes.items()) if n <= latest['number']]
+            oldest = next(iter(self._hashes)) if self._hashes else None
+        if not recorded:
+            return None, None
+        for block_number, block_hash in recorded:
+            if self._canonical_hash(block_number, latest) == block_hash:
+                return block_number, recorded[0][0]
+        print(f"⚠️ 重组深度超过记录的 {self.depth} 个区块，丢弃区块 {oldest} 之后的全部缓存")
+        return oldest - 1, recorded[0][0]
+
+    def poll(self) -> Optional[int]:
+        """读取最新区块并与记录比对，发生重组时通知订阅者并返回分叉点区块号，否则返回 None。
+        只有已记录的某个区块哈希与主链不一致时才视为重组；连接池中落后的节点返回较旧的链头、
+        但其祖先与记录一致时直接忽略
+        """
+        latest = self.w3.eth.get_block('latest')
+        number = int(latest['number'])
+        with self._lock:
+            top = next(reversed(self._hashes)) if self._hashes else None
+            unchanged = top == number and self._hashes[top] == bytes(latest['hash'])
+            extends = top == number - 1 and self._hashes[top] == bytes(latest['parentHash'])
+        if unchanged:
+            return None
+
+        fork, checked = (None, None) if extends else self._find_fork(latest)
+        reorged = fork is not None and fork < checked
+        if top is not None and number < top and not reorged:
+            return None
+        with self._lock:
+            if reorged:
+                for block_number in [n for n in self._hashes if n > fork]:
+                    del self._hashes[block_number]
+            self._hashes[number] = bytes(latest['hash'])
+            if number - 1 not in self._hashes and number > 0:
+                self._hashes[number - 1] = bytes(latest['parentHash'])
+                self._hashes.move_to_end(number)
+            while len(self._hashes) > self.depth:
+                self._hashes.popitem(last=False)
+            listeners = list(self._listeners)
+        if not reorged:
+            return None
+
+        self.reorgs += 1
+        print(f"🔀 检测到链重组：分叉点 {fork}，丢弃区块 {fork + 1}-{top} 的缓存")
+        for callback in listeners:
+            try:
+                callback(fork)
+            except Exception as e:
+                print(f"   ❌ 缓存失效处理失败 {getattr(callback, '__qualname__', callback)} - {e}")
+        return fork
+
+    # ---------- 后台轮询 ----------
+    def start(self, interval: float = DEFAULT_POLL_INTERVAL):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='chain-head', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"   ⚠️ 链头轮询失败 - {e}")
+            self._stop.wait(interval)
+
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def get_chain_head(w3: Web3, depth: int = DEFAULT_REORG_DEPTH) -> ChainHeadTracker:
+    """同一个 Web3 实例共享一个链头跟踪器，并自动订阅该实例的内存缓存（池子状态、快照）"""
+    from pool_state import get_pool_state_service
+    from snapshot import get_snapshot_cache
+
+    with _trackers_lock:
+        tracker = _trackers.get(w3)
+        if tracker is None:
+            tracker = _trackers[w3] = ChainHeadTracker(w3, depth)
+            tracker.subscribe(get_pool_state_service(w3).invalidate_after)
+            tracker.subscribe(get_snapshot_cache(w3).invalidate_after)
+        return tracker
+
+
+def main():
+    from client_registry import get_web3
+
+    parser = argparse.ArgumentParser(description="跟踪链头并报告链重组")
+    parser.add_argument('--rpc', default=None, help="RPC 地址，多个用逗号分隔，默认 BSC 公共节点")
+    parser.add_argument('--depth', type=int, default=DEFAULT_REORG_DEPTH)
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    tracker = ChainHeadTracker(get_web3(args.rpc), args.depth)
+    print(f"👀 跟踪链头（重组检测深度 {args.depth} 个区块），Ctrl+C 退出")
+    try:
+        while True:
+            tracker.poll()
+            print(f"   📦 区块 {tracker.head}  累计重组 {tracker.reorgs} 次")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("👋 已退出")
+
+
+if __name__ == "__main__":
+    main()
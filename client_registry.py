@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+进程级共享的客户端注册表
+- ABI：按路径解析一次后缓存，各脚本不再重复读取、解析 PositionManager.json
+- HTTP 连接：每个 RPC 地址一个带连接池的 requests.Session，所有线程共用（web3 默认按线程各建一个）
+- Web3 / 合约实例：按 (链, 地址, ABI) 缓存，热循环中不再重复构造合约对象与解析 ABI
+"""
+
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.providers import HTTPProvider
+
+DEFAULT_TIMEOUT = 10
+POOL_MAXSIZE = 64
+POSITION_MANAGER_ABI = 'PositionManager.json'
+POSITION_MANAGER_ADDRESS = "0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b"
+
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """所有线程共用同一个带连接池的 Session 的 HTTP provider"""
+
+    def __init__(self, endpoint_uri: str, request_kwargs: Optional[Dict[str, Any]] = None):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.session = get_registry().session(endpoint_uri)
+
+    def post(self, data: bytes) -> bytes:
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        response = self.session.post(self.endpoint_uri, data=data, **kwargs)
+        response.raise_for_status()
+        return response.content
+
+    def make_request(self, method, params):
+        return self.decode_rpc_response(self.post(self.encode_rpc_request(method, params)))
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._abis: Dict[str, Any] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._web3s: Dict[Hashable, Web3] = {}
+        # Web3 实例 -> {(地址, ABI 键): (合约, ABI)}，Web3 被回收时一并释放
+        self._contracts = weakref.WeakKeyDictionary()
+        self._objects: Dict[Hashable, Any] = {}
+
+    # ---------- ABI ----------
+    @staticmethod
+    def _resolve(path: str) -> str:
+        """相对路径优先按当前目录查找（与原脚本一致），找不到时再到本模块所在目录查找"""
+        if os.path.isabs(path) or os.path.exists(path):
+            return os.path.abspath(path)
+        return os.path.join(_MODULE_DIR, path)
+
+    def abi(self, path: str = POSITION_MANAGER_ABI):
+        """解析并缓存 ABI 文件；返回的列表为共享对象，请勿修改。文件不存在或格式错误时照常抛出异常"""
+        resolved = self._resolve(path)
+        abi = self._abis.get(resolved)
+        if abi is None:
+            with open(resolved, 'r') as f:
+                abi = json.load(f)
+            with self._lock:
+                abi = self._abis.setdefault(resolved, abi)
+        return abi
+
+    # ---------- HTTP 连接 ----------
+    def session(self, url: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[url] = session
+            return session
+
+    # ---------- Web3 与合约 ----------
+    def web3(self, urls: Union[str, List[str], None] = None, chain_id: int = 56, **kwargs) -> Web3:
+        """同一组节点只创建一个 Web3（连接池 + 批量合并，见 rpc_pool.make_web3）"""
+        from rpc_pool import make_web3
+
+        key = (chain_id, urls if isinstance(urls, (str, type(None))) else tuple(urls), tuple(sorted(kwargs.items())))
+        with self._lock:
+            w3 = self._web3s.get(key)
+            if w3 is None:
+                w3 = self._web3s[key] = make_web3(urls, chain_id, **kwargs)
+            return w3
+
+    def contract(self, w3: Web3, address: str, abi: Union[str, list] = POSITION_MANAGER_ABI):
+        """缓存合约实例；abi 为文件路径时按路径缓存，为列表时按对象身份缓存（应使用模块 / 类级别的常量）"""
+        if isinstance(abi, str):
+            abi_key, abi = abi, self.abi(abi)
+        else:
+            abi_key = id(abi)
+        key = (address.lower(), abi_key)
+        per_w3 = self._contracts.get(w3)
+        if per_w3 is not None:
+            entry = per_w3.get(key)
+            if entry is not None:
+                return entry[0]
+        with self._lock:
+            per_w3 = self._contracts.setdefault(w3, {})
+            entry = per_w3.get(key)
+            if entry is None:
+                # 同时持有 abi 引用，避免对象被回收后 id 被复用
+                entry = per_w3[key] = (w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi), abi)
+            return entry[0]
+
+    def memoize(self, key: Hashable, factory: Callable[[], Any]):
+        """缓存外部模块构造的客户端对象（如 contract_withdrawal 返回的 web3 / 合约）"""
+        try:
+            return self._objects[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = factory()
+            return self._objects[key]
+
+    def clear(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._abis.clear()
+            self._sessions.clear()
+            self._web3s.clear()
+            self._contracts = weakref.WeakKeyDictionary()
+            self._objects.clear()
+
+
+_registry = ClientRegistry()
+
+
+def get_registry() -> ClientRegistry:
+    return _registry
+
+
+def load_abi(path: str = POSITION_MANAGER_ABI):
+    return _registry.abi(path)
+
+
+def get_web3(urls: Union[str, List[str], None] = None, chain_id: int = 56, **kwargs) -> Web3:
+    return _registry.web3(urls, chain_id, **kwargs)
+
+
+def get_contract(w3: Web3, address: str, abi: Union[str, list] = POSITION_MANAGER_ABI):
+    return _registry.contract(w3, address, abi)
+
+
+def get_position_manager(w3: Web3, address: str = POSITION_MANAGER_ADDRESS):
+    return _registry.contract(w3, address, POSITION_MANAGER_ABI)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+多头寸批量退出计划
+将大量 tokenId 按 PoolKey 的币对分组，每个批次生成一个 unlockData：
+N 个 DECREASE_LIQUIDITY（或 BURN_POSITION）后，每个币种只结算一次（TAKE_PAIR / TAKE / CLOSE_CURRENCY），
+批次大小按可配置的 gas 预算切分，200 个头寸只需少量几笔 modifyLiquidities 交易
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from web3 import Web3
+
+from position_info_decoder import decode_position_info
+from position_valuation import get_amounts_for_liquidity, pool_id_of
+from v4_codec import encode_unlock_actions, encode_modify_liquidities
+from rpc_pool import make_web3
+
+BSC_RPC_URL = "https://bsc-dataseed1.binance.org/"
+POSITION_MANAGER_ADDRESS = "0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b"
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+# TAKE 的 amount 为 0 时表示领取全部未结清的余额（ActionConstants.OPEN_DELTA）
+OPEN_DELTA = 0
+
+# 滑点以基点表示，按整数计算最小数量，避免 uint128 / uint256 数量在浮点运算中丢失精度
+BPS_DENOMINATOR = 10_000
+DEFAULT_SLIPPAGE_BPS = 100
+
+DEFAULT_GAS_BUDGET = 3_000_000
+# 各部分的保守 gas 估计，可通过 plan_exit(gas_costs=...) 覆盖
+DEFAULT_GAS_COSTS = {
+    'base': 80_000,                # 交易基础费用 + unlock 回调开销
+    'DECREASE_LIQUIDITY': 130_000,
+    'BURN_POSITION': 160_000,
+    'hook': 60_000,                # 带 hooks 的池子每个动作额外预留
+    'TAKE_PAIR': 70_000,
+    'TAKE': 45_000,
+    'CLOSE_CURRENCY': 45_000,
+}
+
+
+@dataclass
+class ExitBatch:
+    token_ids: List[int] = field(default_factory=list)
+    actions: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    currencies: List[str] = field(default_factory=list)
+    gas_estimate: int = 0
+
+    @property
+    def unlock_data(self) -> str:
+        return '0x' + encode_unlock_actions(self.actions).hex()
+
+    def calldata(self, deadline: Optional[int] = None) -> str:
+        """modifyLiquidities(unlockData, deadline) 的完整 calldata，deadline 默认当前时间 + 20 分钟"""
+        deadline = deadline if deadline is not None else int(time.time() + 1200)
+        return '0x' + encode_modify_liquidities(self.actions, deadline).hex()
+
+
+def _settlement_actions(pairs: List[Tuple[str, str]], recipient: str, settlement: str):
+    """单个币对用一个 TAKE_PAIR；多个币对时每个币种只结算一次"""
+    if settlement == 'close':
+        currencies = list(dict.fromkeys(c for pair in pairs for c in pair))
+        return [('CLOSE_CURRENCY', {'currency': c}) for c in currencies]
+    if len(pairs) == 1:
+        currency0, currency1 = pairs[0]
+        return [('TAKE_PAIR', {'currency0': currency0, 'currency1': currency1, 'recipient': recipient})]
+    currencies = list(dict.fromkeys(c for pair in pairs for c in pair))
+    return [('TAKE', {'currency': c, 'recipient': recipient, 'amount': OPEN_DELTA}) for c in currencies]
+
+
+def _settlement_gas(pairs: List[Tuple[str, str]], settlement: str, gas_costs: Dict[str, int]) -> int:
+    if not pairs:
+        return 0
+    if settlement == 'close':
+        return gas_costs['CLOSE_CURRENCY'] * len({c for pair in pairs for c in pair})
+    if len(pairs) == 1:
+        return gas_costs['TAKE_PAIR']
+    return gas_costs['TAKE'] * len({c for pair in pairs for c in pair})
+
+
+def _min_amounts(position: Dict[str, Any], pool_states: Optional[Dict[str, Tuple[int, int]]],
+                 slippage_bps: int) -> Tuple[int, int]:
+    """有池子状态时按当前价格估算可取回数量并扣除滑点（基点，整数运算），否则最小数量为 0"""
+    if not pool_states or position.get('position_info') is None:
+        return 0, 0
+    state = pool_states.get(position.get('pool_id') or pool_id_of(position))
+    if state is None:
+        return 0, 0
+    sqrt_price_x96, current_tick = state
+    decoded = decode_position_info(position['position_info'])
+    amount0, amount1 = get_amounts_for_liquidity(sqrt_price_x96, current_tick, decoded['tick_lower'],
+                                                 decoded['tick_upper'], int(position['liquidity']))
+    keep = BPS_DENOMINATOR - int(slippage_bps)
+    return amount0 * keep // BPS_DENOMINATOR, amount1 * keep // BPS_DENOMINATOR
+
+
+def plan_exit(positions: Iterable[Dict[str, Any]], recipient: str, gas_budget: int = DEFAULT_GAS_BUDGET,
+              burn: bool = False, settlement: str = 'take', pool_states=None, slippage_bps: int = DEFAULT_SLIPPAGE_BPS,
+              gas_costs: Optional[Dict[str, int]] = None) -> List[ExitBatch]:
+    """为查询结果（batch_query_positions 格式）生成退出批次。
+    burn=True 时使用 BURN_POSITION（移除全部流动性并销毁 NFT），否则 DECREASE_LIQUIDITY 移除全部流动性；
+    settlement='close' 时用 CLOSE_CURRENCY 结算给交易发送者，recipient 不生效
+    """
+    if settlement not in ('take', 'close'):
+        raise ValueError(f"不支持的结算方式: {settlement}，可选: take, close")
+    gas_costs = {**DEFAULT_GAS_COSTS, **(gas_costs or {})}
+    recipient = Web3.to_checksum_address(recipient)
+    action_name = 'BURN_POSITION' if burn else 'DECREASE_LIQUIDITY'
+
+    # 按币对分组，同一币对的头寸尽量落在同一批次，减少结算动作
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for position in positions:
+        if position.get('status', 'success') != 'success':
+            continue
+        pair = (Web3.to_checksum_address(position['currency0']), Web3.to_checksum_address(position['currency1']))
+        groups.setdefault(pair, []).append(position)
+
+    batches: List[ExitBatch] = []
+    current, pairs, action_gas = ExitBatch(), [], 0
+
+    def flush():
+        nonlocal current, pairs, action_gas
+        if current.token_ids:
+            current.actions.extend(_settlement_actions(pairs, recipient, settlement))
+            current.currencies = list(dict.fromkeys(c for pair in pairs for c in pair))
+            batches.append(current)
+        current, pairs, action_gas = ExitBatch(), [], 0
+
+    for pair, group in groups.items():
+        for position in sorted(group, key=lambda p: int(p['token_id'])):
+            cost = gas_costs[action_name]
+            if position.get('hooks', ZERO_ADDRESS) != ZERO_ADDRESS:
+                cost += gas_costs['hook']
+            new_pairs = pairs if pair in pairs else pairs + [pair]
+            total = gas_costs['base'] + action_gas + cost + _settlement_gas(new_pairs, settlement, gas_costs)
+            if total > gas_budget and current.token_ids:
+                flush()
+                new_pairs = [pair]
+                total = gas_costs['base'] + cost + _settlement_gas(new_pairs, settlement, gas_costs)
+
+            amount0_min, amount1_min = _min_amounts(position, pool_states, slippage_bps)
+            token_id = int(position['token_id'])
+            if burn:
+                params = {'tokenId': token_id, 'amount0Min': amount0_min, 'amount1Min': amount1_min}
+            else:
+                params = {'tokenId': token_id, 'liquidity': int(position['liquidity']),
+                          'amount0Min': amount0_min, 'amount1Min': amount1_min}
+            current.actions.append((action_name, params))
+            current.token_ids.append(token_id)
+            current.gas_estimate = total
+            pairs = new_pairs
+            action_gas += cost
+    flush()
+    return batches
+
+
+def plan_exit_for_token_ids(w3: Web3, token_ids: List[int], recipient: str,
+                            position_manager: str = POSITION_MANAGER_ADDRESS, price_mins: bool = True, **kwargs):
+    """通过 Multicall 查询头寸（及池子价格）后生成退出批次"""
+    from batch_query_positions import query_positions_multicall
+    from position_valuation import fetch_pool_states
+
+    position_manager = Web3.to_checksum_address(position_manager)
+    block_number = w3.eth.block_number
+    results = query_positions_multicall(w3, position_manager, token_ids, block_number=block_number)
+    failed = [r['token_id'] for r in results if r['status'] != 'success']
+    if failed:
+        print(f"   ⚠️ {len(failed)} 个 tokenId 查询失败，已跳过: {failed[:10]}")
+    pool_states = None
+    if price_mins:
+        ok = [r for r in results if r['status'] == 'success']
+        pool_states = fetch_pool_states(w3, [pool_id_of(r) for r in ok], block_identifier=block_number)
+    return plan_exit(results, recipient, pool_states=pool_states, **kwargs)
+
+
+def print_plan(batches: List[ExitBatch]):
+    total = sum(len(b.token_ids) for b in batches)
+    print(f"\n📋 共 {total} 个头寸，拆分为 {len(batches)} 笔交易")
+    for i, batch in enumerate(batches, 1):
+        settle = [name for name, _ in batch.actions if name not in ('DECREASE_LIQUIDITY', 'BURN_POSITION')]
+        print(f"   #{i}: {len(batch.token_ids)} 个头寸, 结算 {', '.join(settle)}, 预估 gas {batch.gas_estimate:,}")
+        print(f"       tokenId: {batch.token_ids[0]} ... {batch.token_ids[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量退出 Uniswap V4 头寸，生成按 gas 预算切分的 unlockData")
+    parser.add_argument('recipient', help="接收代币的地址")
+    parser.add_argument('token_ids', nargs='+', type=int)
+    parser.add_argument('--rpc', default=BSC_RPC_URL, help="RPC 地址，多个用逗号分隔")
+    parser.add_argument('--position-manager', default=POSITION_MANAGER_ADDRESS)
+    parser.add_argument('--gas-budget', type=int, default=DEFAULT_GAS_BUDGET)
+    parser.add_argument('--burn', action='store_true', help="使用 BURN_POSITION 并销毁 NFT")
+    parser.add_argument('--settlement', choices=['take', 'close'], default='take')
+    parser.add_argument('--slippage-bps', type=int, default=DEFAULT_SLIPPAGE_BPS, help="滑点（基点），100 = 1%%")
+    parser.add_argument('--no-price-mins', action='store_true', help="最小数量设为 0，不读取池子价格")
+    args = parser.parse_args()
+
+    w3 = make_web3(args.rpc)
+    batches = plan_exit_for_token_ids(w3, args.token_ids, args.recipient, args.position_manager,
+                                      price_mins=not args.no_price_mins, gas_budget=args.gas_budget,
+                                      burn=args.burn, settlement=args.settlement, slippage_bps=args.slippage_bps)
+    print_plan(batches)
+    deadline = int(time.time() + 1200)
+    for i, batch in enumerate(batches, 1):
+        print(f"\n🔓 批次 #{i} unlockData: {batch.unlock_data}")
+        print(f"   deadline: {deadline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+模块导入耗时基准
+每次在全新的解释器中导入一个模块，统计冷启动耗时（中位数 / 最大值），
+导入期间禁止建立网络连接，导入时访问网络的模块会被标记为失败
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = ['abi_table', 'uniswap_v4', 'query_position', 'unlock_encoder', 'v4_codec', 'tick_math',
+                   'position_info_decoder', 'client_registry', 'rpc_pool', 'storage_layout']
+
+# 在子进程中执行：禁用 socket 连接后导入模块，输出耗时
+_PROBE = r'''
+import json, socket, sys, time
+
+def _blocked(*args, **kwargs):
+    raise RuntimeError("导入期间尝试访问网络")
+
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+    error = None
+except BaseException as e:
+    error = f"{type(e).__name__}: {e}"
+print(json.dumps({"seconds": time.perf_counter() - start, "error": error}))
+'''
+
+
+def measure(module: str, runs: int = 5, cwd: str = None):
+    """返回 {'module', 'median', 'max', 'error'}，耗时单位为毫秒"""
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    timings, error = [], None
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE, module], cwd=cwd, capture_output=True, text=True)
+        try:
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            error = out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "子进程无输出"
+            break
+        if result['error']:
+            error = result['error']
+            break
+        timings.append(result['seconds'] * 1000)
+    return {
+        'module': module,
+        'median': statistics.median(timings) if timings else None,
+        'max': max(timings) if timings else None,
+        'error': error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量模块冷启动导入耗时（导入期间禁止网络访问）")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"⏱️ 每个模块在新解释器中导入 {args.runs} 次")
+    failed = 0
+    for module in args.modules:
+        result = measure(module, args.runs)
+        if result['error']:
+            failed += 1
+            print(f"   ❌ {module:<24} {result['error']}")
+        else:
+            print(f"   ✅ {module:<24} 中位数 {result['median']:7.1f}ms  最大 {result['max']:7.1f}ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Multicall3 批量调用工具
+将大量 eth_call 打包进 Multicall3.aggregate3，每个子调用单独允许失败，
+一次 RPC 往返即可完成数百个只读调用
+"""
+
+from typing import List, Tuple, Sequence
+
+from web3 import Web3
+from eth_abi import encode, decode
+
+# Multicall3 在所有主流 EVM 链（含 BSC / Unichain）上的统一部署地址
+MULTICALL3_ADDRESS = Web3.to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+
+# 单个 aggregate3 请求中包含的子调用数量，公共节点对 eth_call 的 gas 上限足够容纳
+DEFAULT_BATCH_SIZE = 500
+
+
+def function_selector(signature: str) -> bytes:
+    """计算函数签名的 4 字节选择器，例如 'getPositionLiquidity(uint256)'"""
+    return bytes(Web3.keccak(text=signature)[:4])
+
+
+AGGREGATE3_SELECTOR = function_selector("aggregate3((address,bool,bytes)[])")
+
+
+def encode_aggregate3(calls: Sequence[Tuple[str, bytes]], allow_failure: bool = True) -> bytes:
+    """将 (target, callData) 列表编码为 aggregate3 的 calldata"""
+    payload = [(Web3.to_checksum_address(target), allow_failure, bytes(data)) for target, data in calls]
+    return AGGREGATE3_SELECTOR + encode(['(address,bool,bytes)[]'], [payload])
+
+
+def decode_aggregate3(return_data: bytes) -> List[Tuple[bool, bytes]]:
+    """解码 aggregate3 的返回值为 (success, returnData) 列表"""
+    (results,) = decode(['(bool,bytes)[]'], bytes(return_data))
+    return [(bool(success), bytes(data)) for success, data in results]
+
+
+def aggregate3(w3: Web3, calls: Sequence[Tuple[str, bytes]], batch_size: int = DEFAULT_BATCH_SIZE,
+               block_identifier='latest') -> List[Tuple[bool, bytes]]:
+    """按 batch_size 分批执行 aggregate3，返回与 calls 顺序一致的 (success, returnData) 列表。
+    单个子调用 revert 不会影响同批次的其他调用。
+    """
+    results: List[Tuple[bool, bytes]] = []
+    for start in range(0, len(calls), batch_size):
+        chunk = calls[start:start + batch_size]
+        raw = w3.eth.call({'to': MULTICALL3_ADDRESS, 'data': encode_aggregate3(chunk)}, block_identifier)
+        results.extend(decode_aggregate3(raw))
+    return results
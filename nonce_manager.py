@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+按账户在本地分配交易 nonce
+首次使用时读取一次 pending nonce，之后在本地递增，chain_id 永久缓存、gas_price 短时缓存，
+每笔交易省去 3 次以上 RPC 往返，多笔交易可以连续发出而无需等待前一笔上链；
+发送失败时归还 nonce 或与链上 pending nonce 重新对齐
+"""
+
+import heapq
+import threading
+import time
+import weakref
+from typing import Dict, Any, Optional
+
+from web3 import Web3
+
+DEFAULT_GAS_PRICE_TTL = 15
+
+# 表示本地 nonce 已落后于链上（或被其他程序占用）的节点错误信息
+_NONCE_ERRORS = ('nonce too low', 'already known', 'replacement transaction underpriced',
+                 'known transaction', 'nonce has already been used')
+
+
+class NonceManager:
+    def __init__(self, w3: Web3, address: str, gas_price_ttl: float = DEFAULT_GAS_PRICE_TTL):
+        self.w3 = w3
+        self.address = Web3.to_checksum_address(address)
+        self.gas_price_ttl = gas_price_ttl
+        self._lock = threading.Lock()
+        self._next_nonce: Optional[int] = None
+        # 已归还、可以优先复用的 nonce（小顶堆），避免出现空洞
+        self._released = []
+        self._chain_id: Optional[int] = None
+        self._gas_price: Optional[int] = None
+        self._gas_price_at = 0.0
+
+    # ---------- 缓存的链参数 ----------
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = int(self.w3.eth.chain_id)
+        return self._chain_id
+
+    @property
+    def gas_price(self) -> int:
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_price_at > self.gas_price_ttl:
+            self._gas_price = int(self.w3.eth.gas_price)
+            self._gas_price_at = now
+        return self._gas_price
+
+    def _pending_nonce(self) -> int:
+        return int(self.w3.eth.get_transaction_count(self.address, 'pending'))
+
+    # ---------- 分配与回收 ----------
+    def reserve(self) -> int:
+        """分配一个 nonce，优先复用已归还的 nonce"""
+        with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+            if self._next_nonce is None:
+                self._next_nonce = self._pending_nonce()
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def release(self, nonce: int):
+        """交易未广播（签名/估算/发送被拒）时归还 nonce，供下一笔交易复用"""
+        with self._lock:
+            if self._next_nonce is not None and nonce == self._next_nonce - 1:
+                self._next_nonce -= 1
+            elif nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+
+    def sync(self):
+        """与链上 pending nonce 对齐：其他程序（或外部工具）用同一账户发过交易后调用"""
+        pending = self._pending_nonce()
+        with self._lock:
+            self._released = [n for n in self._released if n >= pending]
+            heapq.heapify(self._released)
+            if self._next_nonce is None or self._next_nonce < pending:
+                self._next_nonce = pending
+
+    def reset(self):
+        """丢弃本地状态，下次分配时重新读取 pending nonce（交易被丢弃或状态不确定时使用）"""
+        with self._lock:
+            self._next_nonce = None
+            self._released = []
+
+    def handle_send_error(self, nonce: int, error: BaseException):
+        """根据发送错误决定归还 nonce 还是与链上对齐"""
+        message = str(error).lower()
+        if any(pattern in message for pattern in _NONCE_ERRORS):
+            self.sync()
+        else:
+            self.release(nonce)
+
+    # ---------- 交易参数 ----------
+    def call_params(self, **extra) -> Dict[str, Any]:
+        """不含 nonce 的交易参数（from / chainId / gasPrice），用于 build_transaction"""
+        return {'from': self.address, 'chainId': self.chain_id, 'gasPrice': self.gas_price, **extra}
+
+    def tx_params(self, **extra) -> Dict[str, Any]:
+        """包含新分配 nonce 的完整交易参数"""
+        return {**self.call_params(**extra), 'nonce': self.reserve()}
+
+
+_managers = weakref.WeakKeyDictionary()
+_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(w3: Web3, address: str) -> NonceManager:
+    """同一个 Web3 实例上的同一账户共享一个 NonceManager"""
+    address = Web3.to_checksum_address(address)
+    with _managers_lock:
+        per_w3 = _managers.setdefault(w3, {})
+        if address not in per_w3:
+            per_w3[address] = NonceManager(w3, address)
+        return per_w3[address]
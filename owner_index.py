@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+基于 Transfer 事件的 PositionManager 持有人索引
+通过分段 eth_getLogs 增量读取 Transfer 日志，维护 owner -> tokenIds 映射并持久化到 SQLite，
+记录最后处理的区块，之后只需从该区块追赶即可；
+销毁的 tokenId 保留持有人为零地址的记录（含区块号），链重组时与其他受影响的 tokenId 一起恢复
+"""
+
+import argparse
+import sqlite3
+import threading
+from typing import List, Optional
+
+from eth_abi import decode
+from web3 import Web3
+
+from multicall import aggregate3, function_selector
+
+DEFAULT_INDEX_PATH = 'owner_index.sqlite3'
+
+# Transfer(address indexed from, address indexed to, uint256 indexed tokenId)
+TRANSFER_TOPIC = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+OWNER_OF_SELECTOR = function_selector("ownerOf(uint256)")
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 50000
+MIN_CHUNK_SIZE = 1
+
+
+def _topic_to_address(topic) -> str:
+    return Web3.to_checksum_address('0x' + bytes(topic)[-20:].hex())
+
+
+def find_deployment_block(w3: Web3, address: str, to_block: Optional[int] = None) -> int:
+    """按 eth_getCode 二分查找合约的部署区块（需要归档节点），作为首次建立索引的 start_block"""
+    address = Web3.to_checksum_address(address)
+    high = w3.eth.block_number if to_block is None else int(to_block)
+    if not w3.eth.get_code(address, block_identifier=high):
+        raise ValueError(f"区块 {high} 上 {address} 没有合约代码")
+    low = 0
+    while low < high:
+        mid = (low + high) // 2
+        if w3.eth.get_code(address, block_identifier=mid):
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+
+class OwnerIndex:
+    """PositionManager 的 tokenId 持有人索引，每个索引文件只对应一个 PositionManager。
+    首次建立时从 start_block 开始，未指定时从 PositionManager 部署区块开始
+    """
+
+    def __init__(self, w3: Web3, position_manager: str, path: str = DEFAULT_INDEX_PATH,
+                 start_block: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.w3 = w3
+        self.position_manager = Web3.to_checksum_address(position_manager)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS owners (
+                token_id INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                block_number INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_owners_owner ON owners (owner);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        ''')
+        if self.last_block is None:
+            if start_block is None:
+                start_block = find_deployment_block(w3, self.position_manager)
+                print(f"🔎 PositionManager 部署区块: {start_block}")
+            self._set_last_block(start_block - 1)
+        self._conn.commit()
+
+    # ---------- 元数据 ----------
+    @property
+    def last_block(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row[0]) if row else None
+
+    def _set_last_block(self, block_number: int):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_block', ?)", (str(int(block_number)),))
+
+    # ---------- 查询 ----------
+    def token_ids_of(self, owner: str) -> List[int]:
+        if Web3.to_checksum_address(owner) == ZERO_ADDRESS:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT token_id FROM owners WHERE owner = ? ORDER BY token_id',
+                (Web3.to_checksum_address(owner),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def latest_token_of(self, owner: str) -> Optional[int]:
+        """返回 owner 持有的最大 tokenId（即最新铸造的头寸）"""
+        if Web3.to_checksum_address(owner) == ZERO_ADDRESS:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(token_id) FROM owners WHERE owner = ?', (Web3.to_checksum_address(owner),)
+            ).fetchone()
+        return row[0]
+
+    def owner_of(self, token_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT owner FROM owners WHERE token_id = ?', (int(token_id),)).fetchone()
+        return row[0] if row and row[0] != ZERO_ADDRESS else None
+
+    # ---------- 增量同步 ----------
+    def _get_logs(self, from_block: int, to_block: int):
+        return self.w3.eth.get_logs({
+            'address': self.position_manager,
+            'topics': [TRANSFER_TOPIC],
+            'fromBlock': from_block,
+            'toBlock': to_block,
+        })
+
+    def _apply_logs(self, logs, to_block: int):
+        """按区块与日志顺序应用 Transfer，并在同一事务中推进 last_block；
+        销毁（转给零地址）记为零地址持有，保留区块号供链重组时回滚
+        """
+        logs = sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex']))
+        with self._lock:
+            for log in logs:
+                token_id = int.from_bytes(bytes(log['topics'][3]), 'big')
+                to_address = _topic_to_address(log['topics'][2])
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO owners VALUES (?, ?, ?)',
+                    (token_id, to_address, int(log['blockNumber']))
+                )
+            self._set_last_block(to_block)
+            self._conn.commit()
+
+    def catch_up(self, to_block: Optional[int] = None) -> int:
+        """从 last_block + 1 追赶到 to_block（默认最新区块），返回处理的 Transfer 数量。
+        节点因结果过多或区间过大拒绝请求时自动缩小分段，成功后逐步放大
+        """
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+        processed = 0
+        from_block = self.last_block + 1
+        chunk = self.chunk_size
+        while from_block <= to_block:
+            end = min(from_block + chunk - 1, to_block)
+            try:
+                logs = self._get_logs(from_block, end)
+            except Exception as e:
+                if chunk <= MIN_CHUNK_SIZE:
+                    raise
+                chunk = max(MIN_CHUNK_SIZE, chunk // 2)
+                print(f"   ⚠️ eth_getLogs 失败，分段缩小到 {chunk} 个区块 - {e}")
+                continue
+            self._apply_logs(logs, end)
+            processed += len(logs)
+            from_block = end + 1
+            chunk = min(MAX_CHUNK_SIZE, chunk * 2) if len(logs) < 1000 else chunk
+        return processed
+
+    # ---------- 链重组 ----------
+    def invalidate_after(self, block_number: int):
+        """链重组时回退到 block_number：删除分叉点之后的 Transfer 结果，
+        受影响的 tokenId（包括分叉点之后销毁的）按分叉点区块上的 ownerOf 恢复持有人（此时尚未铸造或已销毁的直接删除），
+        last_block 回退到分叉点，下次 catch_up 从分叉点之后重新读取日志
+        """
+        block_number = int(block_number)
+        with self._lock:
+            affected = [row[0] for row in self._conn.execute(
+                'SELECT token_id FROM owners WHERE block_number > ?', (block_number,)
+            ).fetchall()]
+        restored = []
+        if affected:
+            calls = [(self.position_manager, OWNER_OF_SELECTOR + token_id.to_bytes(32, 'big')) for token_id in affected]
+            for token_id, (ok, data) in zip(affected, aggregate3(self.w3, calls, block_identifier=block_number)):
+                if ok:
+                    restored.append((token_id, Web3.to_checksum_address(decode(['address'], data)[0]), block_number))
+        with self._lock:
+            self._conn.execute('DELETE FROM owners WHERE block_number > ?', (block_number,))
+            self._conn.executemany('INSERT OR REPLACE INTO owners VALUES (?, ?, ?)', restored)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+            if row is None or int(row[0]) > block_number:
+                self._set_last_block(block_number)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    from client_registry import get_web3, POSITION_MANAGER_ADDRESS
+
+    parser = argparse.ArgumentParser(description="建立 / 追赶 PositionManager 持有人索引（首次建立时从部署区块回填）")
+    parser.add_argument('--rpc', default=None, help="RPC 地址，多个用逗号分隔，默认 BSC 公共节点")
+    parser.add_argument('--position-manager', default=POSITION_MANAGER_ADDRESS)
+    parser.add_argument('--path', default=DEFAULT_INDEX_PATH, help="索引文件路径")
+    parser.add_argument('--start-block', type=int, default=None,
+                        help="首次建立索引的起始区块，默认通过 eth_getCode 查找部署区块（需要归档节点）")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    index = OwnerIndex(get_web3(args.rpc), args.position_manager, args.path, args.start_block, args.chunk_size)
+    print(f"🚀 从区块 {index.last_block + 1} 开始追赶 Transfer 日志...")
+    processed = index.catch_up()
+    print(f"✅ 已处理 {processed} 条 Transfer，索引至区块 {index.last_block}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
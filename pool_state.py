@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+按区块缓存的 V4 池子状态服务
+一次 Multicall 读取多个 PoolId 的 StateView.getSlot0 / getLiquidity / getFeeGrowthGlobals，
+结果按区块号缓存并在进程内共享：同一区块内任意多次查询 tick 只需一次链上调用，
+并发调用方共享同一次读取；也可缓存任意按区块读取的值（如 V3 池子的 slot0）
+"""
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from eth_abi import decode
+from web3 import Web3
+
+from abi_table import function
+from multicall import aggregate3
+
+# 各链 v4 StateView 部署地址
+STATE_VIEW_ADDRESSES = {
+    56: Web3.to_checksum_address("0xd13dd3d6e93f276fafc9db9e6bb47c1180aee0c4"),
+    130: Web3.to_checksum_address("0x86e8631a016f9068c3f085faf484ee3f5fdee8f2"),
+}
+
+# 默认费率对应的 tickSpacing（无 hooks 的标准池子）
+TICK_SPACING_BY_FEE = {100: 1, 500: 10, 3000: 60, 10000: 200}
+
+DEFAULT_BLOCK_TTL = 1.0      # 区块号的复用时间（秒），不超过出块间隔
+DEFAULT_KEEP_BLOCKS = 4      # 保留最近几个区块的缓存，供固定区块的读取使用
+
+_SLOT0 = function('StateView', 'getSlot0')
+_LIQUIDITY = function('StateView', 'getLiquidity')
+_FEE_GROWTH = function('StateView', 'getFeeGrowthGlobals')
+
+
+@dataclass(frozen=True)
+class PoolState:
+    pool_id: str
+    block_number: int
+    sqrt_price_x96: int
+    tick: int
+    protocol_fee: int
+    lp_fee: int
+    liquidity: int
+    fee_growth_global0_x128: int
+    fee_growth_global1_x128: int
+
+    @property
+    def initialized(self) -> bool:
+        return self.sqrt_price_x96 != 0
+
+
+def _pool_id_bytes(pool_id) -> bytes:
+    if isinstance(pool_id, str):
+        return bytes.fromhex(pool_id[2:] if pool_id.startswith('0x') else pool_id)
+    return bytes(pool_id)
+
+
+def _normalize_pool_id(pool_id) -> str:
+    return '0x' + _pool_id_bytes(pool_id).hex()
+
+
+class PoolStateService:
+    def __init__(self, w3: Web3, state_view: Optional[str] = None, block_ttl: float = DEFAULT_BLOCK_TTL,
+                 keep_blocks: int = DEFAULT_KEEP_BLOCKS):
+        self.w3 = w3
+        self._state_view = Web3.to_checksum_address(state_view) if state_view else None
+        self.block_ttl = block_ttl
+        self.keep_blocks = keep_blocks
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._block: Optional[int] = None
+        self._block_at = 0.0
+        # {区块号: {键: 值}}，键为 PoolId 或自定义缓存键
+        self._cache: Dict[int, Dict[Hashable, Any]] = {}
+
+    @property
+    def state_view(self) -> str:
+        if self._state_view is None:
+            chain_id = int(self.w3.eth.chain_id)
+            if chain_id not in STATE_VIEW_ADDRESSES:
+                raise ValueError(f"链 {chain_id} 未配置 StateView 地址，请显式传入 state_view")
+            self._state_view = STATE_VIEW_ADDRESSES[chain_id]
+        return self._state_view
+
+    # ---------- 区块 ----------
+    def current_block(self) -> int:
+        """最新区块号，在 block_ttl 秒内复用，避免每次查询都请求 eth_blockNumber"""
+        now = time.monotonic()
+        with self._lock:
+            if self._block is not None and now - self._block_at < self.block_ttl:
+                return self._block
+        block = int(self.w3.eth.block_number)
+        with self._lock:
+            if self._block is None or block >= self._block:
+                self._block, self._block_at = block, now
+            return self._block
+
+    def _block_cache(self, block_number: int) -> Dict[Hashable, Any]:
+        with self._lock:
+            entries = self._cache.get(block_number)
+            if entries is None:
+                entries = self._cache[block_number] = {}
+                for stale in sorted(self._cache)[:-self.keep_blocks]:
+                    del self._cache[stale]
+            return entries
+
+    def invalidate_after(self, block_number: int):
+        """链重组时丢弃 block_number 之后的缓存"""
+        with self._lock:
+            for cached in [b for b in self._cache if b > block_number]:
+                del self._cache[cached]
+            if self._block is not None and self._block > block_number:
+                self._block = None
+
+    # ---------- 池子状态 ----------
+    def get_states(self, pool_ids: Iterable, block_number: Optional[int] = None) -> Dict[str, PoolState]:
+        """批量读取池子状态，只对当前区块缓存中缺少的 PoolId 发起一次 Multicall"""
+        pool_ids = list(dict.fromkeys(_normalize_pool_id(p) for p in pool_ids))
+        block_number = self.current_block() if block_number is None else int(block_number)
+        entries = self._block_cache(block_number)
+        missing = [p for p in pool_ids if p not in entries]
+        if missing:
+            # 并发调用方排队等待同一次读取，读取完成后直接命中缓存
+            with self._fetch_lock:
+                missing = [p for p in missing if p not in entries]
+                if missing:
+                    entries.update(self._fetch(missing, block_number))
+        return {p: entries[p] for p in pool_ids if p in entries}
+
+    def get_state(self, pool_id, block_number: Optional[int] = None) -> Optional[PoolState]:
+        return self.get_states([pool_id], block_number).get(_normalize_pool_id(pool_id))
+
+    def get_tick(self, pool_id, block_number: Optional[int] = None) -> Optional[int]:
+        state = self.get_state(pool_id, block_number)
+        return state.tick if state is not None and state.initialized else None
+
+    def _fetch(self, pool_ids: List[str], block_number: int) -> Dict[str, PoolState]:
+        calls = []
+        for pool_id in pool_ids:
+            raw_id = _pool_id_bytes(pool_id)
+            for spec in (_SLOT0, _LIQUIDITY, _FEE_GROWTH):
+                calls.append((self.state_view, spec.selector + raw_id))
+        results = aggregate3(self.w3, calls, block_identifier=block_number)
+        states = {}
+        for i, pool_id in enumerate(pool_ids):
+            (ok0, slot0), (ok1, liquidity), (ok2, fee_growth) = results[3 * i:3 * i + 3]
+            if not (ok0 and ok1 and ok2):
+                continue
+            sqrt_price_x96, tick, protocol_fee, lp_fee = decode(list(_SLOT0.outputs), slot0)
+            (liquidity,) = decode(list(_LIQUIDITY.outputs), liquidity)
+            growth0, growth1 = decode(list(_FEE_GROWTH.outputs), fee_growth)
+            states[pool_id] = PoolState(pool_id, block_number, sqrt_price_x96, tick, protocol_fee, lp_fee,
+                                        liquidity, growth0, growth1)
+        return states
+
+    # ---------- 通用按区块缓存 ----------
+    def cached(self, key: Hashable, fetch: Callable[[int], Any], block_number: Optional[int] = None):
+        """按区块缓存任意只读结果：fetch(block_number) 在每个区块内只执行一次"""
+        block_number = self.current_block() if block_number is None else int(block_number)
+        entries = self._block_cache(block_number)
+        cache_key = ('cached', key)
+        if cache_key not in entries:
+            with self._fetch_lock:
+                if cache_key not in entries:
+                    entries[cache_key] = fetch(block_number)
+        return entries[cache_key]
+
+
+_services = weakref.WeakKeyDictionary()
+_services_lock = threading.Lock()
+
+
+def get_pool_state_service(w3: Web3) -> PoolStateService:
+    """同一个 Web3 实例共享一个池子状态服务（及其区块缓存）"""
+    with _services_lock:
+        service = _services.get(w3)
+        if service is None:
+            service = _services[w3] = PoolStateService(w3)
+        return service
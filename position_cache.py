@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Position 信息的本地 SQLite 缓存
+PoolKey 对同一个 tokenId 永远不变，永久保存；
+liquidity / position_info 记录读取时的区块号，按字段的新鲜度策略判断是否需要重新读取
+"""
+
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+DEFAULT_CACHE_PATH = 'position_cache.sqlite3'
+
+# 各字段允许的最大区块差，None 表示永久有效
+# BSC 约 3 秒一个区块：liquidity 约 1 分钟内有效，position_info（tick 范围 + 订阅标志）约 1 小时内有效
+DEFAULT_FRESHNESS = {
+    'pool_key': None,
+    'position_info': 1200,
+    'liquidity': 20,
+}
+
+POOL_KEY_FIELDS = ('currency0', 'currency1', 'fee', 'tick_spacing', 'hooks')
+STATE_FIELDS = ('liquidity', 'position_info')
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+
+class PositionCache:
+    """按 tokenId 缓存 PoolKey 与按区块标记的状态字段"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, freshness: Optional[Dict[str, Optional[int]]] = None):
+        self.path = path
+        self.freshness = dict(DEFAULT_FRESHNESS)
+        if freshness:
+            self.freshness.update(freshness)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS pool_keys (
+                token_id INTEGER PRIMARY KEY,
+                currency0 TEXT NOT NULL,
+                currency1 TEXT NOT NULL,
+                fee INTEGER NOT NULL,
+                tick_spacing INTEGER NOT NULL,
+                hooks TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS position_state (
+                token_id INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                PRIMARY KEY (token_id, field)
+            );
+        ''')
+        self._conn.commit()
+
+    # ---------- 读取 ----------
+    def get_pool_key(self, token_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT currency0, currency1, fee, tick_spacing, hooks FROM pool_keys WHERE token_id = ?',
+                (int(token_id),)
+            ).fetchone()
+        return dict(zip(POOL_KEY_FIELDS, row)) if row else None
+
+    def is_fresh(self, field: str, read_block: int, current_block: int) -> bool:
+        max_age = self.freshness.get(field)
+        return max_age is None or current_block - read_block <= max_age
+
+    def get_fields(self, token_id: int, current_block: int) -> Dict[str, int]:
+        """返回仍然新鲜的状态字段 {field: value}"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT field, value, block_number FROM position_state WHERE token_id = ?',
+                (int(token_id),)
+            ).fetchall()
+        return {field: int(value) for field, value, block in rows if self.is_fresh(field, block, current_block)}
+
+    def stale_fields(self, token_id: int, current_block: int) -> set:
+        """返回需要重新读取的字段集合（pool_key 与状态字段）"""
+        return self.lookup(token_id, current_block)[0]
+
+    def lookup(self, token_id: int, current_block: int) -> Tuple[set, Dict[str, Any]]:
+        """返回 (需要重新读取的字段集合, 已缓存且新鲜的字段)"""
+        cached = dict(self.get_pool_key(token_id) or {})
+        cached.update(self.get_fields(token_id, current_block))
+        stale = set(STATE_FIELDS) - set(cached)
+        if 'currency0' not in cached:
+            stale.add('pool_key')
+        return stale, cached
+
+    def get_position(self, token_id: int, current_block: int) -> Optional[Dict[str, Any]]:
+        """所有字段均新鲜时，返回与 batch_query_positions.query_single_position 相同格式的结果字典"""
+        pool_key = self.get_pool_key(token_id)
+        fields = self.get_fields(token_id, current_block)
+        if pool_key is None or len(fields) < len(STATE_FIELDS):
+            return None
+        return {'token_id': token_id, 'liquidity': fields['liquidity'], **pool_key,
+                'position_info': fields['position_info'], 'status': 'success'}
+
+    # ---------- 写入 ----------
+    def put_pool_key(self, token_id: int, pool_key: Dict[str, Any]):
+        if _is_empty_pool_key(pool_key):
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pool_keys VALUES (?, ?, ?, ?, ?, ?)',
+                (int(token_id), *(pool_key[f] for f in POOL_KEY_FIELDS))
+            )
+            self._conn.commit()
+
+    def put_fields(self, token_id: int, values: Dict[str, int], block_number: int):
+        """写入在 block_number 读取到的状态字段"""
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO position_state VALUES (?, ?, ?, ?)',
+                [(int(token_id), field, str(int(value)), int(block_number)) for field, value in values.items()]
+            )
+            self._conn.commit()
+
+    def put_refreshed(self, result: Dict[str, Any], stale: set, block_number: int):
+        """只写回本次实际重新读取的字段，保留其他字段原有的区块标记。
+        getPoolAndPositionInfo 同时返回 PoolKey 与 position_info，两者任一过期时会一并刷新
+        """
+        refreshed = {}
+        if 'liquidity' in stale:
+            refreshed['liquidity'] = result['liquidity']
+        if stale & {'pool_key', 'position_info'}:
+            self.put_pool_key(result['token_id'], result)
+            refreshed['position_info'] = result['position_info']
+        if refreshed:
+            self.put_fields(result['token_id'], refreshed, block_number)
+
+    def put_positions(self, results: Iterable[Dict[str, Any]], block_number: int):
+        """在一个事务中写入 query_single_position 格式的成功结果"""
+        pool_keys, states = [], []
+        for result in results:
+            if result.get('status') != 'success':
+                continue
+            token_id = int(result['token_id'])
+            if not _is_empty_pool_key(result):
+                pool_keys.append((token_id, *(result[f] for f in POOL_KEY_FIELDS)))
+            states.extend((token_id, f, str(int(result[f])), int(block_number)) for f in STATE_FIELDS)
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO pool_keys VALUES (?, ?, ?, ?, ?, ?)', pool_keys)
+            self._conn.executemany('INSERT OR REPLACE INTO position_state VALUES (?, ?, ?, ?)', states)
+            self._conn.commit()
+
+    def put_position(self, result: Dict[str, Any], block_number: int):
+        self.put_positions([result], block_number)
+
+    # ---------- 链重组 ----------
+    def invalidate_after(self, block_number: int):
+        """链重组时删除 block_number 之后读取的状态字段。
+        PoolKey 本身不记录区块：只有全部状态字段都在分叉点之后读取的 tokenId 可能铸造于被丢弃的区块，
+        一并删除其 PoolKey 重新读取，其余 tokenId 的 PoolKey 不受影响
+        """
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM pool_keys WHERE token_id IN '
+                '(SELECT token_id FROM position_state GROUP BY token_id HAVING MIN(block_number) > ?)',
+                (int(block_number),)
+            )
+            self._conn.execute('DELETE FROM position_state WHERE block_number > ?', (int(block_number),))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _is_empty_pool_key(pool_key: Dict[str, Any]) -> bool:
+    """未铸造或已销毁的 tokenId 返回空 PoolKey，不能永久缓存"""
+    return pool_key['tick_spacing'] == 0 and pool_key['currency1'] == ZERO_ADDRESS
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+PositionInfo 位域解码
+v4 PositionManager 将 PositionInfo 打包为一个 uint256:
+| 200 bits poolId (bytes25) | 24 bits tickUpper | 24 bits tickLower | 8 bits hasSubscriber |
+提供单个解码与基于 NumPy 的批量列式解码
+"""
+
+from typing import Dict, Any, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # 批量解码需要 numpy，单个解码不依赖
+    np = None
+
+TICK_LOWER_OFFSET = 8
+TICK_UPPER_OFFSET = 32
+POOL_ID_OFFSET = 56
+MASK_8_BITS = 0xFF
+MASK_24_BITS = 0xFFFFFF
+
+
+def _signextend_24(value: int) -> int:
+    return value - (1 << 24) if value & 0x800000 else value
+
+
+def decode_position_info(info: int) -> Dict[str, Any]:
+    """解码单个 PositionInfo，poolId 以 0x 前缀的 25 字节十六进制返回"""
+    info = int(info)
+    return {
+        'pool_id': '0x' + (info >> POOL_ID_OFFSET).to_bytes(25, 'big').hex(),
+        'tick_upper': _signextend_24((info >> TICK_UPPER_OFFSET) & MASK_24_BITS),
+        'tick_lower': _signextend_24((info >> TICK_LOWER_OFFSET) & MASK_24_BITS),
+        'has_subscriber': bool(info & MASK_8_BITS),
+    }
+
+
+def pack_position_info(pool_id: Union[str, bytes], tick_lower: int, tick_upper: int,
+                       has_subscriber: bool = False) -> int:
+    """按合约布局打包 PositionInfo，pool_id 取 32 字节 PoolId 的前 25 字节"""
+    if isinstance(pool_id, str):
+        pool_id = bytes.fromhex(pool_id[2:] if pool_id.startswith('0x') else pool_id)
+    return (
+        (int.from_bytes(pool_id[:25], 'big') << POOL_ID_OFFSET)
+        | ((int(tick_upper) & MASK_24_BITS) << TICK_UPPER_OFFSET)
+        | ((int(tick_lower) & MASK_24_BITS) << TICK_LOWER_OFFSET)
+        | (1 if has_subscriber else 0)
+    )
+
+
+def _to_word_matrix(infos) -> 'np.ndarray':
+    """将输入转换为 (N, 32) 的 uint8 大端字节矩阵"""
+    if isinstance(infos, (bytes, bytearray, memoryview)):
+        buf = bytes(infos)
+        if len(buf) % 32:
+            raise ValueError("打包数据长度必须是 32 字节的整数倍")
+        return np.frombuffer(buf, dtype=np.uint8).reshape(-1, 32)
+    if isinstance(infos, np.ndarray) and infos.dtype == np.uint8 and infos.ndim == 2:
+        return infos
+    buf = b''.join(int(info).to_bytes(32, 'big') for info in infos)
+    return np.frombuffer(buf, dtype=np.uint8).reshape(-1, 32)
+
+
+def _tick_column(words: 'np.ndarray', start: int) -> 'np.ndarray':
+    raw = ((words[:, start].astype(np.int32) << 16)
+           | (words[:, start + 1].astype(np.int32) << 8)
+           | words[:, start + 2].astype(np.int32))
+    return (raw ^ 0x800000) - 0x800000
+
+
+def decode_position_info_bulk(infos: Union[Sequence[int], bytes, 'np.ndarray']) -> Dict[str, 'np.ndarray']:
+    """批量解码 PositionInfo，返回列式数组:
+    pool_id (N, 25) uint8, tick_lower / tick_upper int32, has_subscriber bool。
+    infos 可以是 uint256 整数序列、连续的 32 字节大端打包数据（如 eth_call 返回值），
+    或 (N, 32) uint8 矩阵；后两种输入不经过逐行 Python 整数运算
+    """
+    if np is None:
+        raise ImportError("批量解码需要安装 numpy: pip install numpy")
+    words = _to_word_matrix(infos)
+    return {
+        'pool_id': words[:, :25],
+        # 字节 25-27 为 tickUpper，字节 28-30 为 tickLower，字节 31 为 hasSubscriber
+        'tick_upper': _tick_column(words, 25),
+        'tick_lower': _tick_column(words, 28),
+        'has_subscriber': words[:, 31] != 0,
+    }
+
+
+def in_range_mask(columns: Dict[str, 'np.ndarray'], current_tick: int) -> 'np.ndarray':
+    """当前 tick 处于 [tickLower, tickUpper) 区间内的头寸掩码"""
+    return (columns['tick_lower'] <= current_tick) & (current_tick < columns['tick_upper'])
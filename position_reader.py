@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+单个 Position 的读取（各查询脚本共用）
+getPositionLiquidity 与 getPoolAndPositionInfo 固定在同一区块，通过快照合并为一个 JSON-RPC 批量请求；
+合约实例来自进程级注册表，传入 position_cache.PositionCache 时只重新读取已过期的字段
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from position_cache import POOL_KEY_FIELDS, STATE_FIELDS
+from snapshot import snapshot
+
+ALL_FIELDS = frozenset(('pool_key',) + STATE_FIELDS)
+
+
+def read_position(w3, token_id: int, contract=None, cache=None, block_number: Optional[int] = None,
+                  fresh_fields: Iterable[str] = ()) -> Tuple[Dict[str, Any], Set[str]]:
+    """返回 (结果, 本次从链上读取的字段集合)。
+    结果格式与 batch_query_positions.query_single_position 相同（不含 status），另含读取区块 block_number；
+    contract 默认为注册表中的 BSC PositionManager，fresh_fields 中的字段即使缓存仍新鲜也重新读取
+    """
+    if contract is None:
+        from client_registry import get_position_manager
+        contract = get_position_manager(w3)
+
+    with snapshot(w3, block_number) as snap:
+        block_number = snap.block_number
+        stale, cached = set(ALL_FIELDS), {}
+        if cache is not None:
+            stale, cached = cache.lookup(token_id, block_number)
+            stale |= set(fresh_fields)
+        if 'liquidity' in stale:
+            liquidity_call = snap.call(contract.functions.getPositionLiquidity(token_id))
+        if stale & {'pool_key', 'position_info'}:
+            pool_info_call = snap.call(contract.functions.getPoolAndPositionInfo(token_id))
+
+    liquidity = liquidity_call.result() if 'liquidity' in stale else cached['liquidity']
+    if stale & {'pool_key', 'position_info'}:
+        pool_key, position_info = pool_info_call.result()
+    else:
+        pool_key, position_info = [cached[f] for f in POOL_KEY_FIELDS], cached['position_info']
+
+    result = {'token_id': token_id, 'liquidity': liquidity, **dict(zip(POOL_KEY_FIELDS, pool_key)),
+              'position_info': position_info}
+    if cache is not None:
+        cache.put_refreshed(result, stale, block_number)
+    result['block_number'] = block_number
+    return result, stale
@@ -230,6 +230,7 @@ let web3;
 let currentNetwork = 'base';
 let currentAccount;
 let currentPrice = 0;
+let currentSqrtPriceX96 = 0n;
 
 // 工具函数
 function showError(message) {
@@ -263,24 +264,96 @@ function calculatePriceFromSqrtPriceX96(sqrtPriceX96, decimals0 = 18, decimals1
     return price;
 }
 
-// 价格转tick
-function priceToTick(price, decimals0 = 18, decimals1 = 6) {
-    const decimalAdjustedPrice = price * (10 ** decimals1 / 10 ** decimals0);
-    return Math.floor(Math.log(decimalAdjustedPrice) / Math.log(1.0001));
+// ---------- TickMath（BigInt 整数实现，与合约逐位一致）----------
+const MIN_TICK = -887272;
+const MAX_TICK = 887272;
+const MIN_SQRT_PRICE = 4295128739n;
+const MAX_SQRT_PRICE = 1461446703485210103287273052203988822378723970342n;
+const MAX_UINT256 = (1n << 256n) - 1n;
+const TICK_FACTORS = [
+    [0x2, 0xfff97272373d413259a46990580e213an],
+    [0x4, 0xfff2e50f5f656932ef12357cf3c7fdccn],
+    [0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0n],
+    [0x10, 0xffcb9843d60f6159c9db58835c926644n],
+    [0x20, 0xff973b41fa98c081472e6896dfb254c0n],
+    [0x40, 0xff2ea16466c96a3843ec78b326b52861n],
+    [0x80, 0xfe5dee046a99a2a811c461f1969c3053n],
+    [0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4n],
+    [0x200, 0xf987a7253ac413176f2b074cf7815e54n],
+    [0x400, 0xf3392b0822b70005940c7a398e4b70f3n],
+    [0x800, 0xe7159475a2c29b7443b29c7fa6e889d9n],
+    [0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825n],
+    [0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5n],
+    [0x4000, 0x70d869a156d2a1b890bb3df62baf32f7n],
+    [0x8000, 0x31be135f97d08fd981231505542fcfa6n],
+    [0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9n],
+    [0x20000, 0x5d6af8dedb81196699c329225ee604n],
+    [0x40000, 0x2216e584f5fa1ea926041bedfe98n],
+    [0x80000, 0x48a170391f7dc42444e8fa2n]
+];
+
+// 整数平方根（向下取整）
+function bigIntSqrt(value) {
+    if (value < 2n) return value;
+    let x = 1n << BigInt(Math.ceil(value.toString(2).length / 2));
+    while (true) {
+        const y = (x + value / x) >> 1n;
+        if (y >= x) return x;
+        x = y;
+    }
+}
+
+// TickMath.getSqrtPriceAtTick
+function getSqrtPriceAtTick(tick) {
+    if (tick < MIN_TICK || tick > MAX_TICK) {
+        throw new Error(`tick 超出范围: ${tick}`);
+    }
+    const absTick = Math.abs(tick);
+    let price = absTick & 0x1 ? 0xfffcb933bd6fad37aa2d162d1a594001n : 1n << 128n;
+    for (const [bit, factor] of TICK_FACTORS) {
+        if (absTick & bit) price = (price * factor) >> 128n;
+    }
+    if (tick > 0) price = MAX_UINT256 / price;
+    return (price >> 32n) + (price & 0xffffffffn ? 1n : 0n);
 }
 
-// tick转价格
-function tickToPrice(tick, decimals0 = 18, decimals1 = 6) {
-    const price = 1.0001 ** tick;
-    return price * (10 ** decimals0 / 10 ** decimals1);
+// TickMath.getTickAtSqrtPrice：满足 getSqrtPriceAtTick(tick) <= sqrtPriceX96 的最大 tick
+function getTickAtSqrtPrice(sqrtPriceX96) {
+    sqrtPriceX96 = BigInt(sqrtPriceX96);
+    if (sqrtPriceX96 < MIN_SQRT_PRICE || sqrtPriceX96 >= MAX_SQRT_PRICE) {
+        throw new Error(`sqrtPriceX96 超出范围: ${sqrtPriceX96}`);
+    }
+    const price = sqrtPriceX96 << 32n;
+    const msb = BigInt(price.toString(2).length - 1);
+    let r = msb >= 128n ? price >> (msb - 127n) : price << (127n - msb);
+    let log2 = (msb - 128n) << 64n;
+    for (let shift = 63n; shift >= 50n; shift--) {
+        r = (r * r) >> 127n;
+        const f = r >> 128n;
+        log2 |= f << shift;
+        r >>= f;
+    }
+    const logSqrt10001 = log2 * 255738958999603826347141n;
+    const tickLow = Number((logSqrt10001 - 3402992956809132418596140100660247210n) >> 128n);
+    const tickHi = Number((logSqrt10001 + 291339464771989622907027621153398088495n) >> 128n);
+    if (tickLow === tickHi) return tickLow;
+    return getSqrtPriceAtTick(tickHi) <= sqrtPriceX96 ? tickHi : tickLow;
 }
 
-// 获取tick范围
-function getTickRange(currentTick, percentage) {
-    const tickRange = Math.floor(Math.log(1 + percentage) / Math.log(1.0001));
+// 获取tick范围：价格上下浮动 percentage，在 sqrtPriceX96 上做整数运算后对齐到 tickSpacing
+function getTickRange(sqrtPriceX96, percentage, tickSpacing = 1) {
+    const denominator = 1000000n;
+    const numerator = BigInt(Math.round(percentage * 1000000));
+    const priceX192 = BigInt(sqrtPriceX96) ** 2n;
+    const clamp = (value) => value < MIN_SQRT_PRICE ? MIN_SQRT_PRICE : (value >= MAX_SQRT_PRICE ? MAX_SQRT_PRICE - 1n : value);
+    const lowerFactor = numerator < denominator ? denominator - numerator : 0n;
+    const sqrtLower = clamp(bigIntSqrt(priceX192 * lowerFactor / denominator));
+    const sqrtUpper = clamp(bigIntSqrt(priceX192 * (denominator + numerator) / denominator));
+    const lowerTick = Math.floor(getTickAtSqrtPrice(sqrtLower) / tickSpacing) * tickSpacing;
+    const upperTick = Math.ceil(getTickAtSqrtPrice(sqrtUpper) / tickSpacing) * tickSpacing;
     return {
-        lowerTick: Math.floor(currentTick - tickRange),
-        upperTick: Math.floor(currentTick + tickRange)
+        lowerTick: Math.max(lowerTick, Math.ceil(MIN_TICK / tickSpacing) * tickSpacing),
+        upperTick: Math.min(upperTick, Math.floor(MAX_TICK / tickSpacing) * tickSpacing)
     };
 }
 
@@ -353,6 +426,7 @@ async function getCurrentPrice() {
         const slot0 = await stateViewContract.methods.getSlot0(poolKey).call();
         const sqrtPriceX96 = slot0.sqrtPriceX96;
         const tick = parseInt(slot0.tick);
+        currentSqrtPriceX96 = BigInt(sqrtPriceX96);
         
         // 根据代币对调整小数位
         let decimals0 = token0 === 'eth' ? 18 : 6;
@@ -464,8 +538,8 @@ async function createPosition() {
         // 计算tick范围
         const token0Decimals = token0 === 'eth' ? 18 : 6;
         const token1Decimals = token1 === 'eth' ? 18 : 6;
-        const currentTick = priceToTick(currentPrice, token0Decimals, token1Decimals);
-        const { lowerTick, upperTick } = getTickRange(currentTick, percentage);
+        const poolKey = createPoolKey(token0, token1, feeTier);
+        const { lowerTick, upperTick } = getTickRange(currentSqrtPriceX96, percentage, poolKey.tickSpacing);
         
         // 计算最小数量
         const amount0Min = Math.floor(amount0 * (1 - slippage) * (10 ** token0Decimals));
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+V4 头寸估值：根据 tick 范围、liquidity 与池子当前 sqrtPriceX96 / tick，
+按 Pool.modifyLiquidity 的整数规则（移除流动性时向下取整）计算可取回的 amount0 / amount1
+"""
+
+from typing import Dict, Any, Iterable, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 批量估值需要 numpy
+    np = None
+
+from web3 import Web3
+from eth_abi import encode
+
+from pool_state import get_pool_state_service
+from position_info_decoder import decode_position_info_bulk
+from tick_math import get_sqrt_price_at_tick, get_sqrt_prices_at_ticks, get_amount0_delta, get_amount1_delta
+
+def get_amounts_for_liquidity(sqrt_price_x96: int, current_tick: int, tick_lower: int, tick_upper: int,
+                              liquidity: int) -> Tuple[int, int]:
+    """与 Pool.modifyLiquidity 相同的分段规则:
+    tick < tickLower 时全部为 token0，tick >= tickUpper 时全部为 token1，区间内两者都有
+    """
+    sqrt_lower = get_sqrt_price_at_tick(tick_lower)
+    sqrt_upper = get_sqrt_price_at_tick(tick_upper)
+    if current_tick < tick_lower:
+        return get_amount0_delta(sqrt_lower, sqrt_upper, liquidity), 0
+    if current_tick < tick_upper:
+        return (get_amount0_delta(sqrt_price_x96, sqrt_upper, liquidity),
+                get_amount1_delta(sqrt_lower, sqrt_price_x96, liquidity))
+    return 0, get_amount1_delta(sqrt_lower, sqrt_upper, liquidity)
+
+
+def value_positions_bulk(tick_lower: Sequence[int], tick_upper: Sequence[int], liquidity: Sequence[int],
+                         sqrt_price_x96: int, current_tick: int) -> Dict[str, 'np.ndarray']:
+    """同一个池子内大量头寸的批量估值。
+    区间判断在 int32 数组上向量化完成；边界 sqrtPrice 只对去重后的 tick 计算一次；
+    金额计算使用 object 数组上的 Python 大整数运算，结果与逐个计算完全一致
+    """
+    if np is None:
+        raise ImportError("批量估值需要安装 numpy: pip install numpy")
+    lower = np.asarray(tick_lower, dtype=np.int32)
+    upper = np.asarray(tick_upper, dtype=np.int32)
+    liq = np.asarray([int(x) for x in liquidity], dtype=object)
+
+    # 去重后的 tick -> sqrtPrice 查表
+    ticks, inverse = np.unique(np.concatenate([lower, upper]), return_inverse=True)
+    sqrt_table = np.array(get_sqrt_prices_at_ticks(ticks), dtype=object)
+    sqrt_lower = sqrt_table[inverse[:len(lower)]]
+    sqrt_upper = sqrt_table[inverse[len(lower):]]
+
+    below = current_tick < lower
+    above = current_tick >= upper
+    inside = ~below & ~above
+
+    # token0 区间: 低于范围时 [lower, upper]，范围内时 [current, upper]
+    sqrt_a0 = np.where(inside, sqrt_price_x96, sqrt_lower)
+    # token1 区间: 高于范围时 [lower, upper]，范围内时 [lower, current]
+    sqrt_b1 = np.where(inside, sqrt_price_x96, sqrt_upper)
+
+    amount0 = np.zeros(len(lower), dtype=object)
+    amount1 = np.zeros(len(lower), dtype=object)
+    has0 = below | inside
+    has1 = above | inside
+    amount0[has0] = ((liq[has0] << 96) * (sqrt_upper[has0] - sqrt_a0[has0]) // sqrt_upper[has0]) // sqrt_a0[has0]
+    amount1[has1] = liq[has1] * (sqrt_b1[has1] - sqrt_lower[has1]) // (1 << 96)
+    return {'amount0': amount0, 'amount1': amount1, 'in_range': inside}
+
+
+def pool_id_of(result: Dict[str, Any]) -> str:
+    """PoolId = keccak256(abi.encode(PoolKey))，result 为 query_single_position 格式的结果"""
+    encoded = encode(['address', 'address', 'uint24', 'int24', 'address'],
+                     [result['currency0'], result['currency1'], result['fee'], result['tick_spacing'], result['hooks']])
+    return Web3.to_hex(Web3.keccak(encoded))
+
+
+def fetch_pool_states(w3: Web3, pool_ids: Iterable[str], block_identifier=None) -> Dict[str, Tuple[int, int]]:
+    """批量读取池子的 sqrtPriceX96 / tick，返回 {pool_id: (sqrtPriceX96, tick)}。
+    通过进程内共享的 pool_state 服务读取，同一区块内的重复查询直接命中缓存
+    """
+    block_number = None if block_identifier in (None, 'latest') else block_identifier
+    states = get_pool_state_service(w3).get_states(pool_ids, block_number)
+    return {pool_id: (state.sqrt_price_x96, state.tick) for pool_id, state in states.items()}
+
+
+def value_results(results: Iterable[Dict[str, Any]], pool_states: Dict[str, Tuple[int, int]]):
+    """为成功的查询结果补充 pool_id / amount0 / amount1 字段，按池子分组批量估值"""
+    by_pool: Dict[str, list] = {}
+    for result in results:
+        if result.get('status') != 'success':
+            continue
+        result['pool_id'] = pool_id_of(result)
+        by_pool.setdefault(result['pool_id'], []).append(result)
+
+    for pool_id, pool_results in by_pool.items():
+        if pool_id not in pool_states:
+            continue
+        sqrt_price_x96, current_tick = pool_states[pool_id]
+        columns = decode_position_info_bulk([r['position_info'] for r in pool_results])
+        amounts = value_positions_bulk(columns['tick_lower'], columns['tick_upper'],
+                                       [r['liquidity'] for r in pool_results], sqrt_price_x96, current_tick)
+        for r, amount0, amount1 in zip(pool_results, amounts['amount0'], amounts['amount1']):
+            r['amount0'] = int(amount0)
+            r['amount1'] = int(amount1)
@@ -8,18 +8,25 @@ import json
 import time
 from datetime import datetime, timezone
 from web3 import Web3
-from eth_abi import encode
+
+from position_cache import PositionCache, POOL_KEY_FIELDS, STATE_FIELDS
+from position_info_decoder import decode_position_info
+from unlock_encoder import encode_unlock_data_hex
+import client_registry
+from client_registry import get_contract
+from position_reader import read_position
+from chain_head import get_chain_head
+from rpc_pool import make_web3, CHAIN_ENDPOINTS, BSC_CHAIN_ID
 
 # BSC主网配置
 BSC_RPC_URL = "https://bsc-dataseed1.binance.org/"
+CACHE_PATH = "position_cache.sqlite3"  # 本地缓存文件，设为 None 关闭缓存
 POSITION_MANAGER_ADDRESS = "0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b"  # PositionManager合约地址
 
 def load_abi():
-    """加载PositionManager ABI"""
+    """加载PositionManager ABI（进程内只解析一次）"""
     try:
-        with open('PositionManager.json', 'r') as f:
-            abi = json.load(f)
-        return abi
+        return client_registry.load_abi('PositionManager.json')
     except FileNotFoundError:
         print("错误: 找不到 PositionManager.json 文件")
         return None
@@ -30,7 +37,7 @@ def load_abi():
 def init_web3():
     """初始化Web3连接"""
     try:
-        w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL))
+        w3 = make_web3([BSC_RPC_URL] + CHAIN_ENDPOINTS[BSC_CHAIN_ID])
         if not w3.is_connected():
             print("错误: 无法连接到BSC网络")
             return None
@@ -40,47 +47,34 @@ def init_web3():
         print(f"错误: 连接BSC网络失败 - {e}")
         return None
 
-def get_position_info(w3, contract, token_id):
-    """查询指定tokenId的位置信息"""
+def get_position_info(w3, contract, token_id, cache=None):
+    """查询指定tokenId的位置信息
+    传入 cache (position_cache.PositionCache) 时只缓存 PoolKey，状态字段始终在当前区块读取
+    """
     try:
         print(f"\n🔍 查询 Token ID: {token_id}")
         
-        # 1. 获取流动性
+        # 生成的 unlockData 会被直接发送：liquidity / position_info 始终在当前区块重新读取，
+        # 缓存只用于永不变化的 PoolKey
+        result, _ = read_position(w3, token_id, contract, cache, fresh_fields=STATE_FIELDS)
+        
+        # 1. 流动性
         print("📊 获取流动性信息...")
-        liquidity = contract.functions.getPositionLiquidity(token_id).call()
-        print(f"   流动性 (Liquidity): {liquidity}")
+        print(f"   流动性 (Liquidity): {result['liquidity']}")
         
-        # 2. 获取池子和位置信息
+        # 2. 池子和位置信息
         print("🏊 获取池子和位置信息...")
-        pool_info = contract.functions.getPoolAndPositionInfo(token_id).call()
-        
-        # 解析poolKey
-        pool_key = pool_info[0]  # poolKey是第一个元素
-        position_info = pool_info[1]  # positionInfo是第二个元素
-        
-        currency0 = pool_key[0]
-        currency1 = pool_key[1]
-        fee = pool_key[2]
-        tick_spacing = pool_key[3]
-        hooks = pool_key[4]
-        
-        print(f"   Currency0: {currency0}")
-        print(f"   Currency1: {currency1}")
-        print(f"   Fee: {fee}")
-        print(f"   Tick Spacing: {tick_spacing}")
-        print(f"   Hooks: {hooks}")
+        print(f"   Currency0: {result['currency0']}")
+        print(f"   Currency1: {result['currency1']}")
+        print(f"   Fee: {result['fee']}")
+        print(f"   Tick Spacing: {result['tick_spacing']}")
+        print(f"   Hooks: {result['hooks']}")
         
         return {
             'token_id': token_id,
-            'liquidity': liquidity,
-            'pool_key': {
-                'currency0': currency0,
-                'currency1': currency1,
-                'fee': fee,
-                'tick_spacing': tick_spacing,
-                'hooks': hooks
-            },
-            'position_info': position_info
+            'liquidity': result['liquidity'],
+            'pool_key': {f: result[f] for f in POOL_KEY_FIELDS},
+            'position_info': result['position_info']
         }
         
     except Exception as e:
@@ -101,21 +95,9 @@ def encode_modify_liquidities_unlock_data(
     动作序列为 [0x01 (DECREASE_LIQUIDITY), 0x11 (TAKE_PAIR)]。
     返回 0x 前缀的十六进制字符串。
     """
-    # 编码 DECREASE_LIQUIDITY 参数 (uint256 tokenId, uint128 liquidity, uint128 amount0Min, uint128 amount1Min, bytes hookData)
-    dec_params = encode(
-        ['uint256', 'uint128', 'uint128', 'uint128', 'bytes'],
-        [int(token_id), int(liquidity), int(amount0_min), int(amount0_min), hook_data]
-    )
-
-    # 编码 TAKE_PAIR 参数 (address currency0, address currency1, address recipient)
-    take_params = encode(
-        ['address', 'address', 'address'],
-        [Web3.to_checksum_address(currency0), Web3.to_checksum_address(currency1), Web3.to_checksum_address(recipient)]
-    )
-
-    actions_bytes = bytes([0x01, 0x11])
-    unlock_data_bytes = encode(['bytes', 'bytes[]'], [actions_bytes, [dec_params, take_params]])
-    return '0x' + unlock_data_bytes.hex()
+    # 固定布局走模板编码，hookData 非空时内部回退到 eth_abi
+    return encode_unlock_data_hex(token_id, currency0, currency1, recipient,
+                                  liquidity, amount0_min, amount1_min, hook_data)
 
 def format_position_info(info):
     """格式化输出位置信息"""
@@ -131,6 +113,8 @@ def format_position_info(info):
     print(f"💰 手续费: {info['pool_key']['fee']} (0.{info['pool_key']['fee']/10000}%)")
     print(f"📏 Tick间距: {info['pool_key']['tick_spacing']}")
     print(f"🪝 Hooks合约: {info['pool_key']['hooks']}")
+    decoded = decode_position_info(info['position_info'])
+    print(f"📐 Tick范围: [{decoded['tick_lower']}, {decoded['tick_upper']})")
     print("="*60)
 
 def generate_unlock_data(position_info, recipient):
@@ -178,15 +162,18 @@ def main():
     
     # 创建合约实例
     try:
-        contract = w3.eth.contract(
-            address=Web3.to_checksum_address(POSITION_MANAGER_ADDRESS),
-            abi=abi
-        )
+        contract = get_contract(w3, POSITION_MANAGER_ADDRESS, 'PositionManager.json')
         print(f"✅ 合约实例创建成功: {POSITION_MANAGER_ADDRESS}")
     except Exception as e:
         print(f"❌ 创建合约实例失败: {e}")
         return
     
+    cache = PositionCache(CACHE_PATH) if CACHE_PATH else None
+    # 链重组时丢弃分叉点之后读取的缓存（快照与池子状态缓存已自动订阅）
+    chain_head = get_chain_head(w3)
+    if cache is not None:
+        chain_head.subscribe(cache.invalidate_after)
+    
     # 交互式查询和生成
     while True:
         try:
@@ -204,7 +191,8 @@ def main():
             token_id = int(token_id_input)
             
             # 查询位置信息
-            info = get_position_info(w3, contract, token_id)
+            chain_head.poll()
+            info = get_position_info(w3, contract, token_id, cache)
             if not info:
                 continue
             
@@ -1,26 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+# 导入时不访问网络、不解析 ABI：连接与合约在首次查询时创建，ABI 来自预编译的 abi_table
 
-from web3 import Web3
-import json
-import os
-
-# 加载ABI
-with open('PositionManager.json', 'r') as f:
-    position_manager_abi = json.load(f)
+from abi_table import to_abi
 
 # BSC网络配置
 BSC_RPC_URL = "https://bsc-dataseed.binance.org/"
 POSITION_MANAGER_ADDRESS = "0x46A15B0b27311cedF172AB29E4f4766fbE7F4364"  # 请替换为实际的合约地址
 
-# 连接到BSC网络
-w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL))
-if not w3.is_connected():
-    print("无法连接到BSC网络")
-    exit(1)
+_position_manager = None
+
+
+def get_position_manager():
+    """首次调用时连接BSC网络并创建合约实例，之后复用"""
+    global _position_manager
+    if _position_manager is None:
+        from client_registry import get_web3, get_contract
+        w3 = get_web3(BSC_RPC_URL)
+        if not w3.is_connected():
+            raise ConnectionError("无法连接到BSC网络")
+        _position_manager = get_contract(w3, POSITION_MANAGER_ADDRESS, to_abi('PositionManager'))
+    return _position_manager
 
-# 创建合约实例
-position_manager = w3.eth.contract(address=POSITION_MANAGER_ADDRESS, abi=position_manager_abi)
 
 def query_position_info(token_id):
     """
@@ -29,20 +30,18 @@ def query_position_info(token_id):
     print(f"\n===== 查询TokenID: {token_id} 的信息 =====")
     
     try:
-        # 查询流动性
-        liquidity = position_manager.functions.getPositionLiquidity(token_id).call()
+        from position_reader import read_position
+        position_manager = get_position_manager()
+        # 流动性与池子信息在同一区块读取，合并为一个批量请求
+        result, _ = read_position(position_manager.w3, token_id, position_manager)
+        liquidity = result['liquidity']
         print(f"流动性数量: {liquidity}")
         
-        # 查询池子信息和代币信息
-        pool_info = position_manager.functions.getPoolAndPositionInfo(token_id).call()
-        
-        # 解析poolKey
-        pool_key = pool_info[0]
-        currency0 = pool_key[0]
-        currency1 = pool_key[1]
-        fee = pool_key[2]
-        tick_spacing = pool_key[3]
-        hooks = pool_key[4]
+        currency0 = result['currency0']
+        currency1 = result['currency1']
+        fee = result['fee']
+        tick_spacing = result['tick_spacing']
+        hooks = result['hooks']
         
         print("\n池子信息:")
         print(f"Currency0: {currency0}")
@@ -51,8 +50,7 @@ def query_position_info(token_id):
         print(f"Tick间距: {tick_spacing}")
         print(f"Hooks合约: {hooks}")
         
-        # 解析position info
-        position_info = pool_info[1]
+        position_info = result['position_info']
         print(f"\nPosition信息: {position_info}")
         
         return {
@@ -70,6 +68,12 @@ def query_position_info(token_id):
         return None
 
 if __name__ == "__main__":
+    try:
+        get_position_manager()
+    except ConnectionError as e:
+        print(e)
+        exit(1)
+    
     # 用户输入tokenId
     while True:
         try:
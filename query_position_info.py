@@ -5,18 +5,24 @@ BSC链上查询Uniswap V4 Position信息的脚本
 """
 
 import json
-from web3 import Web3
+
+from position_cache import PositionCache, POOL_KEY_FIELDS
+from position_info_decoder import decode_position_info
+import client_registry
+from client_registry import get_contract
+from position_reader import read_position
+from chain_head import get_chain_head
+from rpc_pool import make_web3, CHAIN_ENDPOINTS, BSC_CHAIN_ID
 
 # BSC主网配置
 BSC_RPC_URL = "https://bsc-dataseed1.binance.org/"
+CACHE_PATH = "position_cache.sqlite3"  # 本地缓存文件，设为 None 关闭缓存
 POSITION_MANAGER_ADDRESS = "0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b" # 请替换为实际的PositionManager合约地址
 
 def load_abi():
-    """加载PositionManager ABI"""
+    """加载PositionManager ABI（进程内只解析一次）"""
     try:
-        with open('PositionManager.json', 'r') as f:
-            abi = json.load(f)
-        return abi
+        return client_registry.load_abi('PositionManager.json')
     except FileNotFoundError:
         print("错误: 找不到 PositionManager.json 文件")
         return None
@@ -27,7 +33,7 @@ def load_abi():
 def init_web3():
     """初始化Web3连接"""
     try:
-        w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL))
+        w3 = make_web3([BSC_RPC_URL] + CHAIN_ENDPOINTS[BSC_CHAIN_ID])
         if not w3.is_connected():
             print("错误: 无法连接到BSC网络")
             return None
@@ -37,53 +43,41 @@ def init_web3():
         print(f"错误: 连接BSC网络失败 - {e}")
         return None
 
-def get_position_info(w3, contract, token_id):
-    """查询指定tokenId的位置信息"""
+def get_position_info(w3, contract, token_id, cache=None):
+    """查询指定tokenId的位置信息
+    传入 cache (position_cache.PositionCache) 时只重新读取已过期的字段
+    """
     try:
         print(f"\n🔍 查询 Token ID: {token_id}")
         
-        # 1. 获取流动性
-        print("📊 获取流动性信息...")
-        liquidity = contract.functions.getPositionLiquidity(token_id).call()
-        print(f"   流动性 (Liquidity): {liquidity}")
-        
-        # 2. 获取池子和位置信息
-        print("🏊 获取池子和位置信息...")
-        pool_info = contract.functions.getPoolAndPositionInfo(token_id).call()
+        # 所有读取固定在同一区块并合并为一个批量请求（见 position_reader.read_position）
+        result, stale = read_position(w3, token_id, contract, cache)
         
-        # 解析poolKey
-        pool_key = pool_info[0]  # poolKey是第一个元素
-        position_info = pool_info[1]  # positionInfo是第二个元素
+        # 1. 流动性
+        print("📊 获取流动性信息..." if 'liquidity' in stale else "📊 使用缓存的流动性信息...")
+        print(f"   流动性 (Liquidity): {result['liquidity']}")
         
-        currency0 = pool_key[0]
-        currency1 = pool_key[1]
-        fee = pool_key[2]
-        tick_spacing = pool_key[3]
-        hooks = pool_key[4]
+        # 2. 池子和位置信息
+        if stale & {'pool_key', 'position_info'}:
+            print("🏊 获取池子和位置信息...")
+        else:
+            print("🏊 使用缓存的池子和位置信息...")
+        print(f"   Currency0: {result['currency0']}")
+        print(f"   Currency1: {result['currency1']}")
+        print(f"   Fee: {result['fee']}")
+        print(f"   Tick Spacing: {result['tick_spacing']}")
+        print(f"   Hooks: {result['hooks']}")
+        print(f"   Position Info: {result['position_info']}")
         
-        print(f"   Currency0: {currency0}")
-        print(f"   Currency1: {currency1}")
-        print(f"   Fee: {fee}")
-        print(f"   Tick Spacing: {tick_spacing}")
-        print(f"   Hooks: {hooks}")
-        print(f"   Position Info: {position_info}")
-        
-        # 3. 获取详细的位置信息
-        print("📋 获取详细位置信息...")
-        detailed_position_info = contract.functions.positionInfo(token_id).call()
+        # 3. 详细的位置信息：同一区块下 positionInfo(tokenId) 与 getPoolAndPositionInfo 返回的 positionInfo 相同
+        detailed_position_info = result['position_info']
         print(f"   详细位置信息: {detailed_position_info}")
         
         return {
             'token_id': token_id,
-            'liquidity': liquidity,
-            'pool_key': {
-                'currency0': currency0,
-                'currency1': currency1,
-                'fee': fee,
-                'tick_spacing': tick_spacing,
-                'hooks': hooks
-            },
-            'position_info': position_info,
+            'liquidity': result['liquidity'],
+            'pool_key': {f: result[f] for f in POOL_KEY_FIELDS},
+            'position_info': result['position_info'],
             'detailed_position_info': detailed_position_info
         }
         
@@ -106,6 +100,10 @@ def format_position_info(info):
     print(f"📏 Tick间距: {info['pool_key']['tick_spacing']}")
     print(f"🪝 Hooks合约: {info['pool_key']['hooks']}")
     print(f"ℹ️  位置信息: {info['position_info']}")
+    decoded = decode_position_info(info['position_info'])
+    print(f"   PoolId (bytes25): {decoded['pool_id']}")
+    print(f"   Tick范围: [{decoded['tick_lower']}, {decoded['tick_upper']})")
+    print(f"   订阅者: {'有' if decoded['has_subscriber'] else '无'}")
     print(f"📊 详细信息: {info['detailed_position_info']}")
     print("="*60)
 
@@ -128,15 +126,18 @@ def main():
     
     # 创建合约实例
     try:
-        contract = w3.eth.contract(
-            address=Web3.to_checksum_address(POSITION_MANAGER_ADDRESS),
-            abi=abi
-        )
+        contract = get_contract(w3, POSITION_MANAGER_ADDRESS, 'PositionManager.json')
         print(f"✅ 合约实例创建成功: {POSITION_MANAGER_ADDRESS}")
     except Exception as e:
         print(f"❌ 创建合约实例失败: {e}")
         return
     
+    cache = PositionCache(CACHE_PATH) if CACHE_PATH else None
+    # 链重组时丢弃分叉点之后读取的缓存（快照与池子状态缓存已自动订阅）
+    chain_head = get_chain_head(w3)
+    if cache is not None:
+        chain_head.subscribe(cache.invalidate_after)
+    
     # 交互式查询
     while True:
         try:
@@ -154,7 +155,8 @@ def main():
             token_id = int(token_id_input)
             
             # 查询位置信息
-            info = get_position_info(w3, contract, token_id)
+            chain_head.poll()
+            info = get_position_info(w3, contract, token_id, cache)
             
             # 格式化输出
             format_position_info(info)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+从交易回执中直接解析 V4 铸造结果（不依赖 ABI）
+- PositionManager 的 ERC721 Transfer(from=0) -> 新铸造的 tokenId 与持有人
+- PoolManager 的 ModifyLiquidity(salt=tokenId) -> poolId、tick 范围与 liquidityDelta
+- ERC20 Transfer(付款人 -> PoolManager) -> 实际支付的代币数量（原生币没有日志）
+按 topic 与 32 字节槽位切片解码，不需要额外的 RPC 调用，多笔铸造并发时也不会取错 tokenId
+"""
+
+from typing import Dict, Any, List, Optional
+
+from web3 import Web3
+
+TRANSFER_TOPIC = bytes(Web3.keccak(text="Transfer(address,address,uint256)"))
+MODIFY_LIQUIDITY_TOPIC = bytes(Web3.keccak(text="ModifyLiquidity(bytes32,address,int24,int24,int256,bytes32)"))
+ZERO_WORD = bytes(32)
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+
+def _word_to_address(word: bytes) -> str:
+    return Web3.to_checksum_address(word[-20:])
+
+
+def _word_to_int(word: bytes, signed: bool = False) -> int:
+    return int.from_bytes(word, 'big', signed=signed)
+
+
+def _iter_logs(receipt):
+    for log in receipt['logs']:
+        topics = [_to_bytes(t) for t in log['topics']]
+        if topics:
+            yield log, topics
+
+
+def decode_minted_positions(receipt, position_manager: str, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+    """返回回执中由 position_manager 铸造的全部头寸（按日志顺序），可按接收地址 owner 过滤"""
+    position_manager = Web3.to_checksum_address(position_manager)
+    owner = Web3.to_checksum_address(owner) if owner else None
+
+    minted: Dict[int, Dict[str, Any]] = {}
+    modifications: Dict[bytes, Dict[str, Any]] = {}
+    for log, topics in _iter_logs(receipt):
+        address = Web3.to_checksum_address(log['address'])
+        if topics[0] == TRANSFER_TOPIC and len(topics) == 4 and address == position_manager:
+            # ERC721 Transfer: tokenId 在第 4 个 topic，from 为 0 表示铸造
+            if topics[1] != ZERO_WORD:
+                continue
+            to_address = _word_to_address(topics[2])
+            if owner and to_address != owner:
+                continue
+            token_id = _word_to_int(topics[3])
+            minted[token_id] = {'token_id': token_id, 'owner': to_address}
+        elif topics[0] == MODIFY_LIQUIDITY_TOPIC and len(topics) == 3:
+            # ModifyLiquidity: topics = [sig, poolId, sender]，data = tickLower, tickUpper, liquidityDelta, salt
+            if _word_to_address(topics[2]) != position_manager:
+                continue
+            data = _to_bytes(log['data'])
+            salt = data[96:128]
+            entry = modifications.setdefault(salt, {
+                'pool_manager': address,
+                'pool_id': '0x' + topics[1].hex(),
+                'tick_lower': _word_to_int(data[0:32], signed=True),
+                'tick_upper': _word_to_int(data[32:64], signed=True),
+                'liquidity': 0,
+            })
+            entry['liquidity'] += _word_to_int(data[64:96], signed=True)
+
+    positions = []
+    for token_id, position in minted.items():
+        # PositionManager 以 bytes32(tokenId) 作为 salt
+        position.update(modifications.get(token_id.to_bytes(32, 'big'), {}))
+        position['tx_hash'] = Web3.to_hex(receipt['transactionHash']) if receipt.get('transactionHash') else None
+        position['block_number'] = receipt.get('blockNumber')
+        positions.append(position)
+    return positions
+
+
+def decode_token_payments(receipt, payer: str, recipient: str) -> Dict[str, int]:
+    """统计回执中 payer 转给 recipient（通常为 PoolManager）的 ERC20 数量，返回 {token: amount}"""
+    payer_word = bytes(12) + _to_bytes(payer)
+    recipient_word = bytes(12) + _to_bytes(recipient)
+    paid: Dict[str, int] = {}
+    for log, topics in _iter_logs(receipt):
+        # ERC20 Transfer 只有 from / to 两个 indexed 参数，数量在 data 中
+        if topics[0] != TRANSFER_TOPIC or len(topics) != 3:
+            continue
+        if topics[1] != payer_word or topics[2] != recipient_word:
+            continue
+        token = Web3.to_checksum_address(log['address'])
+        paid[token] = paid.get(token, 0) + _word_to_int(_to_bytes(log['data'])[:32])
+    return paid
+
+
+def decode_mint_receipt(receipt, position_manager: str, owner: str) -> Optional[Dict[str, Any]]:
+    """解析单笔铸造交易：返回最后一个铸造给 owner 的头寸，并附带 owner 支付给 PoolManager 的代币数量"""
+    positions = decode_minted_positions(receipt, position_manager, owner)
+    if not positions:
+        return None
+    position = positions[-1]
+    if position.get('pool_manager'):
+        position['paid'] = decode_token_payments(receipt, owner, position['pool_manager'])
+    return position
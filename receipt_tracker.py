@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+交易回执跟踪
+后台线程统一轮询所有待确认交易：只有出现新区块时才查询回执，多笔交易的回执并发查询，
+轮询间隔按观测到的出块时间自适应；回执一到立即完成对应的 Future 并触发回调，
+替代发送交易后固定 sleep 5~15 秒再猜测结果的做法
+"""
+
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterable, List, Optional
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+DEFAULT_TIMEOUT = 180
+DEFAULT_BLOCK_TIME = 3.0
+MIN_POLL_INTERVAL = 0.2
+MAX_POLL_INTERVAL = 3.0
+MAX_CONCURRENT_QUERIES = 16
+
+
+class ReceiptTimeout(Exception):
+    pass
+
+
+class _Pending:
+    __slots__ = ('tx_hash', 'future', 'deadline')
+
+    def __init__(self, tx_hash: str, future: Future, deadline: float):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.deadline = deadline
+
+
+class ReceiptTracker:
+    def __init__(self, w3: Web3, timeout: float = DEFAULT_TIMEOUT, block_time: float = DEFAULT_BLOCK_TIME,
+                 max_concurrency: int = MAX_CONCURRENT_QUERIES):
+        self.w3 = w3
+        self.timeout = timeout
+        # 出块时间的指数移动平均，决定轮询间隔
+        self.block_time = block_time
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='receipt')
+        self._last_block: Optional[int] = None
+        self._last_block_at = 0.0
+
+    @property
+    def poll_interval(self) -> float:
+        return min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, self.block_time / 4))
+
+    # ---------- 对外接口 ----------
+    def track(self, tx_hash, callback: Optional[Callable] = None, timeout: Optional[float] = None) -> Future:
+        """登记一笔交易，返回在回执到达时完成的 Future（结果为回执）；callback(future) 在完成时调用"""
+        tx_hash = Web3.to_hex(tx_hash) if not isinstance(tx_hash, str) else tx_hash
+        with self._lock:
+            entry = self._pending.get(tx_hash)
+            if entry is None:
+                deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+                entry = self._pending[tx_hash] = _Pending(tx_hash, Future(), deadline)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='receipt-tracker', daemon=True)
+                self._thread.start()
+        if callback is not None:
+            entry.future.add_done_callback(callback)
+        self._wakeup.set()
+        return entry.future
+
+    def wait(self, tx_hash, timeout: Optional[float] = None):
+        """阻塞直到回执到达，超时抛出 ReceiptTimeout"""
+        future = self.track(tx_hash, timeout=timeout)
+        try:
+            return future.result()
+        except FutureTimeoutError:
+            raise ReceiptTimeout(f"等待回执超时: {tx_hash}")
+
+    def wait_all(self, tx_hashes: Iterable, timeout: Optional[float] = None) -> List:
+        futures = [self.track(tx_hash, timeout=timeout) for tx_hash in tx_hashes]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for entry in pending:
+            entry.future.cancel()
+        self._wakeup.set()
+        self._executor.shutdown(wait=False)
+
+    # ---------- 后台轮询 ----------
+    def _observe_block(self, block_number: int) -> bool:
+        """记录新区块并更新出块时间估计，返回是否出现了新区块"""
+        now = time.monotonic()
+        if self._last_block is None:
+            self._last_block, self._last_block_at = block_number, now
+            return True
+        if block_number <= self._last_block:
+            return False
+        elapsed = (now - self._last_block_at) / (block_number - self._last_block)
+        self.block_time = 0.8 * self.block_time + 0.2 * elapsed
+        self._last_block, self._last_block_at = block_number, now
+        return True
+
+    def _fetch(self, tx_hash: str):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def _poll_once(self, force: bool):
+        with self._lock:
+            entries = list(self._pending.values())
+        if not entries:
+            return
+        try:
+            new_block = self._observe_block(int(self.w3.eth.block_number))
+        except Exception:
+            new_block = True
+        if new_block or force:
+            results = self._executor.map(self._safe_fetch, entries)
+            for entry, receipt in zip(entries, results):
+                if receipt is not None:
+                    self._resolve(entry, result=receipt)
+
+        now = time.monotonic()
+        for entry in entries:
+            if not entry.future.done() and now >= entry.deadline:
+                self._resolve(entry, error=FutureTimeoutError())
+
+    def _safe_fetch(self, entry: _Pending):
+        try:
+            return self._fetch(entry.tx_hash)
+        except Exception:
+            # 单次查询失败留到下一个区块重试
+            return None
+
+    def _resolve(self, entry: _Pending, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._pending.pop(entry.tx_hash, None)
+        if entry.future.done():
+            return
+        if error is not None:
+            entry.future.set_exception(error)
+        else:
+            entry.future.set_result(result)
+
+    def _run(self):
+        while True:
+            # 新登记的交易立即查询一次（可能已经上链）
+            force = self._wakeup.is_set()
+            self._wakeup.clear()
+            self._poll_once(force)
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            self._wakeup.wait(self.poll_interval)
+
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def get_receipt_tracker(w3: Web3) -> ReceiptTracker:
+    """同一个 Web3 实例共享一个回执跟踪器"""
+    with _trackers_lock:
+        tracker = _trackers.get(w3)
+        if tracker is None:
+            tracker = _trackers[w3] = ReceiptTracker(w3)
+        return tracker
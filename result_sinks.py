@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+批量查询结果的流式输出
+结果到达即写入磁盘，支持 CSV / JSONL / Parquet，内存占用不随结果数量增长。
+uint128 liquidity 与 uint256 position_info 以十进制字符串保存，tick 为整数列
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Any, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 仅 Parquet 输出需要 pyarrow
+    pa = None
+    pq = None
+
+from position_info_decoder import decode_position_info
+
+# 输出列与类型: int / int32 为整数列，str 为字符串列（含十进制大整数）
+COLUMNS = [
+    ('token_id', 'int'),
+    ('status', 'str'),
+    ('liquidity', 'str'),
+    ('currency0', 'str'),
+    ('currency1', 'str'),
+    ('fee', 'int32'),
+    ('tick_spacing', 'int32'),
+    ('hooks', 'str'),
+    ('position_info', 'str'),
+    ('tick_lower', 'int32'),
+    ('tick_upper', 'int32'),
+    ('owner', 'str'),
+    ('error', 'str'),
+]
+FIELDNAMES = [name for name, _ in COLUMNS]
+
+
+def normalize_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    """将查询结果转换为固定列的行：大整数转十进制字符串，并从 position_info 解出 tick 范围"""
+    row = {name: result.get(name) for name in FIELDNAMES}
+    if result.get('position_info') is not None:
+        decoded = decode_position_info(result['position_info'])
+        row['tick_lower'] = decoded['tick_lower']
+        row['tick_upper'] = decoded['tick_upper']
+    for name in ('liquidity', 'position_info'):
+        if row[name] is not None:
+            row[name] = str(int(row[name]))
+    return row
+
+
+class _Sink:
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(_Sink):
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDNAMES)
+        self._writer.writeheader()
+        self.rows = 0
+
+    def write(self, result: Dict[str, Any]):
+        row = normalize_row(result)
+        # 填充缺失的字段
+        self._writer.writerow({k: ('' if v is None else v) for k, v in row.items()})
+        self.rows += 1
+
+
+class JsonlSink(_Sink):
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self.rows = 0
+
+    def write(self, result: Dict[str, Any]):
+        row = {k: v for k, v in normalize_row(result).items() if v is not None}
+        self._file.write(json.dumps(row) + '\n')
+        self.rows += 1
+
+
+class ParquetSink(_Sink):
+    """按 row_group_size 缓冲后写出一个 row group，内存上限为一个 row group"""
+
+    def __init__(self, path: str, row_group_size: int = 65536):
+        if pa is None:
+            raise ImportError("Parquet 输出需要安装 pyarrow: pip install pyarrow")
+        self.path = path
+        self.row_group_size = row_group_size
+        arrow_types = {'int': pa.int64(), 'int32': pa.int32(), 'str': pa.string()}
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in COLUMNS])
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._buffer = {name: [] for name in FIELDNAMES}
+        self._buffered = 0
+        self.rows = 0
+
+    def write(self, result: Dict[str, Any]):
+        for name, value in normalize_row(result).items():
+            self._buffer[name].append(value)
+        self._buffered += 1
+        self.rows += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        self._writer.write_table(pa.table(self._buffer, schema=self.schema))
+        self._buffer = {name: [] for name in FIELDNAMES}
+        self._buffered = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_sink(path: str, fmt: Optional[str] = None):
+    """按格式（默认取文件扩展名）创建输出 sink"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in SINKS:
+        raise ValueError(f"不支持的输出格式: {fmt}，可选: {', '.join(SINKS)}")
+    return SINKS[fmt](path)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+统一的重试策略
+- 按错误类型分类：限流（rate_limit）、传输（transport）、链上回滚（revert）、nonce、致命（fatal）
+- 带随机抖动的指数退避：瞬时故障在几十毫秒内恢复，限流时退避更长并遵守 Retry-After
+- 每个上游（RPC、Uniswap API 等）独立的重试预算与熔断器：上游持续故障时直接失败，不再睡眠等待
+替代"捕获异常 -> sleep 10~20 秒 -> 递归调用自身"的写法，避免无上限递归与长时间空等
+"""
+
+import functools
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+RATE_LIMIT = 'rate_limit'
+TRANSPORT = 'transport'
+REVERT = 'revert'
+NONCE = 'nonce'
+FATAL = 'fatal'
+
+_RATE_LIMIT_PATTERNS = ('rate limit', 'too many requests', 'limit exceeded', 'request limit', 'exceeded the quota')
+_REVERT_PATTERNS = ('execution reverted', 'revert', 'invalid opcode', 'out of gas')
+_NONCE_PATTERNS = ('nonce too low', 'already known', 'replacement transaction underpriced', 'nonce has already been used')
+_TRANSPORT_PATTERNS = ('timeout', 'timed out', 'connection', 'temporarily', 'unavailable', 'bad gateway',
+                       'header not found', 'eof', 'reset by peer', 'try again')
+
+
+class RetryError(Exception):
+    """重试次数或重试预算用尽，__cause__ 为最后一次的异常"""
+
+
+class CircuitOpenError(Exception):
+    """上游熔断中，调用被直接拒绝"""
+
+
+class ResponseFormatError(Exception):
+    """接口返回的内容缺少预期字段（如 ListPools 没有 pools），通常是上游暂时性问题，可重试"""
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) or getattr(error, 'status', None)
+
+
+def classify(error: BaseException) -> str:
+    """判断异常类型，决定是否值得重试"""
+    if isinstance(error, (CircuitOpenError, RetryError)):
+        # RetryError 已是重试用尽后的结果，外层不再重试
+        return FATAL
+    if isinstance(error, (ResponseFormatError, json.JSONDecodeError)):
+        return TRANSPORT
+    name = type(error).__name__
+    if name in ('ContractLogicError', 'ContractCustomError', 'ContractPanicError'):
+        return REVERT
+    if name in ('TransactionNotFound', 'TimeExhausted', 'NoHealthyEndpoint', 'ReceiptTimeout'):
+        return TRANSPORT
+
+    status = _status_code(error)
+    if status == 429:
+        return RATE_LIMIT
+    if status is not None and status >= 500:
+        return TRANSPORT
+    if status is not None and 400 <= status < 500:
+        return FATAL
+
+    # web3 将节点返回的 JSON-RPC 错误包装为 ValueError({'code': ..., 'message': ...})
+    payload = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+    code = payload.get('code')
+    message = (payload.get('message') or str(error)).lower()
+    if code in (-32005, 429) or any(p in message for p in _RATE_LIMIT_PATTERNS):
+        return RATE_LIMIT
+    if code in (-32600, -32601, -32602):
+        # 请求格式、方法或参数错误，重试不会成功
+        return FATAL
+    if any(p in message for p in _NONCE_PATTERNS):
+        return NONCE
+    if code == 3 or any(p in message for p in _REVERT_PATTERNS):
+        return REVERT
+    if isinstance(code, int) and (code == -32603 or -32099 <= code <= -32000):
+        # 节点内部错误 / 服务端错误
+        return TRANSPORT
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)) or any(p in message for p in _TRANSPORT_PATTERNS):
+        return TRANSPORT
+    if name in ('ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout', 'ChunkedEncodingError',
+                'ClientConnectionError', 'ServerDisconnectedError'):
+        return TRANSPORT
+    # 其余异常（包括参数错误等 ValueError / KeyError / IndexError）视为程序错误，直接抛出
+    return FATAL
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryBudget:
+    """滑动窗口内允许的重试次数，防止上游故障时大量请求同时重试形成放大"""
+
+    def __init__(self, max_retries: int = 30, window: float = 10.0):
+        self.max_retries = max_retries
+        self.window = window
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._events and now - self._events[0] > self.window:
+                self._events.popleft()
+            if len(self._events) >= self.max_retries:
+                return False
+            self._events.append(now)
+            return True
+
+
+class CircuitBreaker:
+    """连续失败达到阈值后熔断 reset_timeout 秒；之后放行一个探测请求，成功则恢复"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self, name: str = ''):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"上游 {name} 熔断中，{self.reset_timeout:.0f}s 内不再请求")
+                self.state = self.HALF_OPEN
+            elif self.state == self.HALF_OPEN:
+                raise CircuitOpenError(f"上游 {name} 正在探测恢复")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_budgets: Dict[str, RetryBudget] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    with _upstreams_lock:
+        return _breakers.setdefault(upstream, CircuitBreaker())
+
+
+def get_budget(upstream: str) -> RetryBudget:
+    with _upstreams_lock:
+        return _budgets.setdefault(upstream, RetryBudget())
+
+
+class RetryPolicy:
+    """max_attempts 含首次调用；退避为 [0, min(max_delay, base_delay * multiplier^n)] 的均匀随机（full jitter）"""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.05, max_delay: float = 5.0,
+                 multiplier: float = 2.0, rate_limit_delay: float = 1.0,
+                 retry_on: Iterable[str] = (RATE_LIMIT, TRANSPORT, NONCE), deadline: Optional[float] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.rate_limit_delay = rate_limit_delay
+        self.retry_on = frozenset(retry_on)
+        self.deadline = deadline
+
+    def backoff(self, attempt: int, kind: str, error: Optional[BaseException] = None) -> float:
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        delay = random.uniform(0, cap)
+        if kind == RATE_LIMIT:
+            retry_after = _retry_after(error) if error is not None else None
+            delay = max(delay, retry_after if retry_after is not None else self.rate_limit_delay * (attempt + 1))
+        return delay
+
+    def call(self, fn: Callable, *args, upstream: str = 'default', on_retry: Optional[Callable] = None, **kwargs):
+        breaker, budget = get_breaker(upstream), get_budget(upstream)
+        started = time.monotonic()
+        for attempt in range(self.max_attempts):
+            breaker.before_call(upstream)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as error:
+                kind = classify(error)
+                # 链上回滚与参数错误说明上游工作正常，不计入熔断
+                if kind in (RATE_LIMIT, TRANSPORT):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if kind not in self.retry_on:
+                    raise
+                if attempt + 1 >= self.max_attempts:
+                    raise RetryError(f"{getattr(fn, '__name__', fn)} 重试 {attempt + 1} 次后仍失败: {error}") from error
+                delay = self.backoff(attempt, kind, error)
+                if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+                    raise RetryError(f"{getattr(fn, '__name__', fn)} 超出重试时限 {self.deadline}s: {error}") from error
+                if not budget.try_acquire():
+                    raise RetryError(f"上游 {upstream} 重试预算已用尽: {error}") from error
+                if on_retry is not None:
+                    on_retry(error, kind, attempt + 1, delay)
+                time.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    def __call__(self, upstream: str = 'default', on_retry: Optional[Callable] = None):
+        """装饰器用法：@READ_POLICY(upstream='rpc')"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                return self.call(fn, *args, upstream=upstream, on_retry=on_retry, **kwargs)
+            return wrapper
+        return decorator
+
+
+# 只读 RPC 调用：快速重试，总时长不超过约 10 秒
+READ_POLICY = RetryPolicy(max_attempts=6, base_delay=0.05, max_delay=2.0, deadline=10.0)
+# HTTP 接口（Uniswap API）：限流更常见，退避上限更大
+API_POLICY = RetryPolicy(max_attempts=6, base_delay=0.2, max_delay=5.0, deadline=30.0)
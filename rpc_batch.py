@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 批量请求传输
+- BatchingProvider：包装现有 provider，多个线程在极短窗口内并发发出的 eth_call 等只读请求
+  合并为一个 JSON-RPC 批量数组，通过一次 HTTP POST 发出，响应按 id 分发回各调用方；
+  没有并发请求时直接透传，单线程脚本不会多等待
+- batch(w3)：显式批量块，块内登记的合约调用在离开块（或首次读取结果）时一次性发出
+不依赖 Multicall 合约，任何节点都支持
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from web3 import Web3
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3._utils.request import make_post_request
+from web3.providers import JSONBaseProvider
+
+# 可以安全合并的只读方法
+BATCHABLE_METHODS = frozenset({
+    'eth_call', 'eth_getBalance', 'eth_getCode', 'eth_getStorageAt', 'eth_getTransactionCount',
+    'eth_getTransactionReceipt', 'eth_getTransactionByHash', 'eth_getBlockByNumber', 'eth_getBlockByHash',
+    'eth_getLogs', 'eth_blockNumber', 'eth_chainId', 'eth_gasPrice',
+})
+
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH_SIZE = 100
+
+
+class BatchRequestError(ValueError):
+    """批量中单个请求返回 JSON-RPC 错误（与 web3 对 RPC 错误抛出 ValueError 的行为一致）"""
+
+
+def _encode_batch(requests: Sequence[Tuple[str, Any]]) -> bytes:
+    payload = [{'jsonrpc': '2.0', 'method': method, 'params': params or [], 'id': i}
+               for i, (method, params) in enumerate(requests)]
+    return FriendlyJsonSerde().json_encode(payload, Web3JsonEncoder).encode()
+
+
+def _decode_batch(raw: bytes, count: int) -> List[Dict[str, Any]]:
+    decoded = FriendlyJsonSerde().json_decode(raw.decode() if isinstance(raw, bytes) else raw)
+    if isinstance(decoded, dict):
+        # 节点拒绝整个批量（如超出批量上限）时返回单个错误对象
+        return [dict(decoded, id=i) for i in range(count)]
+    # 规范不保证响应顺序，按 id 归位
+    by_id = {item.get('id'): item for item in decoded}
+    return [by_id.get(i, {'jsonrpc': '2.0', 'id': i, 'error': {'code': -32603, 'message': '批量响应中缺少该请求'}})
+            for i in range(count)]
+
+
+def post_batch(provider, requests: Sequence[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """通过 HTTP provider 的地址与请求参数发送一个批量 POST，返回与 requests 一一对应的响应"""
+    data = _encode_batch(requests)
+    if hasattr(provider, 'post'):
+        # client_registry.PooledHTTPProvider：复用共享连接池
+        raw = provider.post(data)
+    else:
+        raw = make_post_request(provider.endpoint_uri, data, **provider.get_request_kwargs())
+    return _decode_batch(raw, len(requests))
+
+
+def send_batch(provider, requests: Sequence[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """按 provider 能力发送批量请求：连接池走自身路由，HTTP provider 直接 POST，其他 provider 逐个发送"""
+    if not requests:
+        return []
+    if hasattr(provider, 'make_batch_request'):
+        return provider.make_batch_request(list(requests))
+    if hasattr(provider, 'endpoint_uri') and hasattr(provider, 'get_request_kwargs'):
+        return post_batch(provider, requests)
+    return [provider.make_request(method, params) for method, params in requests]
+
+
+class _Queued:
+    __slots__ = ('method', 'params', 'future')
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.future = Future()
+
+
+class BatchingProvider(JSONBaseProvider):
+    """透明合并并发只读请求的 provider 包装"""
+
+    def __init__(self, provider, window: float = DEFAULT_WINDOW, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        super().__init__()
+        self.provider = provider
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue: List[_Queued] = []
+        self._leader = False
+
+    def __str__(self):
+        return f"Batching({self.provider})"
+
+    @property
+    def endpoint_uri(self):
+        return getattr(self.provider, 'endpoint_uri', None)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return self.provider.is_connected(show_traceback)
+
+    def make_batch_request(self, requests):
+        return send_batch(self.provider, requests)
+
+    def make_request(self, method, params):
+        if method not in BATCHABLE_METHODS:
+            return self.provider.make_request(method, params)
+        with self._lock:
+            self._active += 1
+            concurrent = self._active > 1
+        try:
+            if not concurrent:
+                return self.provider.make_request(method, params)
+            item = _Queued(method, params)
+            with self._lock:
+                self._queue.append(item)
+                leader = not self._leader
+                self._leader = True
+            if leader:
+                # 第一个排队的请求负责在窗口结束后把队列整体发出
+                time.sleep(self.window)
+                with self._lock:
+                    items, self._queue = self._queue, []
+                    self._leader = False
+                self._dispatch(items)
+            return item.future.result()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _dispatch(self, items: List[_Queued]):
+        for start in range(0, len(items), self.max_batch_size):
+            chunk = items[start:start + self.max_batch_size]
+            try:
+                if len(chunk) == 1:
+                    responses = [self.provider.make_request(chunk[0].method, chunk[0].params)]
+                else:
+                    responses = send_batch(self.provider, [(item.method, item.params) for item in chunk])
+            except Exception as e:
+                for item in chunk:
+                    item.future.set_exception(e)
+                continue
+            for item, response in zip(chunk, responses):
+                item.future.set_result(response)
+
+
+def enable_batching(w3: Web3, window: float = DEFAULT_WINDOW, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> Web3:
+    """为已有的 Web3 实例启用透明批量合并（重复调用不会重复包装）"""
+    if not isinstance(w3.provider, BatchingProvider):
+        w3.provider = BatchingProvider(w3.provider, window, max_batch_size)
+    return w3
+
+
+def _block_param(block_identifier) -> str:
+    if isinstance(block_identifier, int):
+        return hex(block_identifier)
+    return block_identifier
+
+
+class BatchCall:
+    """批量块中登记的一个请求，result() 在批量发出后返回解码结果"""
+
+    def __init__(self, owner: 'Batch', method: str, params: Any, decode: Optional[Callable] = None):
+        self._owner = owner
+        self.method = method
+        self.params = params
+        self._decode = decode
+        self._response: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self._response is not None
+
+    def _set_response(self, response: Dict[str, Any]):
+        self._response = response
+
+    def result(self):
+        if self._response is None:
+            self._owner.execute()
+        if 'error' in self._response:
+            raise BatchRequestError(self._response['error'])
+        value = self._response.get('result')
+        return self._decode(value) if self._decode else value
+
+
+class Batch:
+    """显式批量块：块内登记的请求在离开块（或任意一个结果被读取）时合并为一个 HTTP 请求"""
+
+    def __init__(self, w3: Web3, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        self.w3 = w3
+        self.max_batch_size = max_batch_size
+        self._pending: List[BatchCall] = []
+
+    def request(self, method: str, params: Any, decode: Optional[Callable] = None) -> BatchCall:
+        call = BatchCall(self, method, params, decode)
+        self._pending.append(call)
+        return call
+
+    def call(self, fn, block_identifier='latest') -> BatchCall:
+        """登记一个合约只读调用（contract.functions.xxx(...)），结果的解码与 fn.call() 相同"""
+        tx = {'to': fn.address, 'data': fn._encode_transaction_data()}
+        output_types = get_abi_output_types(fn.abi)
+        codec = self.w3.codec
+
+        def decode(value):
+            data = Web3.to_bytes(hexstr=value)
+            normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, codec.decode(output_types, data))
+            return normalized[0] if len(normalized) == 1 else normalized
+
+        return self.request('eth_call', [tx, _block_param(block_identifier)], decode)
+
+    def execute(self):
+        pending, self._pending = self._pending, []
+        provider = self.w3.provider
+        for start in range(0, len(pending), self.max_batch_size):
+            chunk = pending[start:start + self.max_batch_size]
+            if len(chunk) == 1:
+                responses = [provider.make_request(chunk[0].method, chunk[0].params)]
+            else:
+                responses = send_batch(provider, [(c.method, c.params) for c in chunk])
+            for call, response in zip(chunk, responses):
+                call._set_response(response)
+
+    def __enter__(self) -> 'Batch':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
+        return False
+
+
+def batch(w3: Web3, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> Batch:
+    """with batch(w3) as b: slot0 = b.call(pool.functions.slot0()) ... 离开块后 slot0.result()"""
+    return Batch(w3, max_batch_size)
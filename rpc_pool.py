@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+多节点 RPC 连接池（Web3 Provider）
+每条链配置多个节点，按延迟与错误率的指数移动平均给节点打分，请求总是发往得分最好的节点；
+请求耗时超过该节点 p95 延迟仍未返回时，向次优节点发出一份对冲请求，取先返回的结果；
+连续失败的节点被暂时剔除，冷却期过后自动恢复。
+作为 Web3 的 provider 使用，init_web3 与各查询脚本无需改动调用方式即可获得尾延迟保护
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from web3 import Web3
+from web3.providers import JSONBaseProvider
+
+from client_registry import PooledHTTPProvider
+from rpc_batch import BATCHABLE_METHODS, BatchingProvider, post_batch
+
+# 各链的公共节点
+CHAIN_ENDPOINTS: Dict[int, List[str]] = {
+    56: [
+        "https://bsc-dataseed1.binance.org/",
+        "https://bsc-dataseed2.binance.org/",
+        "https://bsc-dataseed3.binance.org/",
+        "https://bsc-dataseed4.binance.org/",
+    ],
+}
+BSC_CHAIN_ID = 56
+
+DEFAULT_TIMEOUT = 10
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 200            # 计算 p95 使用的最近样本数
+MIN_HEDGE_SAMPLES = 20          # 样本不足时使用默认对冲延迟
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+EJECT_AFTER_FAILURES = 3
+EJECT_COOLDOWN = 30.0
+MAX_EJECT_COOLDOWN = 300.0
+FAILURE_PENALTY = 1.0
+
+# 会改变链上状态的方法不做对冲，避免重复广播
+NON_IDEMPOTENT_METHODS = frozenset({
+    'eth_sendRawTransaction', 'eth_sendTransaction', 'eth_sign', 'eth_signTransaction',
+    'personal_sendTransaction',
+})
+
+
+class NoHealthyEndpoint(Exception):
+    pass
+
+
+class RpcEndpoint:
+    """单个节点的健康状态：延迟 / 错误率的指数移动平均、最近延迟样本、剔除与冷却"""
+
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT, request_kwargs: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.provider = PooledHTTPProvider(url, request_kwargs={'timeout': timeout, **(request_kwargs or {})})
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    @property
+    def score(self) -> float:
+        """越小越好：平均延迟按错误率放大，在途请求多的节点略微降权；没有样本的节点优先探测"""
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + 4 * self.error_rate) * (1 + 0.1 * self.in_flight)
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def record_success(self, elapsed: float):
+        with self._lock:
+            self.samples.append(elapsed)
+            self.latency = elapsed if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * elapsed
+            self.error_rate *= (1 - EWMA_ALPHA)
+            self.consecutive_failures = 0
+            self.ejections = 0
+
+    def record_failure(self, elapsed: float):
+        with self._lock:
+            self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA
+            # 失败按不低于 FAILURE_PENALTY 的耗时计入延迟，快速报错的节点不会因为"延迟低"被继续优先选择
+            elapsed = max(elapsed, FAILURE_PENALTY)
+            self.latency = elapsed if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * elapsed
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= EJECT_AFTER_FAILURES:
+                # 反复被剔除的节点冷却时间加倍；冷却结束后放行请求探测，成功即恢复
+                cooldown = min(MAX_EJECT_COOLDOWN, EJECT_COOLDOWN * 2 ** self.ejections)
+                self.ejected_until = time.monotonic() + cooldown
+                self.ejections += 1
+                self.consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'latency': self.latency,
+            'p95': self.p95(),
+            'error_rate': round(self.error_rate, 4),
+            'available': self.available,
+            'in_flight': self.in_flight,
+        }
+
+
+class RpcPoolProvider(JSONBaseProvider):
+    """按得分路由、带对冲请求与故障转移的多节点 provider"""
+
+    def __init__(self, urls: Sequence[str], timeout: float = DEFAULT_TIMEOUT, hedge: bool = True,
+                 max_workers: int = 32, request_kwargs: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        if not urls:
+            raise ValueError("至少需要一个 RPC 节点")
+        self.endpoints = [RpcEndpoint(url, timeout, request_kwargs) for url in dict.fromkeys(urls)]
+        self.hedge = hedge and len(self.endpoints) > 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rpc-pool')
+
+    def __str__(self):
+        return f"RPC pool ({len(self.endpoints)} endpoints)"
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.ranked()[0].url
+
+    def ranked(self) -> List[RpcEndpoint]:
+        """可用节点按得分排序；全部被剔除时退回到最早恢复的节点，保证请求总能发出"""
+        available = [e for e in self.endpoints if e.available]
+        if not available:
+            return sorted(self.endpoints, key=lambda e: e.ejected_until)
+        return sorted(available, key=lambda e: e.score)
+
+    def _call(self, endpoint: RpcEndpoint, send):
+        with endpoint._lock:
+            endpoint.in_flight += 1
+        start = time.monotonic()
+        try:
+            response = send(endpoint.provider)
+        except Exception:
+            endpoint.record_failure(time.monotonic() - start)
+            raise
+        finally:
+            with endpoint._lock:
+                endpoint.in_flight -= 1
+        # JSON-RPC 层面的错误（如 revert）说明节点工作正常，照常计为成功
+        endpoint.record_success(time.monotonic() - start)
+        return response
+
+    def _hedge_delay(self, endpoint: RpcEndpoint) -> float:
+        p95 = endpoint.p95()
+        return DEFAULT_HEDGE_DELAY if p95 is None else max(MIN_HEDGE_DELAY, p95)
+
+    def make_request(self, method, params):
+        return self._route(lambda provider: provider.make_request(method, params),
+                           hedge=method not in NON_IDEMPOTENT_METHODS, label=method)
+
+    def make_batch_request(self, requests):
+        """以 JSON-RPC 批量数组发送 [(method, params), ...]，整批按同样的规则路由、对冲与故障转移"""
+        return self._route(lambda provider: post_batch(provider, requests),
+                           hedge=all(method in BATCHABLE_METHODS for method, _ in requests),
+                           label=f"batch x{len(requests)}")
+
+    def _route(self, send, hedge: bool, label: str):
+        candidates = self.ranked()
+        hedge = self.hedge and hedge
+        pending = {}
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            endpoint = candidates.pop(0)
+            pending[self._executor.submit(self._call, endpoint, send)] = endpoint
+
+        launch()
+        while pending:
+            # 只有首个请求等待 p95 后对冲；失败后立即转移到下一个节点
+            timeout = None
+            if hedge and candidates and len(pending) == 1:
+                timeout = self._hedge_delay(next(iter(pending.values())))
+            done, _ = wait_futures(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            if not pending and candidates:
+                launch()
+        raise NoHealthyEndpoint(f"所有 RPC 节点请求失败 ({label}): {last_error}") from last_error
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = self.make_request('web3_clientVersion', [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return 'jsonrpc' in response and 'error' not in response
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [e.stats() for e in sorted(self.endpoints, key=lambda e: e.score)]
+
+
+def make_web3(urls: Union[str, Sequence[str], None] = None, chain_id: int = BSC_CHAIN_ID,
+              batching: bool = True, **kwargs) -> Web3:
+    """用连接池创建 Web3；urls 可以是单个地址、逗号分隔的多个地址或列表，缺省使用 CHAIN_ENDPOINTS。
+    batching=True 时并发的只读请求自动合并为 JSON-RPC 批量请求（见 rpc_batch）
+    """
+    if urls is None:
+        urls = CHAIN_ENDPOINTS[chain_id]
+    elif isinstance(urls, str):
+        urls = [u.strip() for u in urls.split(',') if u.strip()]
+    provider = RpcPoolProvider(list(urls), **kwargs)
+    return Web3(BatchingProvider(provider) if batching else provider)
+
+
+def print_stats(w3: Web3):
+    provider = w3.provider
+    if isinstance(provider, BatchingProvider):
+        provider = provider.provider
+    if not isinstance(provider, RpcPoolProvider):
+        return
+    print("\n📡 RPC 节点状态:")
+    for s in provider.stats():
+        latency = f"{s['latency'] * 1000:.0f}ms" if s['latency'] is not None else "-"
+        p95 = f"{s['p95'] * 1000:.0f}ms" if s['p95'] is not None else "-"
+        state = "✅" if s['available'] else "⛔"
+        print(f"   {state} {s['url']}  平均 {latency}  p95 {p95}  错误率 {s['error_rate']:.2%}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="测试 RPC 连接池的节点延迟")
+    parser.add_argument('--urls', default=None, help="逗号分隔的 RPC 地址，默认使用 BSC 公共节点")
+    parser.add_argument('-n', '--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    w3 = make_web3(args.urls)
+    start = time.monotonic()
+    for _ in range(args.requests):
+        w3.eth.block_number
+    elapsed = time.monotonic() - start
+    print(f"✅ {args.requests} 次请求耗时 {elapsed:.2f}s，平均 {elapsed / args.requests * 1000:.0f}ms")
+    print_stats(w3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+全量扫描 V4 PositionManager 的所有 tokenId
+将 [1, nextTokenId) 切分为固定大小的分块，由多个进程并行通过 Multicall 查询，
+每个分块的结果流式写入独立的 JSONL 文件，检查点记录已完成的分块及其读取区块，崩溃后可从断点继续，
+链重组后只需重新扫描分叉点之后读取的分块
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from web3 import Web3
+from eth_abi import decode
+
+from multicall import aggregate3, function_selector, DEFAULT_BATCH_SIZE
+from batch_query_positions import encode_position_calls, decode_position_result
+from result_sinks import JsonlSink
+from rpc_pool import make_web3, CHAIN_ENDPOINTS, BSC_CHAIN_ID
+from chain_head import get_chain_head
+
+BSC_RPC_URL = "https://bsc-dataseed1.binance.org/"
+# 默认使用全部 BSC 公共节点组成连接池，--rpc 可传入逗号分隔的节点列表
+DEFAULT_RPC_URLS = ",".join(CHAIN_ENDPOINTS[BSC_CHAIN_ID])
+POSITION_MANAGER_ADDRESS = "0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b"
+
+DEFAULT_CHUNK_SIZE = 2000
+CHECKPOINT_FILE = 'checkpoint.json'
+
+OWNER_OF_SELECTOR = function_selector("ownerOf(uint256)")
+NEXT_TOKEN_ID_SELECTOR = function_selector("nextTokenId()")
+
+# 每个工作进程各自持有一个 Web3 连接
+_worker_w3 = None
+
+
+def _init_worker(rpc_url):
+    global _worker_w3
+    _worker_w3 = make_web3(rpc_url)
+
+
+def get_next_token_id(w3, position_manager):
+    raw = w3.eth.call({'to': position_manager, 'data': NEXT_TOKEN_ID_SELECTOR})
+    return decode(['uint256'], raw)[0]
+
+
+def chunk_path(output_dir, start):
+    return os.path.join(output_dir, f"chunk_{start:012d}.jsonl")
+
+
+def _scan_chunk(output_dir, position_manager, start, end, batch_size):
+    """扫描 [start, end) 区间，边查询边写入 .part 文件，完成后原子重命名。
+    同一分块的所有查询固定在同一区块，返回 (start, 头寸数量, 区块号)
+    """
+    path = chunk_path(output_dir, start)
+    part_path = path + '.part'
+    found = 0
+    block_number = _worker_w3.eth.block_number
+    # 每个 tokenId 三个子调用: ownerOf + getPositionLiquidity + getPoolAndPositionInfo
+    tokens_per_batch = max(1, batch_size // 3)
+    with JsonlSink(part_path) as sink:
+        for batch_start in range(start, end, tokens_per_batch):
+            token_ids = list(range(batch_start, min(batch_start + tokens_per_batch, end)))
+            calls = []
+            for token_id in token_ids:
+                calls.append((position_manager, OWNER_OF_SELECTOR + token_id.to_bytes(32, 'big')))
+                calls.extend(encode_position_calls(position_manager, token_id))
+            results = aggregate3(_worker_w3, calls, len(calls), block_number)
+            for i, token_id in enumerate(token_ids):
+                owner_ok, owner_data = results[3 * i]
+                # ownerOf 回滚表示该 tokenId 已销毁，跳过
+                if not owner_ok:
+                    continue
+                record = decode_position_result(token_id, results[3 * i + 1], results[3 * i + 2])
+                record['owner'] = Web3.to_checksum_address(decode(['address'], owner_data)[0])
+                sink.write(record)
+                found += 1
+    os.replace(part_path, path)
+    return start, found, block_number
+
+
+def load_checkpoint(output_dir):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(output_dir, checkpoint):
+    """先写临时文件再替换，保证检查点文件始终完整"""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def scan_positions(output_dir, rpc_url=DEFAULT_RPC_URLS, position_manager=POSITION_MANAGER_ADDRESS,
+                   workers=4, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE, end_id=None):
+    """扫描 [1, end_id) 的所有 tokenId，end_id 默认为 nextTokenId()。
+    已有检查点时沿用检查点中的区间与分块大小，只扫描未完成的分块；
+    扫描期间每完成一个分块轮询一次链头，发生重组时重新扫描分叉点之后读取的分块
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    position_manager = Web3.to_checksum_address(position_manager)
+    w3 = make_web3(rpc_url)
+    chain_head = get_chain_head(w3)
+    chain_head.poll()
+
+    checkpoint = load_checkpoint(output_dir)
+    if checkpoint and checkpoint['position_manager'] == position_manager:
+        print(f"♻️  从检查点恢复: 已完成 {len(checkpoint['done'])} 个分块")
+    else:
+        if end_id is None:
+            end_id = get_next_token_id(w3, position_manager)
+        checkpoint = {'position_manager': position_manager, 'end_id': end_id,
+                      'chunk_size': chunk_size, 'done': [], 'blocks': {}}
+        save_checkpoint(output_dir, checkpoint)
+
+    end_id, chunk_size = checkpoint['end_id'], checkpoint['chunk_size']
+    done = set(checkpoint['done'])
+    pending = [start for start in range(1, end_id, chunk_size) if start not in done]
+    total_chunks = len(range(1, end_id, chunk_size))
+    print(f"🚀 扫描 tokenId [1, {end_id})，共 {total_chunks} 个分块，待处理 {len(pending)} 个，进程数 {workers}")
+
+    total_found = 0
+    # 本次扫描中检测到的分叉点，按检测顺序排列
+    forks = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rpc_url,)) as pool:
+        # {future: (分块起点, 提交时已检测到的分叉点数量)}
+        futures = {}
+
+        def submit(start):
+            future = pool.submit(_scan_chunk, output_dir, position_manager,
+                                 start, min(start + chunk_size, end_id), batch_size)
+            futures[future] = (start, len(forks))
+
+        for start in pending:
+            submit(start)
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start, seen = futures.pop(future)
+                try:
+                    _, found, block_number = future.result()
+                except Exception as e:
+                    print(f"   ❌ 分块 {start} 失败，下次运行时重试 - {e}")
+                    continue
+
+                try:
+                    fork = chain_head.poll()
+                except Exception as e:
+                    print(f"   ⚠️ 链头轮询失败 - {e}")
+                    fork = None
+                if fork is not None:
+                    forks.append(fork)
+                    for reset in _reset_chunks(checkpoint, output_dir, fork):
+                        submit(reset)
+                    save_checkpoint(output_dir, checkpoint)
+                # 提交后发生的重组可能使本分块读取的区块失效，保守地重新扫描
+                if any(block_number > f for f in forks[seen:]):
+                    print(f"   🔀 分块 {start} 读取于区块 {block_number}，晚于分叉点，重新扫描")
+                    submit(start)
+                    continue
+
+                total_found += found
+                checkpoint['done'].append(start)
+                checkpoint.setdefault('blocks', {})[str(start)] = block_number
+                save_checkpoint(output_dir, checkpoint)
+                print(f"   ✅ 分块 {start}-{min(start + chunk_size, end_id) - 1}: {found} 个头寸 "
+                      f"({len(checkpoint['done'])}/{total_chunks})")
+
+    print(f"\n📈 本次扫描完成，新增 {total_found} 个头寸")
+    return checkpoint
+
+
+def _reset_chunks(checkpoint, output_dir, block_number):
+    """将检查点中读取于 block_number 之后的分块标记为未完成并删除其结果（不保存检查点），
+    返回被重置的分块起点列表。不记录读取区块的旧检查点无法判断，保持不变
+    """
+    blocks = checkpoint.get('blocks', {})
+    reset = [start for start in checkpoint['done'] if blocks.get(str(start), -1) > block_number]
+    for start in reset:
+        checkpoint['done'].remove(start)
+        del blocks[str(start)]
+        if os.path.exists(chunk_path(output_dir, start)):
+            os.remove(chunk_path(output_dir, start))
+    if reset:
+        print(f"🔀 链重组：{len(reset)} 个分块读取于区块 {block_number} 之后，已标记为待重新扫描")
+    return reset
+
+
+def invalidate_after(output_dir, block_number):
+    """链重组时将分叉点之后读取的分块标记为未完成并删除其结果，下次运行时只重新扫描这些分块；
+    返回被重置的分块起点列表
+    """
+    checkpoint = load_checkpoint(output_dir)
+    if not checkpoint:
+        return []
+    reset = _reset_chunks(checkpoint, output_dir, block_number)
+    if reset:
+        save_checkpoint(output_dir, checkpoint)
+    return reset
+
+
+def iter_scan_results(output_dir):
+    """按 tokenId 顺序逐行读取已完成分块的扫描结果（liquidity / position_info 为十进制字符串）"""
+    checkpoint = load_checkpoint(output_dir) or {'done': []}
+    for start in sorted(checkpoint['done']):
+        with open(chunk_path(output_dir, start), 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全量扫描 Uniswap V4 PositionManager 头寸")
+    parser.add_argument('output_dir', help="输出目录（包含分块结果与检查点）")
+    parser.add_argument('--rpc', default=DEFAULT_RPC_URLS, help="RPC 地址，多个用逗号分隔")
+    parser.add_argument('--position-manager', default=POSITION_MANAGER_ADDRESS)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--end-id', type=int, default=None, help="扫描上限（不含），默认为 nextTokenId()")
+    args = parser.parse_args()
+    scan_positions(args.output_dir, args.rpc, args.position_manager, args.workers,
+                   args.chunk_size, args.batch_size, args.end_id)
+
+
+if __name__ == "__main__":
+    main()
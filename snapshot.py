@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+固定区块的一致性快照读取
+一次查询（或一批查询）内的所有只读调用固定在同一个区块号上执行，结果按 (区块号, 调用) 缓存：
+- 同一快照内、以及同一区块内并发的调用方发起的相同调用只在链上执行一次
+- 正在执行中的调用不会重复发出，后来者等待同一个结果
+- 快照内尚未执行的调用在离开快照（或读取任意结果）时合并为一个 JSON-RPC 批量请求
+
+    with snapshot(w3) as snap:
+        liquidity = snap.call(contract.functions.getPositionLiquidity(token_id))
+        pool_info = snap.call(contract.functions.getPoolAndPositionInfo(token_id))
+    liquidity.result(), pool_info.result()
+"""
+
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from web3 import Web3
+
+from rpc_batch import batch
+
+DEFAULT_KEEP_BLOCKS = 8      # 保留最近几个区块的快照结果
+
+
+class SnapshotCache:
+    """{区块号: {调用键: Future}}；已完成的 Future 即缓存结果，未完成的表示调用正在执行"""
+
+    def __init__(self, keep_blocks: int = DEFAULT_KEEP_BLOCKS):
+        self.keep_blocks = keep_blocks
+        self._lock = threading.Lock()
+        self._blocks: Dict[int, Dict[Hashable, Future]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def claim(self, block_number: int, key: Hashable) -> Tuple[Future, bool]:
+        """返回 (future, owner)：owner 为 True 时由调用方负责执行并设置结果，否则等待已有结果"""
+        with self._lock:
+            entries = self._blocks.get(block_number)
+            if entries is None:
+                entries = self._blocks[block_number] = {}
+                for stale in sorted(self._blocks)[:-self.keep_blocks]:
+                    del self._blocks[stale]
+            future = entries.get(key)
+            if future is not None:
+                self.hits += 1
+                return future, False
+            self.misses += 1
+            future = entries[key] = Future()
+            return future, True
+
+    def discard(self, block_number: int, key: Hashable, future: Future):
+        """调用失败时移除条目，下次重新读取（等待中的调用方仍会收到该异常）"""
+        with self._lock:
+            entries = self._blocks.get(block_number)
+            if entries is not None and entries.get(key) is future:
+                del entries[key]
+
+    def invalidate_after(self, block_number: int):
+        """链重组时丢弃 block_number 之后的快照结果"""
+        with self._lock:
+            for cached in [b for b in self._blocks if b > block_number]:
+                del self._blocks[cached]
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+class SnapshotCall:
+    """快照中登记的一个调用，result() 返回与 fn.call() 相同的解码结果"""
+
+    def __init__(self, owner: 'Snapshot', fn, key: Hashable):
+        self._owner = owner
+        self.fn = fn
+        self.key = key
+        self._future: Optional[Future] = None
+
+    def result(self):
+        if self._future is None:
+            self._owner.execute()
+        return self._future.result()
+
+
+class Snapshot:
+    def __init__(self, w3: Web3, block_number: int, cache: SnapshotCache):
+        self.w3 = w3
+        self.block_number = int(block_number)
+        self.cache = cache
+        self._pending: List[SnapshotCall] = []
+
+    def call(self, fn) -> SnapshotCall:
+        """登记一个合约只读调用（contract.functions.xxx(...)），在快照区块上执行"""
+        key = (fn.address.lower(), fn._encode_transaction_data())
+        call = SnapshotCall(self, fn, key)
+        self._pending.append(call)
+        return call
+
+    def get(self, fn) -> Any:
+        """立即读取单个调用的结果"""
+        return self.call(fn).result()
+
+    def execute(self):
+        pending, self._pending = self._pending, []
+        owned: Dict[Hashable, Tuple[Any, Future]] = {}
+        for call in pending:
+            future, owner = self.cache.claim(self.block_number, call.key)
+            call._future = future
+            if owner:
+                owned[call.key] = (call.fn, future)
+        if not owned:
+            return
+        try:
+            with batch(self.w3) as b:
+                batch_calls = [(key, future, b.call(fn, self.block_number)) for key, (fn, future) in owned.items()]
+        except Exception as e:
+            for key, (_, future) in owned.items():
+                self.cache.discard(self.block_number, key, future)
+                future.set_exception(e)
+            return
+        for key, future, batch_call in batch_calls:
+            try:
+                future.set_result(batch_call.result())
+            except Exception as e:
+                self.cache.discard(self.block_number, key, future)
+                future.set_exception(e)
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
+        return False
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_snapshot_cache(w3: Web3) -> SnapshotCache:
+    """同一个 Web3 实例共享一个快照缓存，并发的调用方可共享同一区块上的结果"""
+    with _caches_lock:
+        cache = _caches.get(w3)
+        if cache is None:
+            cache = _caches[w3] = SnapshotCache()
+        return cache
+
+
+def snapshot(w3: Web3, block_number: Optional[int] = None) -> Snapshot:
+    """创建固定在 block_number 的快照；未指定时使用最新区块号（与池子状态服务共用，短时间内复用）"""
+    if block_number is None:
+        from pool_state import get_pool_state_service
+        block_number = get_pool_state_service(w3).current_block()
+    return Snapshot(w3, block_number, get_snapshot_cache(w3))
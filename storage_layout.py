@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+通过 PoolManager.extsload(bytes32[]) 批量读取 V4 原始存储
+按 PoolManager 的存储布局计算池子 slot0 / liquidity / feeGrowthGlobal、tick 信息与头寸信息的存储槽，
+一次 extsload 读取上千个槽位，在本地解码 32 字节字，数千个池子 / 头寸只需少量几次调用
+
+存储布局（PoolManager._pools 位于槽 6，StateLibrary 中的常量）:
+  stateSlot = keccak256(poolId . 6)
+  stateSlot + 0: slot0 = | 24 bits lpFee | 24 bits protocolFee | 24 bits tick | 160 bits sqrtPriceX96 |
+  stateSlot + 1 / + 2: feeGrowthGlobal0X128 / feeGrowthGlobal1X128
+  stateSlot + 3: liquidity (uint128)
+  stateSlot + 4: ticks 映射，tickSlot = keccak256(int24 tick . (stateSlot + 4))，3 个字:
+      | int128 liquidityNet | uint128 liquidityGross |, feeGrowthOutside0X128, feeGrowthOutside1X128
+  stateSlot + 6: positions 映射，positionSlot = keccak256(positionKey . (stateSlot + 6))，3 个字:
+      liquidity (uint128), feeGrowthInside0LastX128, feeGrowthInside1LastX128
+  positionKey = keccak256(abi.encodePacked(owner, int24 tickLower, int24 tickUpper, bytes32 salt))
+PositionManager 铸造的头寸 owner 为 PositionManager 地址，salt 为 bytes32(tokenId)
+"""
+
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+from abi_table import function
+
+POOL_MANAGER_ADDRESSES = {
+    56: to_checksum_address("0x28e2Ea090877bF75740558f6BFB36A5ffeE9e9dF"),
+    130: to_checksum_address("0x1f98400000000000000000000000000000000004"),
+}
+POSITION_MANAGER_ADDRESS = to_checksum_address("0x7A4a5c919aE2541AeD11041A1AEeE68f1287f95b")
+
+POOLS_SLOT = 6
+FEE_GROWTH_GLOBAL0_OFFSET = 1
+FEE_GROWTH_GLOBAL1_OFFSET = 2
+LIQUIDITY_OFFSET = 3
+TICKS_OFFSET = 4
+TICK_BITMAP_OFFSET = 5
+POSITIONS_OFFSET = 6
+
+DEFAULT_SLOTS_PER_CALL = 1000
+
+_EXTSLOAD = function('PoolManager', 'extsload(bytes32[])')
+_MASK_128 = (1 << 128) - 1
+_MASK_160 = (1 << 160) - 1
+_MASK_24 = (1 << 24) - 1
+_UINT256 = 1 << 256
+
+Bytes32 = Union[str, bytes]
+
+
+def _to_bytes32(value: Bytes32) -> bytes:
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    if len(value) != 32:
+        raise ValueError(f"需要 32 字节，实际 {len(value)} 字节")
+    return bytes(value)
+
+
+def _slot_add(slot: bytes, offset: int) -> bytes:
+    return ((int.from_bytes(slot, 'big') + offset) % _UINT256).to_bytes(32, 'big')
+
+
+def _signed(value: int, bits: int) -> int:
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+# ---------- 存储槽计算 ----------
+def pool_state_slot(pool_id: Bytes32) -> bytes:
+    return keccak(_to_bytes32(pool_id) + POOLS_SLOT.to_bytes(32, 'big'))
+
+
+def pool_slots(pool_id: Bytes32) -> Dict[str, bytes]:
+    """池子的 slot0 / feeGrowthGlobal0 / feeGrowthGlobal1 / liquidity 存储槽"""
+    state = pool_state_slot(pool_id)
+    return {
+        'slot0': state,
+        'fee_growth_global0': _slot_add(state, FEE_GROWTH_GLOBAL0_OFFSET),
+        'fee_growth_global1': _slot_add(state, FEE_GROWTH_GLOBAL1_OFFSET),
+        'liquidity': _slot_add(state, LIQUIDITY_OFFSET),
+    }
+
+
+def tick_info_slot(pool_id: Bytes32, tick: int) -> bytes:
+    mapping_slot = _slot_add(pool_state_slot(pool_id), TICKS_OFFSET)
+    return keccak(encode(['int24'], [int(tick)]) + mapping_slot)
+
+
+def position_key(owner: str, tick_lower: int, tick_upper: int, salt: Bytes32) -> bytes:
+    """Position.calculatePositionKey：owner(20) . tickLower(3) . tickUpper(3) . salt(32) 紧密打包后取哈希"""
+    packed = (bytes.fromhex(owner[2:] if owner.startswith('0x') else owner)
+              + (int(tick_lower) & _MASK_24).to_bytes(3, 'big')
+              + (int(tick_upper) & _MASK_24).to_bytes(3, 'big')
+              + _to_bytes32(salt))
+    return keccak(packed)
+
+
+def position_info_slot(pool_id: Bytes32, owner: str, tick_lower: int, tick_upper: int, salt: Bytes32) -> bytes:
+    mapping_slot = _slot_add(pool_state_slot(pool_id), POSITIONS_OFFSET)
+    return keccak(position_key(owner, tick_lower, tick_upper, salt) + mapping_slot)
+
+
+def token_id_salt(token_id: int) -> bytes:
+    """PositionManager 以 bytes32(tokenId) 作为 salt"""
+    return int(token_id).to_bytes(32, 'big')
+
+
+# ---------- 字解码 ----------
+def decode_slot0(word: bytes) -> Dict[str, int]:
+    value = int.from_bytes(word, 'big')
+    return {
+        'sqrt_price_x96': value & _MASK_160,
+        'tick': _signed((value >> 160) & _MASK_24, 24),
+        'protocol_fee': (value >> 184) & _MASK_24,
+        'lp_fee': (value >> 208) & _MASK_24,
+    }
+
+
+def decode_pool_state(words: Sequence[bytes]) -> Dict[str, int]:
+    """pool_slots 顺序的 4 个字：slot0、feeGrowthGlobal0、feeGrowthGlobal1、liquidity"""
+    state = decode_slot0(words[0])
+    state['fee_growth_global0_x128'] = int.from_bytes(words[1], 'big')
+    state['fee_growth_global1_x128'] = int.from_bytes(words[2], 'big')
+    state['liquidity'] = int.from_bytes(words[3], 'big') & _MASK_128
+    return state
+
+
+def decode_tick_info(words: Sequence[bytes]) -> Dict[str, int]:
+    first = int.from_bytes(words[0], 'big')
+    return {
+        'liquidity_gross': first & _MASK_128,
+        'liquidity_net': _signed(first >> 128, 128),
+        'fee_growth_outside0_x128': int.from_bytes(words[1], 'big'),
+        'fee_growth_outside1_x128': int.from_bytes(words[2], 'big'),
+    }
+
+
+def decode_position_state(words: Sequence[bytes]) -> Dict[str, int]:
+    return {
+        'liquidity': int.from_bytes(words[0], 'big') & _MASK_128,
+        'fee_growth_inside0_last_x128': int.from_bytes(words[1], 'big'),
+        'fee_growth_inside1_last_x128': int.from_bytes(words[2], 'big'),
+    }
+
+
+def fee_growth_inside(tick: int, tick_lower: int, tick_upper: int, global0: int, global1: int,
+                      lower: Dict[str, int], upper: Dict[str, int]) -> Tuple[int, int]:
+    """与 Pool.getFeeGrowthInside 相同（模 2^256 运算）"""
+    results = []
+    for global_growth, key in ((global0, 'fee_growth_outside0_x128'), (global1, 'fee_growth_outside1_x128')):
+        if tick < tick_lower:
+            inside = lower[key] - upper[key]
+        elif tick >= tick_upper:
+            inside = upper[key] - lower[key]
+        else:
+            inside = global_growth - lower[key] - upper[key]
+        results.append(inside % _UINT256)
+    return results[0], results[1]
+
+
+# ---------- 读取 ----------
+def encode_extsload(slots: Sequence[bytes]) -> bytes:
+    return _EXTSLOAD.selector + encode(['bytes32[]'], [list(slots)])
+
+
+def decode_extsload(data: bytes, count: int) -> List[bytes]:
+    """bytes32[] 返回值：偏移(32) + 长度(32) + 各个字，直接切片即可"""
+    data = bytes(data)
+    length = int.from_bytes(data[32:64], 'big')
+    if length != count:
+        raise ValueError(f"extsload 返回 {length} 个槽位，期望 {count} 个")
+    return [data[64 + 32 * i:96 + 32 * i] for i in range(count)]
+
+
+class StorageReader:
+    """通过 extsload 批量读取存储槽；同一次读取的所有分批固定在同一区块，并合并为一个 JSON-RPC 批量请求"""
+
+    def __init__(self, w3, pool_manager: Optional[str] = None, slots_per_call: int = DEFAULT_SLOTS_PER_CALL):
+        self.w3 = w3
+        self._pool_manager = to_checksum_address(pool_manager) if pool_manager else None
+        self.slots_per_call = slots_per_call
+
+    @property
+    def pool_manager(self) -> str:
+        if self._pool_manager is None:
+            chain_id = int(self.w3.eth.chain_id)
+            if chain_id not in POOL_MANAGER_ADDRESSES:
+                raise ValueError(f"链 {chain_id} 未配置 PoolManager 地址，请显式传入 pool_manager")
+            self._pool_manager = POOL_MANAGER_ADDRESSES[chain_id]
+        return self._pool_manager
+
+    def read_slots(self, slots: Sequence[bytes], block_identifier=None) -> List[bytes]:
+        from rpc_batch import batch
+
+        slots = list(slots)
+        if not slots:
+            return []
+        if block_identifier is None:
+            block_identifier = int(self.w3.eth.block_number)
+        chunks = [slots[i:i + self.slots_per_call] for i in range(0, len(slots), self.slots_per_call)]
+        block_param = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        with batch(self.w3) as b:
+            calls = [b.request('eth_call', [{'to': self.pool_manager, 'data': '0x' + encode_extsload(chunk).hex()},
+                                            block_param])
+                     for chunk in chunks]
+        words: List[bytes] = []
+        for chunk, call in zip(chunks, calls):
+            result = call.result()
+            data = bytes.fromhex(result[2:]) if isinstance(result, str) else bytes(result)
+            words.extend(decode_extsload(data, len(chunk)))
+        return words
+
+    def pool_states(self, pool_ids: Iterable[Bytes32], block_identifier=None) -> Dict[str, Dict[str, int]]:
+        """{poolId: {sqrt_price_x96, tick, protocol_fee, lp_fee, liquidity, fee_growth_global0/1_x128}}"""
+        pool_ids = list(dict.fromkeys('0x' + _to_bytes32(p).hex() for p in pool_ids))
+        slots = []
+        for pool_id in pool_ids:
+            s = pool_slots(pool_id)
+            slots.extend((s['slot0'], s['fee_growth_global0'], s['fee_growth_global1'], s['liquidity']))
+        words = self.read_slots(slots, block_identifier)
+        return {pool_id: decode_pool_state(words[4 * i:4 * i + 4]) for i, pool_id in enumerate(pool_ids)}
+
+    def tick_infos(self, items: Iterable[Tuple[Bytes32, int]], block_identifier=None) -> Dict[Tuple[str, int], Dict[str, int]]:
+        """items 为 (poolId, tick)，返回 {(poolId, tick): tick 信息}"""
+        keys = list(dict.fromkeys(('0x' + _to_bytes32(p).hex(), int(t)) for p, t in items))
+        slots = []
+        for pool_id, tick in keys:
+            base = tick_info_slot(pool_id, tick)
+            slots.extend((base, _slot_add(base, 1), _slot_add(base, 2)))
+        words = self.read_slots(slots, block_identifier)
+        return {key: decode_tick_info(words[3 * i:3 * i + 3]) for i, key in enumerate(keys)}
+
+    def position_states(self, items: Sequence[Tuple[Bytes32, str, int, int, Bytes32]],
+                        block_identifier=None) -> List[Dict[str, int]]:
+        """items 为 (poolId, owner, tickLower, tickUpper, salt)，按输入顺序返回头寸状态"""
+        slots = []
+        for pool_id, owner, tick_lower, tick_upper, salt in items:
+            base = position_info_slot(pool_id, owner, tick_lower, tick_upper, salt)
+            slots.extend((base, _slot_add(base, 1), _slot_add(base, 2)))
+        words = self.read_slots(slots, block_identifier)
+        return [decode_position_state(words[3 * i:3 * i + 3]) for i in range(len(items))]
+
+    def read_positions(self, positions: Sequence[Dict[str, Any]], position_manager: str = POSITION_MANAGER_ADDRESS,
+                       block_identifier=None) -> List[Dict[str, Any]]:
+        """为 PositionManager 头寸（需包含 token_id / pool_id / tick_lower / tick_upper）在同一区块内读取
+        头寸、池子与边界 tick 的状态，并计算未领取的手续费 fees0 / fees1
+        """
+        if block_identifier is None:
+            block_identifier = int(self.w3.eth.block_number)
+        position_manager = to_checksum_address(position_manager)
+        items = [(p['pool_id'], position_manager, p['tick_lower'], p['tick_upper'], token_id_salt(p['token_id']))
+                 for p in positions]
+        # 三类槽位合并到一次读取中
+        pool_ids = list(dict.fromkeys('0x' + _to_bytes32(p['pool_id']).hex() for p in positions))
+        tick_keys = list(dict.fromkeys(('0x' + _to_bytes32(p['pool_id']).hex(), int(t))
+                                       for p in positions for t in (p['tick_lower'], p['tick_upper'])))
+        slots = []
+        for item in items:
+            base = position_info_slot(*item)
+            slots.extend((base, _slot_add(base, 1), _slot_add(base, 2)))
+        for pool_id in pool_ids:
+            s = pool_slots(pool_id)
+            slots.extend((s['slot0'], s['fee_growth_global0'], s['fee_growth_global1'], s['liquidity']))
+        for pool_id, tick in tick_keys:
+            base = tick_info_slot(pool_id, tick)
+            slots.extend((base, _slot_add(base, 1), _slot_add(base, 2)))
+        words = self.read_slots(slots, block_identifier)
+
+        offset = 3 * len(items)
+        pools = {pool_id: decode_pool_state(words[offset + 4 * i:offset + 4 * i + 4]) for i, pool_id in enumerate(pool_ids)}
+        offset += 4 * len(pool_ids)
+        ticks = {key: decode_tick_info(words[offset + 3 * i:offset + 3 * i + 3]) for i, key in enumerate(tick_keys)}
+
+        results = []
+        for i, p in enumerate(positions):
+            pool_id = '0x' + _to_bytes32(p['pool_id']).hex()
+            state = decode_position_state(words[3 * i:3 * i + 3])
+            pool = pools[pool_id]
+            inside0, inside1 = fee_growth_inside(pool['tick'], p['tick_lower'], p['tick_upper'],
+                                                 pool['fee_growth_global0_x128'], pool['fee_growth_global1_x128'],
+                                                 ticks[(pool_id, int(p['tick_lower']))],
+                                                 ticks[(pool_id, int(p['tick_upper']))])
+            fees0 = ((inside0 - state['fee_growth_inside0_last_x128']) % _UINT256) * state['liquidity'] >> 128
+            fees1 = ((inside1 - state['fee_growth_inside1_last_x128']) % _UINT256) * state['liquidity'] >> 128
+            results.append({'token_id': p['token_id'], 'pool_id': pool_id, 'block_number': block_identifier,
+                            'tick': pool['tick'], 'sqrt_price_x96': pool['sqrt_price_x96'],
+                            **state, 'fees0': fees0, 'fees1': fees1})
+        return results
+
+
+def main():
+    from client_registry import get_web3
+
+    parser = argparse.ArgumentParser(description="通过 extsload 批量读取 V4 池子状态")
+    parser.add_argument('pool_ids', nargs='+', help="32 字节 PoolId（0x 开头）")
+    parser.add_argument('--rpc', default=None, help="RPC 地址，多个用逗号分隔，默认 BSC 公共节点")
+    parser.add_argument('--pool-manager', default=None)
+    args = parser.parse_args()
+
+    reader = StorageReader(get_web3(args.rpc), args.pool_manager)
+    for pool_id, state in reader.pool_states(args.pool_ids).items():
+        print(f"\n🏊 {pool_id}")
+        print(f"   sqrtPriceX96: {state['sqrt_price_x96']}")
+        print(f"   tick: {state['tick']}  lpFee: {state['lp_fee']}  protocolFee: {state['protocol_fee']}")
+        print(f"   liquidity: {state['liquidity']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 仓库为平铺模块，测试时把仓库根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from tick_math import (MIN_TICK, MAX_TICK, MIN_SQRT_PRICE, MAX_SQRT_PRICE,
+                       get_sqrt_price_at_tick, get_tick_at_sqrt_price)
+
+Q96 = 1 << 96
+
+
+def test_sqrt_price_bounds():
+    assert get_sqrt_price_at_tick(MIN_TICK) == MIN_SQRT_PRICE
+    assert get_sqrt_price_at_tick(MAX_TICK) == MAX_SQRT_PRICE
+    assert get_sqrt_price_at_tick(0) == Q96
+
+
+def test_sqrt_price_adjacent_ticks():
+    # 与 TickMath.getSqrtPriceAtTick(±1) 的链上结果一致
+    assert get_sqrt_price_at_tick(1) == 79232123823359799118286999568
+    assert get_sqrt_price_at_tick(-1) == 79224201403219477170569942574
+
+
+def test_tick_at_sqrt_price_bounds():
+    assert get_tick_at_sqrt_price(MIN_SQRT_PRICE) == MIN_TICK
+    assert get_tick_at_sqrt_price(MAX_SQRT_PRICE - 1) == MAX_TICK - 1
+    assert get_tick_at_sqrt_price(Q96) == 0
+    assert get_tick_at_sqrt_price(Q96 - 1) == -1
+
+
+def test_round_trip():
+    rng = random.Random(0)
+    ticks = [MIN_TICK, MIN_TICK + 1, -1, 0, 1, MAX_TICK - 1] + [rng.randint(MIN_TICK, MAX_TICK - 1) for _ in range(2000)]
+    for tick in ticks:
+        sqrt_price = get_sqrt_price_at_tick(tick)
+        assert get_tick_at_sqrt_price(sqrt_price) == tick
+        # 返回满足 getSqrtPriceAtTick(tick) <= sqrtPriceX96 的最大 tick
+        if tick > MIN_TICK:
+            assert get_tick_at_sqrt_price(sqrt_price - 1) == tick - 1
+        assert get_tick_at_sqrt_price(get_sqrt_price_at_tick(tick + 1) - 1) == tick
+
+
+@pytest.mark.parametrize('tick', [MIN_TICK - 1, MAX_TICK + 1])
+def test_tick_out_of_range(tick):
+    with pytest.raises(ValueError):
+        get_sqrt_price_at_tick(tick)
+
+
+@pytest.mark.parametrize('sqrt_price', [0, MIN_SQRT_PRICE - 1, MAX_SQRT_PRICE])
+def test_sqrt_price_out_of_range(sqrt_price):
+    with pytest.raises(ValueError):
+        get_tick_at_sqrt_price(sqrt_price)
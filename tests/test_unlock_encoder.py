@@ -0,0 +1,49 @@
+import pytest
+
+from unlock_encoder import (MAX_UINT128, encode_unlock_data, encode_unlock_data_eth_abi, encode_unlock_data_hex,
+                            encode_unlock_data_bulk)
+
+CURRENCY0 = '0x55d398326f99059fF775485246999027B3197955'
+CURRENCY1 = '0xfAB99fCF605fD8f4593EDb70A43bA56542777777'
+RECIPIENT = '0xD290A5E8b8f4fB82B22104C7543574CCd48ab472'
+
+
+@pytest.mark.parametrize('token_id, liquidity, amount0_min, amount1_min', [
+    (1, 0, 0, 0),
+    (60375, 2069679014400569651, 0, 0),
+    ((1 << 256) - 1, MAX_UINT128, MAX_UINT128, 1),
+])
+def test_template_matches_eth_abi(token_id, liquidity, amount0_min, amount1_min):
+    expected = encode_unlock_data_eth_abi(token_id, CURRENCY0, CURRENCY1, RECIPIENT,
+                                          liquidity, amount0_min, amount1_min)
+    assert encode_unlock_data(token_id, CURRENCY0, CURRENCY1, RECIPIENT, liquidity, amount0_min, amount1_min) == expected
+    # 地址大小写不影响模板编码
+    assert encode_unlock_data(token_id, CURRENCY0.lower(), CURRENCY1.upper().replace('0X', '0x'), RECIPIENT.lower(),
+                              liquidity, amount0_min, amount1_min) == expected
+
+
+def test_hook_data_uses_eth_abi_path():
+    expected = encode_unlock_data_eth_abi(7, CURRENCY0, CURRENCY1, RECIPIENT, 5, 0, 0, b'\xaa' * 40)
+    assert encode_unlock_data(7, CURRENCY0, CURRENCY1, RECIPIENT, 5, 0, 0, b'\xaa' * 40) == expected
+
+
+def test_bulk_matches_single():
+    positions = [
+        {'token_id': 1, 'liquidity': 10, 'currency0': CURRENCY0, 'currency1': CURRENCY1},
+        {'token_id': 2, 'liquidity': 20, 'currency0': CURRENCY1, 'currency1': CURRENCY0,
+         'amount0_min': 3, 'amount1_min': 4},
+    ]
+    expected = [encode_unlock_data_hex(p['token_id'], p['currency0'], p['currency1'], RECIPIENT, p['liquidity'],
+                                       p.get('amount0_min', 0), p.get('amount1_min', 0)) for p in positions]
+    assert encode_unlock_data_bulk(positions, RECIPIENT) == expected
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'liquidity': MAX_UINT128 + 1},
+    {'amount0_min': -1},
+    {'recipient': '0x1234'},
+])
+def test_invalid_input_rejected(kwargs):
+    args = {'token_id': 1, 'currency0': CURRENCY0, 'currency1': CURRENCY1, 'recipient': RECIPIENT, **kwargs}
+    with pytest.raises(ValueError):
+        encode_unlock_data(**args)
@@ -0,0 +1,86 @@
+import pytest
+from eth_abi import encode
+
+from v4_codec import (MODIFY_LIQUIDITIES_SELECTOR, encode_action, encode_unlock_actions,
+                      encode_modify_liquidities, decode_unlock_data, decode_calldata)
+
+CURRENCY0 = '0x55d398326f99059fF775485246999027B3197955'
+CURRENCY1 = '0xfAB99fCF605fD8f4593EDb70A43bA56542777777'
+RECIPIENT = '0xD290A5E8b8f4fB82B22104C7543574CCd48ab472'
+HOOKS = '0x0000000000000000000000000000000000000000'
+
+DECREASE = {'tokenId': 60375, 'liquidity': 2069679014400569651, 'amount0Min': 1, 'amount1Min': 2,
+            'hookData': b'\x01\x02\x03'}
+TAKE_PAIR = {'currency0': CURRENCY0, 'currency1': CURRENCY1, 'recipient': RECIPIENT}
+MINT = {'poolKey': {'currency0': CURRENCY0, 'currency1': CURRENCY1, 'fee': 500, 'tickSpacing': 10, 'hooks': HOOKS},
+        'tickLower': -887270, 'tickUpper': 120, 'liquidity': 10 ** 18, 'amount0Max': (1 << 128) - 1,
+        'amount1Max': 5, 'owner': RECIPIENT, 'hookData': b''}
+
+
+def _eth_abi_decrease(p):
+    return encode(['uint256', 'uint256', 'uint128', 'uint128', 'bytes'],
+                  [p['tokenId'], p['liquidity'], p['amount0Min'], p['amount1Min'], p['hookData']])
+
+
+def _eth_abi_take_pair(p):
+    return encode(['address', 'address', 'address'], [p['currency0'], p['currency1'], p['recipient']])
+
+
+def _eth_abi_mint(p):
+    key = p['poolKey']
+    return encode(['(address,address,uint24,int24,address)', 'int24', 'int24', 'uint256', 'uint128', 'uint128',
+                   'address', 'bytes'],
+                  [(key['currency0'], key['currency1'], key['fee'], key['tickSpacing'], key['hooks']),
+                   p['tickLower'], p['tickUpper'], p['liquidity'], p['amount0Max'], p['amount1Max'],
+                   p['owner'], p['hookData']])
+
+
+def test_encode_action_matches_eth_abi():
+    assert encode_action('DECREASE_LIQUIDITY', DECREASE) == _eth_abi_decrease(DECREASE)
+    assert encode_action('TAKE_PAIR', TAKE_PAIR) == _eth_abi_take_pair(TAKE_PAIR)
+    assert encode_action('MINT_POSITION', MINT) == _eth_abi_mint(MINT)
+
+
+def test_encode_unlock_actions_matches_eth_abi():
+    actions = [('MINT_POSITION', MINT), ('DECREASE_LIQUIDITY', DECREASE), ('TAKE_PAIR', TAKE_PAIR)]
+    expected = encode(['bytes', 'bytes[]'], [bytes([0x02, 0x01, 0x11]),
+                                             [_eth_abi_mint(MINT), _eth_abi_decrease(DECREASE),
+                                              _eth_abi_take_pair(TAKE_PAIR)]])
+    assert encode_unlock_actions(actions) == expected
+
+
+def test_decode_unlock_data_round_trip():
+    unlock_data = encode(['bytes', 'bytes[]'], [bytes([0x02, 0x01, 0x11]),
+                                                [_eth_abi_mint(MINT), _eth_abi_decrease(DECREASE),
+                                                 _eth_abi_take_pair(TAKE_PAIR)]])
+    actions, params = decode_unlock_data(unlock_data)
+    assert actions == [0x02, 0x01, 0x11]
+    mint, decrease, take_pair = params
+    assert mint['poolKey'] == MINT['poolKey']
+    assert (mint['tickLower'], mint['tickUpper'], mint['amount0Max']) == (MINT['tickLower'], MINT['tickUpper'],
+                                                                          MINT['amount0Max'])
+    assert decrease['hookDataHex'] == '0x010203'
+    assert decrease['liquidity'] == DECREASE['liquidity']
+    assert take_pair == {'action': 'TAKE_PAIR', **TAKE_PAIR}
+
+
+def test_encode_modify_liquidities_matches_eth_abi():
+    actions = [('DECREASE_LIQUIDITY', DECREASE), ('TAKE_PAIR', TAKE_PAIR)]
+    calldata = encode_modify_liquidities(actions, 1700000000)
+    assert calldata == MODIFY_LIQUIDITIES_SELECTOR + encode(['bytes', 'uint256'],
+                                                            [encode_unlock_actions(actions), 1700000000])
+    decoded = decode_calldata(calldata)
+    assert decoded['method'] == 'modifyLiquidities'
+    assert decoded['deadline'] == 1700000000
+    assert decoded['actions'] == [0x01, 0x11]
+
+
+def test_unknown_action_rejected():
+    with pytest.raises(ValueError):
+        encode_action(0x7f, {})
+
+
+def test_truncated_unlock_data_rejected():
+    unlock_data = encode_unlock_actions([('TAKE_PAIR', TAKE_PAIR)])
+    with pytest.raises(ValueError):
+        decode_unlock_data(unlock_data[:-32])
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Uniswap v4 TickMath / SqrtPriceMath 的整数实现
+与合约逐位一致，不使用浮点数
+"""
+
+import math
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable, List
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_PRICE = 4295128739
+MAX_SQRT_PRICE = 1461446703485210103287273052203988822378723970342
+
+Q96 = 1 << 96
+MAX_UINT256 = (1 << 256) - 1
+
+# TickMath.getSqrtPriceAtTick 中各二进制位对应的 Q128 乘数
+_TICK_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+@lru_cache(maxsize=65536)
+def get_sqrt_price_at_tick(tick: int) -> int:
+    """TickMath.getSqrtPriceAtTick: 返回 sqrt(1.0001^tick) * 2^96（Q64.96）"""
+    tick = int(tick)
+    if tick < MIN_TICK or tick > MAX_TICK:
+        raise ValueError(f"tick 超出范围: {tick}")
+    abs_tick = abs(tick)
+    price = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 1 << 128
+    for bit, factor in _TICK_FACTORS:
+        if abs_tick & bit:
+            price = (price * factor) >> 128
+    if tick > 0:
+        price = MAX_UINT256 // price
+    # Q128.128 -> Q64.96，向上取整
+    return (price >> 32) + (1 if price & 0xFFFFFFFF else 0)
+
+
+# ---------- FullMath ----------
+def mul_div(a: int, b: int, denominator: int) -> int:
+    return a * b // denominator
+
+
+def mul_div_rounding_up(a: int, b: int, denominator: int) -> int:
+    return -(-(a * b) // denominator)
+
+
+# ---------- SqrtPriceMath ----------
+def get_amount0_delta(sqrt_price_a: int, sqrt_price_b: int, liquidity: int, round_up: bool = False) -> int:
+    """SqrtPriceMath.getAmount0Delta: liquidity * (sqrtB - sqrtA) / (sqrtA * sqrtB)"""
+    if sqrt_price_a > sqrt_price_b:
+        sqrt_price_a, sqrt_price_b = sqrt_price_b, sqrt_price_a
+    if sqrt_price_a == 0:
+        raise ValueError("sqrtPrice 不能为 0")
+    numerator1 = int(liquidity) << 96
+    numerator2 = sqrt_price_b - sqrt_price_a
+    if round_up:
+        return -(-mul_div_rounding_up(numerator1, numerator2, sqrt_price_b) // sqrt_price_a)
+    return mul_div(numerator1, numerator2, sqrt_price_b) // sqrt_price_a
+
+
+def get_amount1_delta(sqrt_price_a: int, sqrt_price_b: int, liquidity: int, round_up: bool = False) -> int:
+    """SqrtPriceMath.getAmount1Delta: liquidity * (sqrtB - sqrtA)"""
+    if sqrt_price_a > sqrt_price_b:
+        sqrt_price_a, sqrt_price_b = sqrt_price_b, sqrt_price_a
+    if round_up:
+        return mul_div_rounding_up(int(liquidity), sqrt_price_b - sqrt_price_a, Q96)
+    return mul_div(int(liquidity), sqrt_price_b - sqrt_price_a, Q96)
+
+
+def get_tick_at_sqrt_price(sqrt_price_x96: int) -> int:
+    """TickMath.getTickAtSqrtPrice: 返回满足 getSqrtPriceAtTick(tick) <= sqrtPriceX96 的最大 tick"""
+    sqrt_price_x96 = int(sqrt_price_x96)
+    if sqrt_price_x96 < MIN_SQRT_PRICE or sqrt_price_x96 >= MAX_SQRT_PRICE:
+        raise ValueError(f"sqrtPriceX96 超出范围: {sqrt_price_x96}")
+    price = sqrt_price_x96 << 32
+    msb = price.bit_length() - 1
+    r = price >> (msb - 127) if msb >= 128 else price << (127 - msb)
+
+    # 以 2 为底的对数，Q64.64，保留 14 位小数精度（与合约相同）
+    log_2 = (msb - 128) << 64
+    for shift in range(63, 49, -1):
+        r = (r * r) >> 127
+        f = r >> 128
+        log_2 |= f << shift
+        r >>= f
+
+    # 换底为 sqrt(1.0001)，Q128.128；Python 的 >> 对负数同样是算术右移
+    log_sqrt10001 = log_2 * 255738958999603826347141
+    tick_low = (log_sqrt10001 - 3402992956809132418596140100660247210) >> 128
+    tick_hi = (log_sqrt10001 + 291339464771989622907027621153398088495) >> 128
+    if tick_low == tick_hi:
+        return tick_low
+    return tick_hi if get_sqrt_price_at_tick(tick_hi) <= sqrt_price_x96 else tick_low
+
+
+def scale_sqrt_price(sqrt_price_x96: int, numerator: int, denominator: int) -> int:
+    """价格乘以 numerator / denominator 后对应的 sqrtPriceX96（整数开方，向下取整）"""
+    return math.isqrt(int(sqrt_price_x96) ** 2 * numerator // denominator)
+
+
+# ---------- 批量接口 ----------
+def get_sqrt_prices_at_ticks(ticks: Iterable[int]) -> List[int]:
+    """批量 getSqrtPriceAtTick，接受列表或 numpy 数组；重复 tick 命中 lru_cache"""
+    return [get_sqrt_price_at_tick(int(tick)) for tick in ticks]
+
+
+def get_ticks_at_sqrt_prices(sqrt_prices: Iterable[int]) -> List[int]:
+    """批量 getTickAtSqrtPrice"""
+    return [get_tick_at_sqrt_price(int(sqrt_price)) for sqrt_price in sqrt_prices]
+
+
+class SqrtPriceTable:
+    """按 tickSpacing 对齐的 tick -> sqrtPriceX96 预计算表。
+    查表代替逐个计算；sqrtPrice -> tick 方向通过二分查找得到向下对齐的 tick
+    """
+
+    def __init__(self, tick_spacing: int, min_tick: int = MIN_TICK, max_tick: int = MAX_TICK):
+        if tick_spacing <= 0:
+            raise ValueError(f"tickSpacing 必须为正数: {tick_spacing}")
+        self.tick_spacing = tick_spacing
+        # 只保留范围内对齐到 tickSpacing 的 tick
+        self.min_tick = -(-max(min_tick, MIN_TICK) // tick_spacing) * tick_spacing
+        self.max_tick = min(max_tick, MAX_TICK) // tick_spacing * tick_spacing
+        self._sqrt_prices = [get_sqrt_price_at_tick.__wrapped__(tick)
+                             for tick in range(self.min_tick, self.max_tick + 1, tick_spacing)]
+
+    def __len__(self):
+        return len(self._sqrt_prices)
+
+    def _index(self, tick: int) -> int:
+        tick = int(tick)
+        if tick % self.tick_spacing or not self.min_tick <= tick <= self.max_tick:
+            raise ValueError(f"tick {tick} 未对齐到 tickSpacing {self.tick_spacing} 或不在表范围内")
+        return (tick - self.min_tick) // self.tick_spacing
+
+    def sqrt_price(self, tick: int) -> int:
+        return self._sqrt_prices[self._index(tick)]
+
+    def sqrt_prices(self, ticks: Iterable[int]) -> List[int]:
+        return [self._sqrt_prices[self._index(tick)] for tick in ticks]
+
+    def floor_tick(self, sqrt_price_x96: int) -> int:
+        """返回 sqrtPrice <= sqrt_price_x96 的最大对齐 tick（低于表下限时返回下限）"""
+        index = bisect_right(self._sqrt_prices, int(sqrt_price_x96)) - 1
+        return self.min_tick + max(index, 0) * self.tick_spacing
+
+    def floor_ticks(self, sqrt_prices: Iterable[int]) -> List[int]:
+        return [self.floor_tick(sqrt_price) for sqrt_price in sqrt_prices]
+
+
+@lru_cache(maxsize=32)
+def get_sqrt_price_table(tick_spacing: int, min_tick: int = MIN_TICK, max_tick: int = MAX_TICK) -> SqrtPriceTable:
+    """进程内共享的预计算表，同一 tickSpacing 与范围只构建一次"""
+    return SqrtPriceTable(tick_spacing, min_tick, max_tick)
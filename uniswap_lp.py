@@ -7,7 +7,49 @@ from Utils.EVMutils import EVM
 from Log.Loging import log, inv_log
 from config import percentages_,  amount0, private_key, name_pools, auto_amount, proxy
 from Contract.Contracts import contract_withdrawal
-from web3.exceptions import ContractLogicError
+from client_registry import get_registry
+from nonce_manager import get_nonce_manager
+from owner_index import OwnerIndex
+from chain_head import get_chain_head
+from receipt_decoder import decode_mint_receipt
+from receipt_tracker import get_receipt_tracker, ReceiptTimeout
+from retry_policy import READ_POLICY, API_POLICY, ResponseFormatError, RetryError, CircuitOpenError
+from pool_state import get_pool_state_service, TICK_SPACING_BY_FEE
+from position_valuation import pool_id_of
+from web3.exceptions import ContractLogicError, TransactionNotFound
+
+
+# 估算 gas 后的安全余量
+GAS_MULTIPLIER = 1.2
+# 等待同一笔交易回执的最多轮数，每轮最长 receipts.timeout 秒
+MAX_RECEIPT_WAITS = 10
+# nft_uni 的 Transfer 持有人索引文件
+OWNER_INDEX_PATH = 'owner_index_nft_uni.sqlite3'
+# 索引首次建立时的起始区块，None 时按 eth_getCode 查找 PositionManager 部署区块（需要归档节点）
+OWNER_INDEX_START_BLOCK = None
+# check_id_V4 内联追赶的最大区块数，落后更多时先回退到 ownerOf 探测，由 sync_owner_index 单独追赶
+MAX_INDEX_LAG = 5000
+
+
+def _log_retry(error, kind, attempt, delay):
+    log().error(f'{error} | {kind}, retry #{attempt} in {delay:.2f}s')
+
+
+def _client(name):
+    """contract_withdrawal 每次调用都会新建 Web3 与合约，按名称缓存到进程级注册表"""
+    return get_registry().memoize(('contract_withdrawal', name), lambda: contract_withdrawal(name))
+
+
+def _owner_index():
+    """nft_uni 的持有人索引（进程内共享）。索引文件首次建立时从 OWNER_INDEX_START_BLOCK（默认部署区块）开始，
+    回填由 UniSwap.sync_owner_index 完成；链重组时回滚分叉点之后的索引
+    """
+    def build():
+        web3, contract = _client('nft_uni')
+        index = OwnerIndex(web3, contract.address, OWNER_INDEX_PATH, start_block=OWNER_INDEX_START_BLOCK)
+        get_chain_head(web3).subscribe(index.invalidate_after)
+        return index
+    return get_registry().memoize(('owner_index', 'nft_uni'), build)
 
 
 class UniSwap:
@@ -75,8 +117,13 @@ class UniSwap:
                 'http': proxy,
                 'https': proxy
             })
-        self.web3, _ = contract_withdrawal('nft_uni')
+        self.web3, _ = _client('nft_uni')
         self.wallet = self.web3.eth.account.from_key(private_key).address
+        # 本地分配 nonce，缓存 chainId / gasPrice
+        self.nonces = get_nonce_manager(self.web3, self.wallet)
+        # 发送后等待回执，出块即返回
+        self.receipts = get_receipt_tracker(self.web3)
+        self.sync_owner_index()
         self.session.headers = {
             'accept': '*/*',
             'accept-language': 'ru,en;q=0.9,ru-BY;q=0.8,ru-RU;q=0.7,en-US;q=0.6',
@@ -98,19 +145,66 @@ class UniSwap:
             'x-universal-router-version': '2.0'
         }
 
-    def check_pool_tick(self, name_pool):
+    def _send_tx(self, web3, tx, module_str):
+        """签名并发送交易，等待回执：成功返回回执，链上执行失败返回 None"""
+        if not tx.get('gas'):
+            estimate = web3.eth.estimate_gas({k: v for k, v in tx.items() if k != 'gas'})
+            tx['gas'] = int(estimate * GAS_MULTIPLIER)
+        signed = web3.eth.account.sign_transaction(tx, private_key)
         try:
-            _, contract = contract_withdrawal('ETH-USDC')
-            return contract.functions.slot0().call()
+            tx_hash = web3.to_hex(web3.eth.send_raw_transaction(signed.rawTransaction))
         except BaseException as error:
-            log().error(error)
-            time.sleep(10)
-            return self.check_pool_tick(name_pool)
+            self.nonces.handle_send_error(tx['nonce'], error)
+            raise
+        log().info(f'{module_str} | {tx_hash}')
+        receipt = self._await_receipt(web3, tx_hash, signed.rawTransaction, tx['nonce'], module_str)
+        if receipt is None:
+            return None
+        if receipt['status'] != 1:
+            log().error(f'{module_str} | reverted {tx_hash}')
+            return None
+        return receipt
+
+    def _await_receipt(self, web3, tx_hash, raw_tx, nonce, module_str):
+        """等待同一笔交易的回执直到有结果：超时说明交易仍在排队，不能重置 nonce 另发新交易（会重复铸造 / 提取）。
+        节点丢弃了交易时重新广播同一笔签名交易（哈希不变）；nonce 已被其他交易占用时返回 None。
+        等待 MAX_RECEIPT_WAITS 轮仍无回执（交易价格过低长期排队或节点不可用）时抛出 ReceiptTimeout，交由调用方处理
+        """
+        for _ in range(MAX_RECEIPT_WAITS):
+            try:
+                return self.receipts.wait(tx_hash)
+            except ReceiptTimeout:
+                log().error(f'{module_str} | still pending {tx_hash}')
+            try:
+                web3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                if web3.eth.get_transaction_count(self.wallet) > nonce:
+                    try:
+                        return web3.eth.get_transaction_receipt(tx_hash)
+                    except TransactionNotFound:
+                        log().error(f'{module_str} | nonce {nonce} used by another tx, {tx_hash} dropped')
+                        return None
+                try:
+                    web3.eth.send_raw_transaction(raw_tx)
+                    log().info(f'{module_str} | rebroadcast {tx_hash}')
+                except Exception as error:
+                    log().error(f'{module_str} | rebroadcast failed: {error}')
+            except Exception as error:
+                # 查询失败不影响等待，下一轮继续
+                log().error(f'{module_str} | {error}')
+        raise ReceiptTimeout(f'{module_str} | no receipt after {MAX_RECEIPT_WAITS} waits: {tx_hash}')
+
+    @READ_POLICY(upstream='rpc', on_retry=_log_retry)
+    def check_pool_tick(self, name_pool):
+        web3, contract = _client('ETH-USDC')
+        # 同一区块内的多次查询复用同一次 slot0 读取
+        return get_pool_state_service(web3).cached(
+            ('slot0', contract.address), lambda block: contract.functions.slot0().call(block_identifier=block))
 
     @staticmethod
     def check_amount1(pool_tick, tickLow, tickHigh, value):
         address_pool = UniSwap.addresses_pools['ETH-USDC-base']
-        _, contract = contract_withdrawal('check_amount1')
+        _, contract = _client('check_amount1')
         return contract.functions.estimateAmount1(value,
                                                   address_pool,
                                                   pool_tick[0],
@@ -120,7 +214,7 @@ class UniSwap:
     @staticmethod
     def check_amount0(pool_tick, tickLow, tickHigh, value):
         address_pool = UniSwap.addresses_pools['ETH-USDC-base']
-        _, contract = contract_withdrawal('check_amount1')
+        _, contract = _client('check_amount1')
         return contract.functions.estimateAmount0(value,
                                                   address_pool,
                                                   pool_tick[0],
@@ -148,46 +242,60 @@ class UniSwap:
         return int(pool_tick + percentages_[0] * 100), int(pool_tick - percentages_[1] * 100)
 
     @staticmethod
-    def check_id_nft(liquidity=False):
+    def sync_owner_index():
+        """回填 / 追赶持有人索引。首次建立时需从部署区块读取全部 Transfer 日志，耗时较长，
+        因此不放在带重试策略的 check_id_V4 中；失败时 check_id_V4 回退到 ownerOf 探测
+        """
         try:
-            web3, contract = contract_withdrawal('nft_uni')
-            wallet = web3.eth.account.from_key(private_key).address
-            balance = contract.functions.balanceOf(wallet).call()
-            if balance >= 1:
-                if liquidity:
-                    id_nft = contract.functions.tokenOfOwnerByIndex(wallet, balance - 1).call()
-                    return id_nft, contract.functions.positions(id_nft).call()[7]
-                return contract.functions.tokenOfOwnerByIndex(wallet, balance - 1).call()
+            index = _owner_index()
+            get_chain_head(index.w3).poll()
+            processed = index.catch_up()
+            log().info(f'Owner index | {processed} transfers, synced to block {index.last_block}')
+        except Exception as error:
+            log().error(f'Owner index sync failed: {error}')
+
+    @staticmethod
+    @READ_POLICY(upstream='rpc', on_retry=_log_retry)
+    def check_id_nft(liquidity=False):
+        # V3 流程（mint / test_withdraw，读取 positions()）使用的 NonfungiblePositionManager 实现了
+        # ERC721Enumerable，tokenOfOwnerByIndex 可直接取最新头寸；V4 PositionManager 没有该接口，使用 check_id_V4
+        web3, contract = _client('nft_uni')
+        wallet = web3.eth.account.from_key(private_key).address
+        balance = contract.functions.balanceOf(wallet).call()
+        if balance >= 1:
             if liquidity:
-                return None, None
-        except BaseException as error:
-            log().error(error)
-            time.sleep(10)
-            return UniSwap.check_id_nft()
+                id_nft = contract.functions.tokenOfOwnerByIndex(wallet, balance - 1).call()
+                return id_nft, contract.functions.positions(id_nft).call()[7]
+            return contract.functions.tokenOfOwnerByIndex(wallet, balance - 1).call()
+        if liquidity:
+            return None, None
 
     @staticmethod
-    def check_id_V4():
-        try:
-            web3, contract = contract_withdrawal('nft_uni')
-            wallet = web3.eth.account.from_key(private_key).address
-            end_id = contract.functions.nextTokenId().call()
-            for i in range(100):
-                search_id = end_id - i
-                try:
-                    address_end = contract.functions.ownerOf(search_id).call()
-                except ContractLogicError:
-                    address_end = ''
-                if address_end == wallet:
-                    return search_id
-        except BaseException as error:
-            log().error(error)
-            time.sleep(10)
-            return UniSwap.check_id_V4()
+    @READ_POLICY(upstream='rpc', on_retry=_log_retry)
+    def check_id_V4(owner_index=None):
+        web3, contract = _client('nft_uni')
+        wallet = web3.eth.account.from_key(private_key).address
+        if owner_index is not None and web3.eth.block_number - owner_index.last_block <= MAX_INDEX_LAG:
+            # 本地 Transfer 索引：先回滚重组的区块，追赶最新区块后直接读取，无需逐个 ownerOf 探测
+            get_chain_head(owner_index.w3).poll()
+            owner_index.catch_up()
+            token_id = owner_index.latest_token_of(wallet)
+            if token_id is not None:
+                return token_id
+        end_id = contract.functions.nextTokenId().call()
+        for i in range(100):
+            search_id = end_id - i
+            try:
+                address_end = contract.functions.ownerOf(search_id).call()
+            except ContractLogicError:
+                address_end = ''
+            if address_end == wallet:
+                return search_id
 
     def mint(self, retry=0):
         try:
             amount0_ = int(amount0 * 10 ** 18)
-            _, contract = contract_withdrawal('nft_uni')
+            _, contract = _client('nft_uni')
             wallet = self.web3.eth.account.from_key(private_key).address
             pool_tick = self.check_pool_tick(name_pools)
             tick_high, tick_low = self.calculation_tick(pool_tick[1], percentages_)
@@ -204,6 +312,8 @@ class UniSwap:
                 else:
                     amounts = amount1_
                 EVM.approve(amounts, private_key, self.chain[name_pools], i[0], i[1])
+            # approve 由 EVM 模块发送，与链上 pending nonce 重新对齐
+            self.nonces.sync()
             if balance_1 < int(amount0_) or balance_2 < int(amount1_):
                 inv_log().info("Нехватаа баланса, ищем способ решения")
                 if auto_amount and balance_2 < int(amount1_):
@@ -228,21 +338,13 @@ class UniSwap:
                     0,
                     wallet,
                     int(time.time()) + 1_000
-                    )).build_transaction(
-                {
-                    'from': wallet,
-                    'nonce': self.web3.eth.get_transaction_count(wallet),
-                    'chainId': self.web3.eth.chain_id,
-                    'gasPrice': self.web3.eth.gas_price,
-                    'gas': 0
-                }
-            )
+                    )).build_transaction(self.nonces.tx_params(gas=0))
 
             name = name_pools.split("-")
             module_str = (f'Mint NFT | {pool_tick[1]} / {tick_low} / {tick_high} | {round(amount0_ / 10 ** decimal1, 5)} '
                           f'{name[0]} | {round(amount1_ / 10 **  decimal2, 5)} {name[1]}')
-            tx_bool = EVM.sending_tx(self.web3, tx, self.chain[name_pools], private_key, 1, module_str)
-            if not tx_bool:
+            receipt = self._send_tx(self.web3, tx, module_str)
+            if not receipt:
                 log().error('Зафейлилась транза')
                 time.sleep(15)
                 if retry <= 5:
@@ -251,7 +353,6 @@ class UniSwap:
                     raise 'Не получается заминтить НФТ'
 
             else:
-                time.sleep(15)
                 if self.check_id_nft():
                     return pool_tick[1]
                 else:
@@ -259,6 +360,7 @@ class UniSwap:
                     return self.mint()
         except BaseException as error:
             log().error(error)
+            self.nonces.reset()
             time.sleep(10)
             if retry <= 5:
                 return self.mint(retry + 1)
@@ -281,7 +383,7 @@ class UniSwap:
             else:
                 balance_1, decimal1 = EVM.check_balance(private_key, 'uni', '')
             amount0_ = int(amount0 * 10 ** decimal1)
-            web3, contract = contract_withdrawal('nft_uni')
+            web3, contract = _client('nft_uni')
             wallet = web3.eth.account.from_key(private_key).address
             pool_tick, tick_spacing = self.check_ticket_V4()
             tick_high, tick_low = self.calculation_tick_V4(pool_tick, tick_spacing)
@@ -289,6 +391,7 @@ class UniSwap:
                 if self.uni_V4[name_pools][i] != '0x0000000000000000000000000000000000000000':
                     EVM.approve(amount0_, private_key, 'uni', self.uni_V4[name_pools][i],
                                 '0x000000000022D473030F116dDEE9F6B43aC78BA3')
+            self.nonces.sync()
 
             independent_token = self.check_balance(tick_low, tick_high, wallet, tick_spacing, amount0_)
             if independent_token == 'TOKEN_0':
@@ -299,9 +402,8 @@ class UniSwap:
 
             data, amount1_ = self.create_tx_V4(tick_low, tick_high, wallet, independent_token, tick_spacing, amount_out)
 
-            tx = {'from': wallet, 'nonce': web3.eth.get_transaction_count(wallet), 'chainId': web3.eth.chain_id,
-                  'gasPrice': web3.eth.gas_price, 'gas': 0, 'to': Web3.to_checksum_address(data['to']),
-                  'value': int(data['value'], 16), 'data': data['data']}
+            tx = self.nonces.tx_params(gas=0, to=Web3.to_checksum_address(data['to']),
+                                       value=int(data['value'], 16), data=data['data'])
 
             name = name_pools.split("-")
 
@@ -310,8 +412,8 @@ class UniSwap:
             print_amount2 = amount_out if independent_token == 'TOKEN_1' else amount1_
             module_str = (f'Mint NFT | {pool_tick} / {tick_low} / {tick_high} | {round(int(print_amount1) / 10 ** decimal1, 5)} '
                           f'{name[0]} | {round(int(print_amount2) / 10 **  decimal2, 5)} {name[1]}')
-            tx_bool = EVM.sending_tx(web3, tx, 'uni', private_key, 1, module_str)
-            if not tx_bool:
+            receipt = self._send_tx(web3, tx, module_str)
+            if not receipt:
                 log().error('Зафейлилась транза')
                 time.sleep(15)
                 if retry <= 5:
@@ -320,8 +422,13 @@ class UniSwap:
                     raise 'Не получается заминтить НФТ'
 
             else:
-                time.sleep(15)
-                id_ = self.check_id_V4()
+                # 直接从回执日志解析新 tokenId / liquidity / 支付数量，无需再逐个探测 ownerOf
+                minted = decode_mint_receipt(receipt, contract.address, wallet)
+                if minted:
+                    log().info(f"NFT #{minted['token_id']} | liquidity {minted.get('liquidity')} | "
+                               f"paid {minted.get('paid')}")
+                    return minted['token_id']
+                id_ = self.check_id_V4(_owner_index())
                 if id_:
                     return id_
                 else:
@@ -329,45 +436,48 @@ class UniSwap:
                     return self.mint_V4()
         except BaseException as error:
             log().error(error)
+            self.nonces.reset()
             time.sleep(10)
             if retry <= 5:
                 return self.mint_V4(retry + 1)
             else:
                 raise 'Не вышло'
 
+    @API_POLICY(upstream='uniswap_api', on_retry=_log_retry)
     def create_tx_V4(self, tick_low, tick_high, address, independentToken, tickSpacing, amount):
-        try:
-            json_data = {
-                'simulateTransaction': False,
-                'protocol': 'V4',
-                'walletAddress': address,
-                'chainId': 130,
-                'independentAmount': str(amount),
-                # 'slippageTolerance': 0,
-                'independentToken': independentToken,  # TOKEN_0, TOKEN_1
-                'position': {
-                    'tickLower': tick_low,
-                    'tickUpper': tick_high,
-                    'pool': {
-                        'tickSpacing': tickSpacing,
-                        'token0': self.uni_V4[name_pools][0],
-                        'token1': self.uni_V4[name_pools][1],
-                        'fee': self.fee_pool[name_pools],
-                    },
+        json_data = {
+            'simulateTransaction': False,
+            'protocol': 'V4',
+            'walletAddress': address,
+            'chainId': 130,
+            'independentAmount': str(amount),
+            # 'slippageTolerance': 0,
+            'independentToken': independentToken,  # TOKEN_0, TOKEN_1
+            'position': {
+                'tickLower': tick_low,
+                'tickUpper': tick_high,
+                'pool': {
+                    'tickSpacing': tickSpacing,
+                    'token0': self.uni_V4[name_pools][0],
+                    'token1': self.uni_V4[name_pools][1],
+                    'fee': self.fee_pool[name_pools],
                 },
-            }
+            },
+        }
 
-            response = self.session.post('https://trading-api-labs.interface.gateway.uniswap.org/v1/lp/create',
-                                         json=json_data)
-            return response.json()['create'], response.json()['dependentAmount']
-        except BaseException as error:
-            log().error(error)
-            time.sleep(20)
-            return self.create_tx_V4(tick_low, tick_high, address, independentToken, tickSpacing, amount)
+        response = self.session.post('https://trading-api-labs.interface.gateway.uniswap.org/v1/lp/create',
+                                     json=json_data)
+        # 429 / 5xx 按限流、传输错误重试，其余 4xx 直接失败
+        response.raise_for_status()
+        data = response.json()
+        try:
+            return data['create'], data['dependentAmount']
+        except (KeyError, TypeError) as error:
+            raise ResponseFormatError(f'lp/create: {response.text[:200]}') from error
 
     def decrease_liquidity(self, token_id, tick_low, tick_high, tick_spacing, retry=0):
         try:
-            web3 , contract = contract_withdrawal('nft_uni')
+            web3 , contract = _client('nft_uni')
             positionLiquidity = contract.functions.getPositionLiquidity(token_id).call()
             wallet = web3.eth.account.from_key(private_key).address
 
@@ -397,12 +507,10 @@ class UniSwap:
             )
             data = response.json()['decrease']
 
-            tx = {'from': wallet, 'nonce': web3.eth.get_transaction_count(wallet), 'chainId': web3.eth.chain_id,
-                  'gasPrice': web3.eth.gas_price, 'gas': 0, 'to': Web3.to_checksum_address(data['to']),
-                  'data': data['data']}
+            tx = self.nonces.tx_params(gas=0, to=Web3.to_checksum_address(data['to']), data=data['data'])
             module_str = 'Withdraw liquidity, claim rewards, and burn the NFT'
-            tx_bool = EVM.sending_tx(web3, tx, 'uni', private_key, 1, module_str)
-            if not tx_bool:
+            receipt = self._send_tx(web3, tx, module_str)
+            if not receipt:
                 time.sleep(5)
                 log().error('Filed tx')
                 if retry <= 3:
@@ -413,37 +521,60 @@ class UniSwap:
 
         except BaseException as error:
             log().error(error)
+            self.nonces.reset()
             if retry <= 5:
                 time.sleep(15)
                 return self.decrease_liquidity(token_id, tick_low, tick_high, tick_spacing, retry+1)
             else:
                 raise "Не прошло"
 
-    def check_ticket_V4(self, retry=0):
-        try:
-            json_data = {
-                'chainId': 130,
-                'token0': self.uni_V4[name_pools][0],
-                'token1': self.uni_V4[name_pools][1],
-                'protocolVersions': [
-                    'PROTOCOL_VERSION_V4',
-                ],
-                'fee': self.fee_pool[name_pools],
-                'hooks': '0x0000000000000000000000000000000000000000',
-            }
+    def check_ticket_V4(self):
+        """当前 tick 与 tickSpacing：标准费率的池子从链上 StateView 读取（按区块缓存，进程内共享），
+        非标准费率、池子未初始化或 RPC 重试用尽时回退到 ListPools 接口。
+        两者各自使用自己的重试策略与熔断器，接口故障不会计入 rpc 熔断
+        """
+        fee = self.fee_pool[name_pools]
+        tick_spacing = TICK_SPACING_BY_FEE.get(fee)
+        if tick_spacing is not None:
+            currency0, currency1 = sorted((Web3.to_checksum_address(c) for c in self.uni_V4[name_pools]),
+                                          key=lambda c: int(c, 16))
+            pool_id = pool_id_of({'currency0': currency0, 'currency1': currency1, 'fee': fee,
+                                  'tick_spacing': tick_spacing, 'hooks': '0x0000000000000000000000000000000000000000'})
+            try:
+                tick = self._pool_tick_V4(pool_id)
+            except (RetryError, CircuitOpenError) as error:
+                log().error(f'StateView: {error}, fallback to ListPools')
+                tick = None
+            if tick is not None:
+                return tick, tick_spacing
+        return self._list_pools_V4()
+
+    @READ_POLICY(upstream='rpc', on_retry=_log_retry)
+    def _pool_tick_V4(self, pool_id):
+        return get_pool_state_service(self.web3).get_tick(pool_id)
+
+    @API_POLICY(upstream='uniswap_api', on_retry=_log_retry)
+    def _list_pools_V4(self):
+        json_data = {
+            'chainId': 130,
+            'token0': self.uni_V4[name_pools][0],
+            'token1': self.uni_V4[name_pools][1],
+            'protocolVersions': [
+                'PROTOCOL_VERSION_V4',
+            ],
+            'fee': self.fee_pool[name_pools],
+            'hooks': '0x0000000000000000000000000000000000000000',
+        }
 
-            response = self.session.post(
-                'https://interface.gateway.uniswap.org/v2/pools.v1.PoolsService/ListPools', json=json_data,
-            )
+        response = self.session.post(
+            'https://interface.gateway.uniswap.org/v2/pools.v1.PoolsService/ListPools', json=json_data,
+        )
+        response.raise_for_status()
+        try:
             data = response.json()['pools'][0]
             return data['tick'], data['tickSpacing']
-        except BaseException as error:
-            log().error(error)
-            time.sleep(10)
-            if retry <= 10:
-                return self.check_ticket_V4()
-            else:
-                raise 'Ошибка при получении тикета'
+        except (KeyError, IndexError, TypeError) as error:
+            raise ResponseFormatError(f'ListPools: {response.text[:200]}') from error
 
     def get_position_V4(self):
         json_data = {
@@ -479,7 +610,7 @@ class UniSwap:
                     id_nft = self.check_id_nft()
                     log().error(f"Не передали NFT id ищем.... --- {id_nft}")
                 time.sleep(10)
-            web3, contract = contract_withdrawal('nft_uni')
+            web3, contract = _client('nft_uni')
             max_token = 340282366920938463463374607431768211455
             wallet = web3.eth.account.from_key(private_key).address
             liquidity = int(contract.functions.positions(id_nft).call()[7])
@@ -492,31 +623,19 @@ class UniSwap:
                       ]
             bytes_tx = []
 
+            # 内部调用只取 data，不需要 nonce
             for tx in tx_all:
-                bytes_tx.append(tx.build_transaction({
-                    'from': wallet,
-                    'nonce': web3.eth.get_transaction_count(wallet),
-                    'chainId': web3.eth.chain_id,
-                    'gasPrice': web3.eth.gas_price,
-                    'gas': 0
-                })['data'])
-            tx = contract.functions.multicall(bytes_tx).build_transaction({
-                'from': wallet,
-                'nonce': web3.eth.get_transaction_count(wallet),
-                'chainId': web3.eth.chain_id,
-                'gasPrice': web3.eth.gas_price,
-                'gas': 0
-            })
+                bytes_tx.append(tx.build_transaction(self.nonces.call_params(gas=0))['data'])
+            tx = contract.functions.multicall(bytes_tx).build_transaction(self.nonces.tx_params(gas=0))
             module_str = 'Withdraw liquidity, claim rewards, and burn the NFT'
-            tx_bool = EVM.sending_tx(web3, tx, self.chain[name_pools], private_key, 1, module_str)
-            if not tx_bool:
+            receipt = self._send_tx(web3, tx, module_str)
+            if not receipt:
                 time.sleep(5)
                 log().error('Filed tx')
                 if retry <= 3:
                     return self.test_withdraw(id_nft, retry + 1)
                 raise "Couldn't withdraw liquidity"
             else:
-                time.sleep(5)
                 id_ = self.check_id_nft()
                 if id_:
                     if id_ == id_nft:
@@ -524,6 +643,7 @@ class UniSwap:
                 return True
         except BaseException as error:
             log().error(error)
+            self.nonces.reset()
             if retry <= 5:
                 time.sleep(15)
                 return self.test_withdraw(id_nft)
@@ -531,18 +651,11 @@ class UniSwap:
                 raise "Не прошло"
 
     def burn_nft(self, id_nft, retry=0):
-        web3, contract = contract_withdrawal('nft_uni')
-        wallet = web3.eth.account.from_key(private_key).address
-        tx = contract.functions.burn(id_nft).build_transaction({
-            'from': wallet,
-            'nonce': web3.eth.get_transaction_count(wallet),
-            'chainId': web3.eth.chain_id,
-            'gasPrice': web3.eth.gas_price,
-            'gas': 0
-        })
+        web3, contract = _client('nft_uni')
+        tx = contract.functions.burn(id_nft).build_transaction(self.nonces.tx_params(gas=0))
         module_str = 'Burn the NFT'
-        tx_bool = EVM.sending_tx(web3, tx, self.chain[name_pools], private_key, 1, module_str)
-        if not tx_bool:
+        receipt = self._send_tx(web3, tx, module_str)
+        if not receipt:
             time.sleep(5)
             log().error('Зафейлилась транза')
             if retry <= 3:
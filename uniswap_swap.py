@@ -1,12 +1,21 @@
-from typing import Optional, Tuple, Dict, Any
-import math
+from typing import Optional, Tuple, Dict, Any, List
 import time
 from dataclasses import dataclass
+from fractions import Fraction
 
 from web3 import Web3
 from web3.contract import Contract
 from eth_account import Account
 
+from client_registry import get_contract
+from nonce_manager import get_nonce_manager
+from rpc_batch import batch
+from tick_math import (MIN_TICK, MAX_TICK, MIN_SQRT_PRICE, MAX_SQRT_PRICE,
+                       get_tick_at_sqrt_price, scale_sqrt_price)
+
+# 无法估算 gas 时使用的上限
+DEFAULT_GAS_LIMIT = 800000
+
 
 @dataclass
 class TxResult:
@@ -134,26 +143,43 @@ class PancakeV3Liquidity:
         self.private_key = private_key
         self.account: Account = self.w3.eth.account.from_key(private_key)
         self.address = self.account.address
+        # 本地分配 nonce 并缓存 chainId / gasPrice，连续交易无需等待前一笔上链
+        self.nonces = get_nonce_manager(w3, self.address)
 
     # ---------- 基础工具 ----------
     def _contract(self, address: str, abi_name: str) -> Contract:
-        return self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=self.ABIS[abi_name])
+        # ABIS 为类级别常量，按 (Web3, 地址, ABI) 缓存合约实例
+        return get_contract(self.w3, address, self.ABIS[abi_name])
+
+    def _build(self, fn, **extra) -> Dict[str, Any]:
+        params = self.nonces.call_params(**extra)
+        try:
+            return fn.build_transaction(params)
+        except Exception:
+            # 依赖尚未上链的前序交易（如刚发出的 approve）时无法估算 gas，使用固定上限
+            params["gas"] = DEFAULT_GAS_LIMIT
+            return fn.build_transaction(params)
 
     def _send(self, tx: Dict[str, Any]) -> TxResult:
+        nonce = None
         try:
             tx.setdefault("from", self.address)
-            tx.setdefault("nonce", self.w3.eth.get_transaction_count(self.address))
-            tx.setdefault("chainId", self.w3.eth.chain_id)
-            tx.setdefault("gasPrice", self.w3.eth.gas_price)
-            # 估算 gas
-            try:
-                tx["gas"] = tx.get("gas", self.w3.eth.estimate_gas({k: v for k, v in tx.items() if k != "gas"}))
-            except Exception:
-                tx["gas"] = tx.get("gas", 800000)
+            tx.setdefault("chainId", self.nonces.chain_id)
+            tx.setdefault("gasPrice", self.nonces.gas_price)
+            # 只在未指定 gas 时估算，避免每次发送多一次 RPC
+            if not tx.get("gas"):
+                try:
+                    tx["gas"] = self.w3.eth.estimate_gas({k: v for k, v in tx.items() if k != "gas"})
+                except Exception:
+                    tx["gas"] = DEFAULT_GAS_LIMIT
+            if "nonce" not in tx:
+                nonce = tx["nonce"] = self.nonces.reserve()
             signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
             tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
             return TxResult(success=True, tx_hash=self.w3.to_hex(tx_hash))
         except Exception as e:
+            if nonce is not None:
+                self.nonces.handle_send_error(nonce, e)
             return TxResult(success=False, error=str(e))
 
     def _erc20(self, token: str) -> Contract:
@@ -166,14 +192,22 @@ class PancakeV3Liquidity:
         owner = owner or self.address
         return int(self._erc20(token).functions.balanceOf(Web3.to_checksum_address(owner)).call())
 
+    def token_decimals_many(self, tokens: List[str]) -> List[int]:
+        """多个代币的 decimals 合并为一个 JSON-RPC 批量请求"""
+        with batch(self.w3) as b:
+            calls = [b.call(self._erc20(token).functions.decimals()) for token in tokens]
+        return [int(c.result()) for c in calls]
+
+    def token_balances(self, tokens: List[str], owner: Optional[str] = None) -> List[int]:
+        """多个代币的余额合并为一个 JSON-RPC 批量请求"""
+        owner = Web3.to_checksum_address(owner or self.address)
+        with batch(self.w3) as b:
+            calls = [b.call(self._erc20(token).functions.balanceOf(owner)) for token in tokens]
+        return [int(c.result()) for c in calls]
+
     def approve_token(self, token: str, spender: str, amount: int) -> TxResult:
         contract = self._erc20(token)
-        tx = contract.functions.approve(Web3.to_checksum_address(spender), int(amount)).build_transaction({
-            "from": self.address,
-            "nonce": self.w3.eth.get_transaction_count(self.address),
-            "chainId": self.w3.eth.chain_id,
-            "gasPrice": self.w3.eth.gas_price,
-        })
+        tx = self._build(contract.functions.approve(Web3.to_checksum_address(spender), int(amount)))
         return self._send(tx)
 
     # ---------- 池子与价格 ----------
@@ -187,10 +221,14 @@ class PancakeV3Liquidity:
 
     def get_pool_state(self, pool_addr: str) -> Tuple[int, int, int]:
         pool = self._contract(pool_addr, "Pool")
-        slot = pool.functions.slot0().call()
+        # slot0 与 tickSpacing 在同一个批量请求中读取
+        with batch(self.w3) as b:
+            slot_call = b.call(pool.functions.slot0())
+            spacing_call = b.call(pool.functions.tickSpacing())
+        slot = slot_call.result()
         sqrt_price_x96 = int(slot[0])
         tick = int(slot[1])
-        tick_spacing = int(pool.functions.tickSpacing().call())
+        tick_spacing = int(spacing_call.result())
         return sqrt_price_x96, tick, tick_spacing
 
     @staticmethod
@@ -207,19 +245,16 @@ class PancakeV3Liquidity:
 
     def compute_ticks_by_percentage(self, sqrt_price_x96: int, tick: int, tick_spacing: int,
                                     pct: float, dec0: int, dec1: int, token0: str, token1: str) -> Tuple[int, int]:
-        # 当前价格（token1 / token0），考虑小数位
-        ratio = (sqrt_price_x96 / (2 ** 96)) ** 2
-        # 调整小数位到“实际价格”
-        price = ratio * (10 ** dec0) / (10 ** dec1)
-        lower_price = price * (1 - pct)
-        upper_price = price * (1 + pct)
-        # 将价格转换为 tick：tick = log_{1.0001}(price_adj)
-        # price_adj 需要是 token1/token0 的价格（已考虑 decimals）
-        def price_to_tick(p: float) -> int:
-            return int(math.log(p, 1.0001))
-
-        t_lower = price_to_tick(lower_price)
-        t_upper = price_to_tick(upper_price)
+        # 价格上下浮动 pct 的比例与小数位无关，直接在 sqrtPriceX96 上做整数运算：
+        # sqrtP' = isqrt(sqrtP^2 * (1 ± pct))，再用 TickMath.getTickAtSqrtPrice 得到 tick
+        ratio = Fraction(str(pct))
+        sqrt_lower = scale_sqrt_price(sqrt_price_x96, max(ratio.denominator - ratio.numerator, 0), ratio.denominator)
+        sqrt_upper = scale_sqrt_price(sqrt_price_x96, ratio.denominator + ratio.numerator, ratio.denominator)
+        sqrt_lower = min(max(sqrt_lower, MIN_SQRT_PRICE), MAX_SQRT_PRICE - 1)
+        sqrt_upper = min(max(sqrt_upper, MIN_SQRT_PRICE), MAX_SQRT_PRICE - 1)
+
+        t_lower = get_tick_at_sqrt_price(sqrt_lower)
+        t_upper = get_tick_at_sqrt_price(sqrt_upper)
         # 保证顺序并对齐到 tickSpacing
         t_lower, t_upper = min(t_lower, t_upper), max(t_lower, t_upper)
         t_lower = self._align_to_spacing(t_lower, tick_spacing)
@@ -230,6 +265,9 @@ class PancakeV3Liquidity:
             width = max(tick_spacing * 10, abs(t_upper - t_lower))
             t_lower = center - width
             t_upper = center + width
+        # 限制在可用的对齐 tick 范围内
+        t_lower = max(t_lower, -(-MIN_TICK // tick_spacing) * tick_spacing)
+        t_upper = min(t_upper, MAX_TICK // tick_spacing * tick_spacing)
         return int(t_lower), int(t_upper)
 
     # ---------- 添加流动性 ----------
@@ -246,7 +284,7 @@ class PancakeV3Liquidity:
         try:
             recipient = Web3.to_checksum_address(recipient or self.address)
             token0, token1 = self.sort_tokens(tokenA, tokenB)
-            dec0, dec1 = self.token_decimals(token0), self.token_decimals(token1)
+            dec0, dec1 = self.token_decimals_many([token0, token1])
             amt0 = int(amountA * (10 ** dec0)) if Web3.to_checksum_address(tokenA) == token0 else int(amountB * (10 ** dec0))
             amt1 = int(amountB * (10 ** dec1)) if Web3.to_checksum_address(tokenB) == token1 else int(amountA * (10 ** dec1))
 
@@ -279,12 +317,7 @@ class PancakeV3Liquidity:
                 recipient,
                 int(time.time()) + deadline_seconds,
             )
-            tx = pos_mgr.functions.mint(params).build_transaction({
-                "from": self.address,
-                "nonce": self.w3.eth.get_transaction_count(self.address),
-                "chainId": self.w3.eth.chain_id,
-                "gasPrice": self.w3.eth.gas_price,
-            })
+            tx = self._build(pos_mgr.functions.mint(params))
             sent = self._send(tx)
             if not sent.success:
                 return sent
@@ -322,12 +355,7 @@ class PancakeV3Liquidity:
                 0,  # amount1Min
                 int(time.time()) + deadline_seconds,
             )
-            tx1 = pos_mgr.functions.decreaseLiquidity(dec_params).build_transaction({
-                "from": self.address,
-                "nonce": self.w3.eth.get_transaction_count(self.address),
-                "chainId": self.w3.eth.chain_id,
-                "gasPrice": self.w3.eth.gas_price,
-            })
+            tx1 = self._build(pos_mgr.functions.decreaseLiquidity(dec_params))
             r1 = self._send(tx1)
             if not r1.success:
                 return r1
@@ -338,24 +366,13 @@ class PancakeV3Liquidity:
                 (1 << 128) - 1,
                 (1 << 128) - 1,
             )
-            tx2 = pos_mgr.functions.collect(collect_params).build_transaction({
-                "from": self.address,
-                "nonce": self.w3.eth.get_transaction_count(self.address),
-                "chainId": self.w3.eth.chain_id,
-                "gasPrice": self.w3.eth.gas_price,
-                "value": 0,
-            })
+            tx2 = self._build(pos_mgr.functions.collect(collect_params), value=0)
             r2 = self._send(tx2)
             if not r2.success:
                 return r2
             # 3) burn NFT（可选）
             if burn_nft:
-                tx3 = pos_mgr.functions.burn(int(token_id)).build_transaction({
-                    "from": self.address,
-                    "nonce": self.w3.eth.get_transaction_count(self.address),
-                    "chainId": self.w3.eth.chain_id,
-                    "gasPrice": self.w3.eth.gas_price,
-                })
+                tx3 = self._build(pos_mgr.functions.burn(int(token_id)))
                 r3 = self._send(tx3)
                 if not r3.success:
                     return r3
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+V4 PositionManager 动作编解码表
+每个动作的参数布局在导入时预编译为 (字段名, 槽位, 解码函数, 编码函数) 列表，解码时在 memoryview 上
+按槽位直接读取，编码时一次写入预分配的 head，不走 eth_abi 的通用编解码；未登记的动作保留原始字节
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Union
+
+from eth_utils import to_checksum_address
+
+from abi_table import function
+
+WORD = 32
+
+# 选择器取自预编译的 abi_table，导入时无需加载 web3
+MODIFY_LIQUIDITIES_SELECTOR = function('PositionManager', "modifyLiquidities(bytes,uint256)").selector
+MODIFY_LIQUIDITIES_WITHOUT_UNLOCK_SELECTOR = function('PositionManager', "modifyLiquiditiesWithoutUnlock(bytes,bytes[])").selector
+MULTICALL_SELECTOR = function('PositionManager', "multicall(bytes[])").selector
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+# ---------- 槽位读取 ----------
+def _check(buf: memoryview, end: int):
+    if end > len(buf):
+        raise ValueError(f"ABI 数据越界: 需要 {end} 字节，实际 {len(buf)} 字节")
+
+
+def read_uint(buf: memoryview, pos: int) -> int:
+    _check(buf, pos + WORD)
+    return int.from_bytes(buf[pos:pos + WORD], 'big')
+
+
+def read_int(buf: memoryview, pos: int) -> int:
+    _check(buf, pos + WORD)
+    return int.from_bytes(buf[pos:pos + WORD], 'big', signed=True)
+
+
+@lru_cache(maxsize=4096)
+def _checksum(raw: bytes) -> str:
+    return to_checksum_address(raw)
+
+
+def read_address(buf: memoryview, pos: int) -> str:
+    _check(buf, pos + WORD)
+    return _checksum(bytes(buf[pos + 12:pos + WORD]))
+
+
+def read_bool(buf: memoryview, pos: int) -> bool:
+    return read_uint(buf, pos) != 0
+
+
+def read_bytes(buf: memoryview, pos: int) -> memoryview:
+    """读取动态 bytes：pos 处为相对 buf 起点的偏移，返回数据部分的 memoryview 切片"""
+    offset = read_uint(buf, pos)
+    length = read_uint(buf, offset)
+    start = offset + WORD
+    _check(buf, start + length)
+    return buf[start:start + length]
+
+
+def read_bytes_array(buf: memoryview, pos: int) -> List[memoryview]:
+    """读取动态 bytes[]：pos 处为数组偏移，元素偏移相对于长度槽之后的位置"""
+    offset = read_uint(buf, pos)
+    count = read_uint(buf, offset)
+    base = offset + WORD
+    _check(buf, base + count * WORD)
+    return [read_bytes(buf[base:], i * WORD) for i in range(count)]
+
+
+# ---------- 槽位写入 ----------
+def _write_uint(bits: int):
+    limit = 1 << bits
+
+    def writer(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+        value = int(value)
+        if value < 0 or value >= limit:
+            raise ValueError(f"数值超出 uint{bits} 范围: {value}")
+        head[pos:pos + WORD] = value.to_bytes(WORD, 'big')
+    return writer
+
+
+def _write_int(bits: int):
+    limit = 1 << (bits - 1)
+
+    def writer(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+        value = int(value)
+        if value < -limit or value >= limit:
+            raise ValueError(f"数值超出 int{bits} 范围: {value}")
+        head[pos:pos + WORD] = value.to_bytes(WORD, 'big', signed=True)
+    return writer
+
+
+def _address_bytes(value) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        raw = bytes(value)
+    else:
+        raw = bytes.fromhex(value[2:] if value[:2] in ('0x', '0X') else value)
+    if len(raw) != 20:
+        raise ValueError(f"无效的地址: {value}")
+    return raw
+
+
+def _write_address(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+    head[pos + 12:pos + WORD] = _address_bytes(value)
+
+
+def _write_bool(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+    head[pos + WORD - 1] = 1 if value else 0
+
+
+def _write_bytes(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    head[pos:pos + WORD] = (head_size + len(tail)).to_bytes(WORD, 'big')
+    tail += len(value).to_bytes(WORD, 'big')
+    tail += value
+    tail += bytes(-len(value) % WORD)
+
+
+# PoolKey(currency0, currency1, fee, tickSpacing, hooks) 全部为静态字段，按 5 个槽位内联编码
+POOL_KEY_FIELDS = (('currency0', 'address'), ('currency1', 'address'), ('fee', 'uint24'),
+                   ('tickSpacing', 'int24'), ('hooks', 'address'))
+
+
+def _read_pool_key(buf: memoryview, pos: int) -> Dict[str, Any]:
+    _check(buf, pos + 5 * WORD)
+    return {
+        'currency0': read_address(buf, pos),
+        'currency1': read_address(buf, pos + WORD),
+        'fee': read_uint(buf, pos + 2 * WORD),
+        'tickSpacing': read_int(buf, pos + 3 * WORD),
+        'hooks': read_address(buf, pos + 4 * WORD),
+    }
+
+
+def _write_pool_key(head: bytearray, pos: int, value, tail: bytearray, head_size: int):
+    for i, (name, kind) in enumerate(POOL_KEY_FIELDS):
+        FIELD_KINDS[kind][2](head, pos + i * WORD, value[name], tail, head_size)
+
+
+# ---------- 动作布局表 ----------
+# 字段类型 -> (占用槽位数, 解码函数, 编码函数, 输出时的键名后缀)
+def _read_bytes_hex(buf: memoryview, pos: int) -> str:
+    return '0x' + read_bytes(buf, pos).hex()
+
+
+FIELD_KINDS = {
+    'uint256': (1, read_uint, _write_uint(256), ''),
+    'uint128': (1, read_uint, _write_uint(128), ''),
+    'uint24': (1, read_uint, _write_uint(24), ''),
+    'int24': (1, read_int, _write_int(24), ''),
+    'address': (1, read_address, _write_address, ''),
+    'bool': (1, read_bool, _write_bool, ''),
+    'bytes': (1, _read_bytes_hex, _write_bytes, 'Hex'),
+    'PoolKey': (5, _read_pool_key, _write_pool_key, ''),
+}
+
+
+@dataclass
+class ActionSpec:
+    code: int
+    name: str
+    fields: List[Tuple[str, str]]
+    # 预编译结果: (字段名, 输出键名, 字节偏移, 解码函数, 编码函数, 是否为动态 bytes)
+    layout: List[Tuple[str, str, int, Any, Any, bool]] = field(default_factory=list, repr=False)
+    head_size: int = 0
+
+    def __post_init__(self):
+        slot = 0
+        for name, kind in self.fields:
+            width, reader, writer, suffix = FIELD_KINDS[kind]
+            self.layout.append((name, name + suffix, slot * WORD, reader, writer, kind == 'bytes'))
+            slot += width
+        self.head_size = slot * WORD
+
+    def decode(self, params: memoryview) -> Dict[str, Any]:
+        _check(params, self.head_size)
+        decoded = {'action': self.name}
+        for _, key, pos, reader, _, _ in self.layout:
+            decoded[key] = reader(params, pos)
+        return decoded
+
+    def encode(self, values: Dict[str, Any]) -> bytes:
+        """按布局一次写入 head，动态 bytes 追加到 tail；bytes 字段可用 name 或 nameHex 传入，缺省为空"""
+        head = bytearray(self.head_size)
+        tail = bytearray()
+        for name, key, pos, _, writer, dynamic in self.layout:
+            if name in values:
+                value = values[name]
+            elif key in values:
+                value = values[key]
+            elif dynamic:
+                value = b''
+            else:
+                raise ValueError(f"{self.name} 缺少参数: {name}")
+            writer(head, pos, value, tail, self.head_size)
+        return bytes(head + tail)
+
+
+ACTIONS: Dict[int, ActionSpec] = {}
+ACTION_CODES: Dict[str, int] = {}
+
+
+def register_action(code: int, name: str, fields: List[Tuple[str, str]]) -> ActionSpec:
+    spec = ActionSpec(code, name, fields)
+    ACTIONS[code] = spec
+    ACTION_CODES[name] = code
+    return spec
+
+
+# PositionManager 支持的全部动作（v4-periphery Actions.sol / CalldataDecoder.sol）
+# 流动性动作
+register_action(0x00, 'INCREASE_LIQUIDITY', [
+    ('tokenId', 'uint256'), ('liquidity', 'uint256'), ('amount0Max', 'uint128'),
+    ('amount1Max', 'uint128'), ('hookData', 'bytes'),
+])
+register_action(0x01, 'DECREASE_LIQUIDITY', [
+    ('tokenId', 'uint256'), ('liquidity', 'uint256'), ('amount0Min', 'uint128'),
+    ('amount1Min', 'uint128'), ('hookData', 'bytes'),
+])
+register_action(0x02, 'MINT_POSITION', [
+    ('poolKey', 'PoolKey'), ('tickLower', 'int24'), ('tickUpper', 'int24'), ('liquidity', 'uint256'),
+    ('amount0Max', 'uint128'), ('amount1Max', 'uint128'), ('owner', 'address'), ('hookData', 'bytes'),
+])
+register_action(0x03, 'BURN_POSITION', [
+    ('tokenId', 'uint256'), ('amount0Min', 'uint128'), ('amount1Min', 'uint128'), ('hookData', 'bytes'),
+])
+register_action(0x04, 'INCREASE_LIQUIDITY_FROM_DELTAS', [
+    ('tokenId', 'uint256'), ('amount0Max', 'uint128'), ('amount1Max', 'uint128'), ('hookData', 'bytes'),
+])
+register_action(0x05, 'MINT_POSITION_FROM_DELTAS', [
+    ('poolKey', 'PoolKey'), ('tickLower', 'int24'), ('tickUpper', 'int24'), ('amount0Max', 'uint128'),
+    ('amount1Max', 'uint128'), ('owner', 'address'), ('hookData', 'bytes'),
+])
+# 结算动作
+register_action(0x0b, 'SETTLE', [('currency', 'address'), ('amount', 'uint256'), ('payerIsUser', 'bool')])
+register_action(0x0c, 'SETTLE_ALL', [('currency', 'address'), ('maxAmount', 'uint256')])
+register_action(0x0d, 'SETTLE_PAIR', [('currency0', 'address'), ('currency1', 'address')])
+# 领取动作
+register_action(0x0e, 'TAKE', [('currency', 'address'), ('recipient', 'address'), ('amount', 'uint256')])
+register_action(0x0f, 'TAKE_ALL', [('currency', 'address'), ('minAmount', 'uint256')])
+register_action(0x10, 'TAKE_PORTION', [('currency', 'address'), ('recipient', 'address'), ('bips', 'uint256')])
+register_action(0x11, 'TAKE_PAIR', [
+    ('currency0', 'address'), ('currency1', 'address'), ('recipient', 'address'),
+])
+register_action(0x12, 'CLOSE_CURRENCY', [('currency', 'address')])
+register_action(0x13, 'CLEAR_OR_TAKE', [('currency', 'address'), ('amountMax', 'uint256')])
+register_action(0x14, 'SWEEP', [('currency', 'address'), ('to', 'address')])
+# WETH 包装
+register_action(0x15, 'WRAP', [('amount', 'uint256')])
+register_action(0x16, 'UNWRAP', [('amount', 'uint256')])
+
+
+# ---------- 编码 ----------
+def encode_action(action: Union[int, str], params: Dict[str, Any]) -> bytes:
+    """按动作编号或名称编码单个 params"""
+    code = ACTION_CODES[action] if isinstance(action, str) else action
+    if code not in ACTIONS:
+        raise ValueError(f"未登记的动作: {action}")
+    return ACTIONS[code].encode(params)
+
+
+def _encode_bytes_tail(data: bytes) -> bytes:
+    return len(data).to_bytes(WORD, 'big') + data + bytes(-len(data) % WORD)
+
+
+def encode_actions(actions: List[Tuple[Union[int, str], Dict[str, Any]]]) -> Tuple[bytes, List[bytes]]:
+    """[(动作, 参数), ...] -> (actions 字节串, params 列表)"""
+    codes = bytes(ACTION_CODES[a] if isinstance(a, str) else a for a, _ in actions)
+    return codes, [encode_action(code, params) for code, (_, params) in zip(codes, actions)]
+
+
+def encode_actions_and_params(actions: Buffer, params_list: List[bytes]) -> bytes:
+    """abi.encode(bytes actions, bytes[] params)"""
+    actions_tail = _encode_bytes_tail(bytes(actions))
+    heads = bytearray()
+    tails = bytearray()
+    for params in params_list:
+        heads += (len(params_list) * WORD + len(tails)).to_bytes(WORD, 'big')
+        tails += _encode_bytes_tail(bytes(params))
+    return b''.join([
+        (2 * WORD).to_bytes(WORD, 'big'),
+        (2 * WORD + len(actions_tail)).to_bytes(WORD, 'big'),
+        actions_tail,
+        len(params_list).to_bytes(WORD, 'big'),
+        bytes(heads),
+        bytes(tails),
+    ])
+
+
+def encode_unlock_actions(actions: List[Tuple[Union[int, str], Dict[str, Any]]]) -> bytes:
+    """编码任意动作序列的 unlockData（unlock_encoder.encode_unlock_data 只处理固定的减仓布局）"""
+    return encode_actions_and_params(*encode_actions(actions))
+
+
+def encode_modify_liquidities(actions: List[Tuple[Union[int, str], Dict[str, Any]]], deadline: int) -> bytes:
+    """modifyLiquidities(bytes unlockData, uint256 deadline) 的完整 calldata"""
+    unlock_data = encode_unlock_actions(actions)
+    return (MODIFY_LIQUIDITIES_SELECTOR + (2 * WORD).to_bytes(WORD, 'big') + int(deadline).to_bytes(WORD, 'big')
+            + _encode_bytes_tail(unlock_data))
+
+
+# ---------- 解码 ----------
+def decode_action(action: int, params: Buffer) -> Dict[str, Any]:
+    """按动作编号解码单个 params，未登记的动作返回原始十六进制"""
+    params = memoryview(params)
+    spec = ACTIONS.get(action)
+    if spec is None:
+        return {'action': f'UNKNOWN_0x{action:02x}', 'raw': '0x' + params.hex()}
+    return spec.decode(params)
+
+
+def decode_actions(actions: Buffer, params_list: List[memoryview]) -> List[Dict[str, Any]]:
+    actions = bytes(actions)
+    if len(actions) != len(params_list):
+        raise ValueError(f"actions 数量 {len(actions)} 与 params 数量 {len(params_list)} 不一致")
+    return [decode_action(action, params) for action, params in zip(actions, params_list)]
+
+
+def decode_unlock_data(unlock_data: Buffer) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """解码 unlockData = abi.encode(bytes actions, bytes[] params)"""
+    buf = memoryview(unlock_data)
+    actions = read_bytes(buf, 0)
+    params_list = read_bytes_array(buf, WORD)
+    return list(actions), decode_actions(actions, params_list)
+
+
+def decode_calldata(calldata: Buffer) -> Dict[str, Any]:
+    """解码 PositionManager 交易输入，支持 modifyLiquidities / modifyLiquiditiesWithoutUnlock /
+    multicall(bytes[])（逐个解码内部调用，放在 calls 字段中）
+    """
+    buf = memoryview(calldata)
+    _check(buf, 4)
+    selector, args = bytes(buf[:4]), buf[4:]
+    if selector == MODIFY_LIQUIDITIES_SELECTOR:
+        actions, params = decode_unlock_data(read_bytes(args, 0))
+        return {'method': 'modifyLiquidities', 'deadline': read_uint(args, WORD),
+                'actions': actions, 'params': params}
+    if selector == MODIFY_LIQUIDITIES_WITHOUT_UNLOCK_SELECTOR:
+        actions = read_bytes(args, 0)
+        params = decode_actions(actions, read_bytes_array(args, WORD))
+        return {'method': 'modifyLiquiditiesWithoutUnlock', 'actions': list(actions), 'params': params}
+    if selector == MULTICALL_SELECTOR:
+        return {'method': 'multicall', 'calls': [decode_calldata(call) for call in read_bytes_array(args, 0)]}
+    return {'method': f'UNKNOWN_0x{selector.hex()}'}
+
+
+def decode_modify_liquidities(calldata: Buffer) -> Dict[str, Any]:
+    """解码单笔 modifyLiquidities calldata，附带 deadline 的本地时间"""
+    decoded = decode_calldata(calldata)
+    if decoded['method'] != 'modifyLiquidities':
+        raise ValueError(f"不是 modifyLiquidities 调用: {decoded['method']}")
+    local_dt = datetime.fromtimestamp(decoded['deadline'], tz=timezone.utc).astimezone()
+    return {
+        'deadline': decoded['deadline'],
+        'deadline_local': local_dt.isoformat(),
+        'actions': decoded['actions'],
+        'params': decoded['params'],
+    }